@@ -0,0 +1,42 @@
+"""Despliegue con varios workers en un host:
+
+    gunicorn -c Backend/gunicorn.conf.py Backend.main:app
+
+El master importa la app una vez (preload_app) y precarga modulos de llenado y plantillas antes
+del fork, asi que esas paginas se comparten copy-on-write entre workers. La cache de documentos
+en disco y el limite de renders (RENDER_MAX_GLOBAL) se coordinan entre workers con bloqueos de
+archivo (Backend/utils/bloqueo.py). Sin gunicorn, `WEB_CONCURRENCY=N uvicorn Backend.main:app`
+usa los mismos bloqueos pero cada worker importa y precarga por su cuenta (uvicorn toma
+WEB_CONCURRENCY como --workers, y los pools de BD se dimensionan con el mismo valor).
+"""
+import gc
+import os
+
+_cpus = os.cpu_count() or 2
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", _cpus))
+worker_class = "uvicorn_worker.UvicornWorker"
+preload_app = True
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+# Los workers leen WEB_CONCURRENCY para repartir DB_CONEXIONES_MAX entre sus pools
+os.environ["WEB_CONCURRENCY"] = str(workers)
+# Por defecto un llenado por CPU en todo el host, no por worker
+os.environ.setdefault("RENDER_MAX_GLOBAL", str(_cpus))
+
+
+def when_ready(server):
+    from Backend.utils import arranque
+    arranque.precargar_compartido()
+    # Lo cargado hasta aqui no lo recorre el GC de los workers (evita copiar paginas compartidas)
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Las conexiones abiertas en el master no se comparten: cada worker abre su propio pool
+    from Backend.utils.database import async_engine, engine
+    engine.dispose(close=False)
+    async_engine.sync_engine.dispose(close=False)
@@ -1,15 +1,37 @@
-from fastapi import FastAPI
-from Backend.routes import descarga, proyecto
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.responses import ORJSONResponse
+from Backend.routes import descarga, metricas, proyecto, reportes, salud
+from Backend.services import navegador, render_pool
 from Backend.utils.config import settings
-from Backend.utils.database import engine, Base
+from Backend.utils.database import verificar_presupuesto_conexiones
+from Backend.utils import arranque, compresion, instrumentacion, perfilador
 from fastapi.middleware.cors import CORSMiddleware
 import asyncio
 import sys
 
+# uvicorn crea su loop antes de importar la app: en Windows arrancar con --workers/--reload (usa
+# Selector). La politica cubre los loops creados despues, incluidos los hilos de Playwright.
 if sys.platform.startswith("win"):
-    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+    asyncio.set_event_loop_policy(navegador.PoliticaWindows())
 
-app = FastAPI(title="Formulario Web Concepto Tecnico y Sectorial")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    verificar_presupuesto_conexiones()
+    arranque.preparar_esquema()
+    arranque.iniciar_precalentamiento()
+    yield
+    navegador.cerrar()
+    render_pool.cerrar()
+
+
+# orjson serializa el JSON de las respuestas (FormularioRead, plantillas del evaluador) en C
+app = FastAPI(
+    title="Formulario Web Concepto Tecnico y Sectorial",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 origins = settings.CORS_ORIGINS
 allow_all = "*" in origins
@@ -22,7 +44,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-Base.metadata.create_all(bind=engine)
+app.add_middleware(compresion.CompresionMiddleware)
+app.add_middleware(perfilador.PerfilMiddleware)
+app.add_middleware(instrumentacion.MetricasMiddleware)
 
 origins = [
     "http://localhost:5173",
@@ -33,7 +57,14 @@ origins = [
 
 app.include_router(proyecto.router)
 app.include_router(descarga.router)
+app.include_router(metricas.router)
+app.include_router(reportes.router)
+app.include_router(salud.router)
 
 @app.get("/")
 def root():
     return {"message": "Formulario service running", "env": settings.ENV}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(instrumentacion.exportar(), media_type=instrumentacion.CONTENT_TYPE)
@@ -22,3 +22,4 @@ class Formulario(Base):
     fuentes = Column(Text, nullable=True)
     duracion_proyecto = Column(Integer, nullable=True)
     cantidad_beneficiarios = Column(Integer, nullable=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
@@ -1,19 +1,19 @@
 # Backend/routes/descarga.py
-from fastapi import APIRouter, Depends, HTTPException
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
 from Backend.utils.database import SessionLocal
-from Backend.services import descarga_service
+from Backend.services import descarga_service, documento_cache, proyecto_service, render_pool
+from Backend.utils.instrumentacion import span
 
 router = APIRouter(prefix="/descarga", tags=["descarga"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# La sesion solo vive mientras se arma el contexto; el llenado de plantillas
+# (openpyxl, python-docx, Chromium) corre despues sin conexion tomada del pool.
+def _contexto(fetch, form_id: int):
+    with span("db.contexto"), SessionLocal() as db:
+        return fetch(db, form_id)
 
 
 class IndicadorObjetivoIn(BaseModel):
@@ -40,120 +40,111 @@ class EvaluadorTemplateIn(BaseModel):
     concepto_sectorial_favorable_dep: str | None = None
     proyecto_viable_dep: str | None = None
 
-@router.get("/excel/concepto-tecnico-sectorial/{form_id}")
-def descargar_excel_concepto_tecnico_sectorial(form_id: int, db: Session = Depends(get_db)):
+def _descargar(doc: str, form_id: int):
+    documento = descarga_service.DOCUMENTOS[doc]
     try:
-        bio, filename = descarga_service.excel_concepto_tecnico_sectorial(db, form_id)
+        with span("db.contexto"), SessionLocal() as db:
+            clave = descarga_service.clave_documento(db, doc, form_id)
+            cacheado = documento_cache.leer(clave)
+            ctx = documento.contexto(db, form_id) if cacheado is None else None
+        if cacheado is None:
+            # Si otro hilo o worker ya genera este documento se espera y se sirve su resultado
+            with documento_cache.exclusivo(clave):
+                cacheado = documento_cache.leer(clave)
+                if cacheado is None:
+                    bio, filename = render_pool.ejecutar(documento.render, form_id, ctx)
+                    contenido = bio.getvalue()
+                    if contenido:
+                        documento_cache.guardar(clave, contenido, filename, documento.media_type)
+        if cacheado is not None:
+            # Ya leido: si la expulsion borro el archivo entre tanto, leer() lo trato como MISS
+            contenido_cacheado, meta = cacheado
+            return Response(
+                contenido_cacheado,
+                media_type=meta["media_type"],
+                headers={"Content-Disposition": f'attachment; filename="{meta["filename"]}"', "X-Cache": "HIT"},
+            )
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generando Excel: {e}")
+        raise HTTPException(status_code=500, detail=f"Error generando {documento.etiqueta}: {e}")
 
-    if bio.getbuffer().nbytes == 0:
+    if not contenido:
         raise HTTPException(status_code=404, detail="No hay datos para exportar")
 
     return StreamingResponse(
         bio,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        media_type=documento.media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "X-Cache": "MISS"}
     )
 
-@router.get("/excel/cadena-valor/{form_id}")
-def descargar_excel_cadena_valor(form_id: int, db: Session = Depends(get_db)):
-    try:
-        bio, filename = descarga_service.excel_cadena_valor(db, form_id)
-    except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generando Excel: {e}")
-
-    if bio.getbuffer().nbytes == 0:
-        raise HTTPException(status_code=404, detail="No hay datos para exportar")
+@router.get("/excel/concepto-tecnico-sectorial/{form_id}")
+def descargar_excel_concepto_tecnico_sectorial(form_id: int):
+    return _descargar("concepto-tecnico-sectorial", form_id)
 
-    return StreamingResponse(
-        bio,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-    )
+@router.get("/excel/cadena-valor/{form_id}")
+def descargar_excel_cadena_valor(form_id: int):
+    return _descargar("cadena-valor", form_id)
 
 @router.get("/excel/viabilidad-dependencias/{form_id}")
-def descargar_excel_viabilidad_dependencias(form_id: int, db: Session = Depends(get_db)):
-    try:
-        bio, filename = descarga_service.excel_viabilidad_dependencias(db, form_id)
-    except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generando Excel: {e}")
-
-    if bio.getbuffer().nbytes == 0:
-        raise HTTPException(status_code=404, detail="No hay datos para exportar")
-
-    return StreamingResponse(
-        bio,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-    )
+def descargar_excel_viabilidad_dependencias(form_id: int):
+    return _descargar("viabilidad-dependencias", form_id)
 
 @router.get("/word/carta/{form_id}")
-def descargar_word_carta(form_id: int, db: Session = Depends(get_db)):
-    try:
-        bio, filename = descarga_service.word_formulario(db, form_id, doc="carta")
-    except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generando Word: {e}")
+def descargar_word_carta(form_id: int):
+    return _descargar("carta", form_id)
 
-    if not bio.getvalue():
-        raise HTTPException(status_code=404, detail="No hay datos para exportar")
+@router.get("/word/cert-precios/{form_id}")
+def descargar_word_cert_precios(form_id: int):
+    return _descargar("cert-precios", form_id)
 
-    return StreamingResponse(
-        bio,
-        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
-    )
+@router.get("/word/no-doble-cofin/{form_id}")
+def descargar_word_no_doble_cofin(form_id: int):
+    return _descargar("no-doble-cofin", form_id)
 
-@router.get("/word/cert-precios/{form_id}")
-def descargar_word_cert_precios(form_id: int, db: Session = Depends(get_db)):
+
+@router.get("/paquete/{form_id}")
+def descargar_paquete(form_id: int):
     try:
-        bio, filename = descarga_service.word_formulario(db, form_id, doc="cert_precios")
+        entradas = _contexto(descarga_service.contextos_paquete, form_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generando Word: {e}")
-
-    if not bio.getvalue():
-        raise HTTPException(status_code=404, detail="No hay datos para exportar")
+        raise HTTPException(status_code=500, detail=f"Error generando paquete: {e}")
 
     return StreamingResponse(
-        bio,
-        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        descarga_service.generar_paquete(form_id, entradas),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="formulario_{form_id}_documentos.zip"'}
     )
 
-@router.get("/word/no-doble-cofin/{form_id}")
-def descargar_word_no_doble_cofin(form_id: int, db: Session = Depends(get_db)):
-    try:
-        bio, filename = descarga_service.word_formulario(db, form_id, doc="no_doble_cofin")
-    except ValueError as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generando Word: {e}")
 
-    if not bio.getvalue():
-        raise HTTPException(status_code=404, detail="No hay datos para exportar")
+@router.get("/lote/concepto-tecnico-sectorial")
+def descargar_lote_concepto(
+    nombre: str | None = None,
+    cod_id_mga: str | None = Query(None),
+    id_dependencia: int | None = Query(None),
+):
+    # Mismos filtros que /proyecto/lista
+    with SessionLocal() as db:
+        ids = proyecto_service.listar_ids_proyectos(db, nombre, cod_id_mga, id_dependencia)
+    if not ids:
+        raise HTTPException(status_code=404, detail="No hay proyectos para exportar")
 
+    sufijo = f"_dependencia_{id_dependencia}" if id_dependencia is not None else ""
     return StreamingResponse(
-        bio,
-        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+        descarga_service.generar_lote_conceptos(SessionLocal, ids),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="conceptos_tecnico_sectorial{sufijo}.zip"'}
     )
 
 
 @router.post("/evaluador/template/{doc_key}/{form_id}")
-def render_template_evaluador(doc_key: str, form_id: int, body: EvaluadorTemplateIn, db: Session = Depends(get_db)):
+def render_template_evaluador(doc_key: str, form_id: int, body: EvaluadorTemplateIn):
     try:
+        base = _contexto(descarga_service.contexto_evaluador, form_id)
         html, filename = descarga_service.render_evaluador_template_html(
-            db=db,
+            db=None,
             form_id=form_id,
             template_key=doc_key,
             contenido_html=body.contenido_html,
@@ -166,6 +157,7 @@ def render_template_evaluador(doc_key: str, form_id: int, body: EvaluadorTemplat
             concepto_tecnico_favorable_dep=body.concepto_tecnico_favorable_dep,
             concepto_sectorial_favorable_dep=body.concepto_sectorial_favorable_dep,
             proyecto_viable_dep=body.proyecto_viable_dep,
+            base=base,
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -176,10 +168,11 @@ def render_template_evaluador(doc_key: str, form_id: int, body: EvaluadorTemplat
 
 
 @router.post("/evaluador/pdf/{doc_key}/{form_id}")
-async def render_pdf_evaluador(doc_key: str, form_id: int, body: EvaluadorTemplateIn, db: Session = Depends(get_db)):
+async def render_pdf_evaluador(doc_key: str, form_id: int, body: EvaluadorTemplateIn):
     try:
+        base = await run_in_threadpool(_contexto, descarga_service.contexto_evaluador, form_id)
         bio, filename = await descarga_service.render_evaluador_template_pdf_async(
-            db=db,
+            db=None,
             form_id=form_id,
             template_key=doc_key,
             contenido_html=body.contenido_html,
@@ -192,6 +185,7 @@ async def render_pdf_evaluador(doc_key: str, form_id: int, body: EvaluadorTempla
             concepto_tecnico_favorable_dep=body.concepto_tecnico_favorable_dep,
             concepto_sectorial_favorable_dep=body.concepto_sectorial_favorable_dep,
             proyecto_viable_dep=body.proyecto_viable_dep,
+            base=base,
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,87 @@
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from Backend.services import documento_cache, navegador, prerender_service, render_pool
+from Backend.utils import instrumentacion, perfilador
+from Backend.utils.config import settings
+from Backend.utils.database import estado_pool, pool_metricas, pool_metricas_async
+
+router = APIRouter(prefix="/metricas", tags=["metricas"])
+
+
+# Gauges de /metrics (formato Prometheus) leidos de los mismos estados que exponen estas rutas
+def _gauge_pool() -> dict:
+    estado = estado_pool()
+    return {("sync",): estado["en_uso"], ("async",): estado["async"]["en_uso"]}
+
+
+instrumentacion.registrar_gauge("db_pool_checked_out", "Conexiones tomadas del pool", _gauge_pool, ("engine",))
+instrumentacion.registrar_gauge(
+    "render_pool_in_progress", "Documentos generandose en render_pool", lambda: {(): render_pool.estado()["en_curso"]}
+)
+instrumentacion.registrar_gauge(
+    "documento_cache_bytes", "Bytes en la cache de documentos", lambda: {(): documento_cache.estado()["bytes"]}
+)
+
+def requiere_admin(x_admin_token: Optional[str] = Header(None)):
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Token de administracion invalido")
+
+
+@router.get("/pool")
+def metricas_pool():
+    return estado_pool()
+
+@router.post("/pool/reset", dependencies=[Depends(requiere_admin)])
+def reset_metricas_pool():
+    pool_metricas.reset()
+    pool_metricas_async.reset()
+    return {"ok": True}
+
+@router.get("/documentos")
+def metricas_documentos():
+    return {
+        **documento_cache.estado(), "prerender": prerender_service.estado(), "render": render_pool.estado(),
+        "chromium": navegador.estado(),
+    }
+
+
+# Perfilado bajo demanda de las proximas N solicitudes que coincidan con `ruta` (patron fnmatch).
+# GET /metricas/perfil/colapsado devuelve pilas en formato collapsed (flamegraph.pl, speedscope).
+@router.post("/perfil", dependencies=[Depends(requiere_admin)])
+def iniciar_perfil(
+    ruta: str = Query(..., description='Patron de ruta, p. ej. "/descarga/excel/*"'),
+    solicitudes: int = Query(5, ge=1, le=1000),
+    intervalo_ms: float = Query(5.0, ge=1.0, le=1000.0),
+    timeout_seg: float = Query(300.0, gt=0, le=3600),
+):
+    try:
+        sesion = perfilador.iniciar(ruta, solicitudes, intervalo_ms, timeout_seg)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return sesion.resumen()
+
+@router.get("/perfil", dependencies=[Depends(requiere_admin)])
+def estado_perfil():
+    sesion = perfilador.actual()
+    if sesion is None:
+        raise HTTPException(status_code=404, detail="No se ha iniciado ningun perfilado")
+    return sesion.resumen()
+
+@router.get("/perfil/colapsado", dependencies=[Depends(requiere_admin)])
+def perfil_colapsado():
+    sesion = perfilador.actual()
+    if sesion is None:
+        raise HTTPException(status_code=404, detail="No se ha iniciado ningun perfilado")
+    return PlainTextResponse(sesion.colapsado(), headers={"X-Perfil-Estado": sesion.estado})
+
+@router.delete("/perfil", dependencies=[Depends(requiere_admin)])
+def cancelar_perfil():
+    sesion = perfilador.actual()
+    if sesion is None:
+        raise HTTPException(status_code=404, detail="No se ha iniciado ningun perfilado")
+    sesion.terminar("cancelada")
+    return sesion.resumen()
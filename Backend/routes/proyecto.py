@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from Backend.utils.database import SessionLocal
-from Backend.services import proyecto_service
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from Backend.utils.config import settings
+from Backend.utils.database import SessionLocal, get_async_db
+from Backend.utils.http_cache import etag_formulario, etag_coincide
+from Backend.services import proyecto_service, catalogo_cache, exportacion_service, prerender_service, reportes_service
+from Backend.routes.metricas import requiere_admin
 from Backend import schemas
 
 router = APIRouter(prefix="/proyecto", tags=["proyecto"])
@@ -36,81 +41,97 @@ def _map_observacion_evaluacion(row) -> schemas.ObservacionEvaluacionRead:
         created_at=row.created_at,
     )
 
+def _map_meta(m, meta_proyecto=None) -> schemas.MetaRead:
+    return schemas.MetaRead(
+        id=m.id,
+        numero_meta=m.numero_meta,
+        nombre_meta=m.nombre_meta,
+        codigo_producto=m.codigo_producto,
+        nombre_producto=m.nombre_producto,
+        unidad_medida=getattr(m, "unidad_medida", None),
+        codigo_indicador_producto=m.codigo_indicador_producto,
+        nombre_indicador_producto=m.nombre_indicador_producto,
+        meta_proyecto=meta_proyecto,
+    )
+
+def _formulario_guardado(form_id: int, version: int, response: Response) -> None:
+    response.headers["ETag"] = etag_formulario(form_id, version)
+    prerender_service.encolar(form_id, version)
+    reportes_service.marcar_cambio()
+
+# Recibe la version que devolvio la escritura (UPDATE ... RETURNING), no la relee
+def _version_o_404(form_id: int, version: Optional[int], response: Response) -> int:
+    if version is None:
+        raise HTTPException(status_code=404, detail="Formulario no encontrado")
+    _formulario_guardado(form_id, version, response)
+    return version
+
+async def _catalogo(request: Request, db: AsyncSession, clave: str, filtro: int | None = None) -> Response:
+    body, etag = await catalogo_cache.respuesta_async(db, clave, filtro)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={settings.CATALOGO_CACHE_MAX_AGE}"}
+    if etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.get("/lineas", response_model=List[schemas.LineaRead])
-def lineas(db: Session = Depends(get_db)):
-    return [
-        schemas.LineaRead(id=r.id, nombre=r.nombre_linea_estrategica)
-        for r in proyecto_service.listar_lineas(db)
-    ]
+async def lineas(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await _catalogo(request, db, "lineas")
 
 @router.get("/sectores", response_model=List[schemas.SectorRead])
-def sectores(linea_id: int = Query(..., ge=1), db: Session = Depends(get_db)):
-    return [
-        schemas.SectorRead(id=r.id, codigo_sector=r.codigo_sector, nombre_sector=r.nombre_sector)
-        for r in proyecto_service.listar_sectores(db, linea_id)
-    ]
+async def sectores(request: Request, linea_id: int = Query(..., ge=1), db: AsyncSession = Depends(get_async_db)):
+    return await _catalogo(request, db, "sectores", linea_id)
 
 @router.get("/programas", response_model=List[schemas.ProgramaRead])
-def programas(sector_id: int = Query(..., ge=1), db: Session = Depends(get_db)):
-    return [
-        schemas.ProgramaRead(id=r.id, codigo_programa=r.codigo_programa, nombre_programa=r.nombre_programa)
-        for r in proyecto_service.listar_programas(db, sector_id)
-    ]
+async def programas(request: Request, sector_id: int = Query(..., ge=1), db: AsyncSession = Depends(get_async_db)):
+    return await _catalogo(request, db, "programas", sector_id)
 
 @router.get("/metas", response_model=List[schemas.MetaRead])
-def metas(programa_id: int = Query(..., ge=1), db: Session = Depends(get_db)):
-    return [
-        schemas.MetaRead(
-            id=r.id,
-            numero_meta=r.numero_meta,
-            nombre_meta=r.nombre_meta,
-            codigo_producto=r.codigo_producto,
-            nombre_producto=r.nombre_producto,
-            unidad_medida=getattr(r, "unidad_medida", None),
-            codigo_indicador_producto=r.codigo_indicador_producto,
-            nombre_indicador_producto=r.nombre_indicador_producto,
-        )
-        for r in proyecto_service.listar_metas(db, programa_id)
-    ]
+async def metas(request: Request, programa_id: int = Query(..., ge=1), db: AsyncSession = Depends(get_async_db)):
+    return await _catalogo(request, db, "metas", programa_id)
 
 @router.get("/dependencias")
-def dependencias(db: Session = Depends(get_db)):
-    return proyecto_service.listar_dependencias(db)
+async def dependencias(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await _catalogo(request, db, "dependencias")
 
 @router.get("/variables_sectorial", response_model=List[schemas.VariableSectorialRead])
-def variables_sectorial(db: Session = Depends(get_db)):
-    return [
-        schemas.VariableSectorialRead(id=r.id, nombre_variable=r.nombre_variable)
-        for r in proyecto_service.listar_variables_sectorial(db)
-    ]
+async def variables_sectorial(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await _catalogo(request, db, "variables_sectorial")
 
 @router.get("/variables_tecnico", response_model=List[schemas.VariableTecnicoRead])
-def variables_tecnico(db: Session = Depends(get_db)):
-    return [
-        schemas.VariableTecnicoRead(id=r.id, nombre_variable=r.nombre_variable)
-        for r in proyecto_service.listar_variables_tecnico(db)
-    ]
+async def variables_tecnico(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await _catalogo(request, db, "variables_tecnico")
 
 @router.get("/politicas", response_model=List[schemas.PoliticaRead])
-def politicas(db: Session = Depends(get_db)):
-    return [
-        schemas.PoliticaRead(id=r.id, nombre_politica=r.nombre_politica)
-        for r in proyecto_service.listar_politicas(db)
-    ]
+async def politicas(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await _catalogo(request, db, "politicas")
 
 @router.get("/categorias", response_model=List[schemas.CategoriaRead])
-def categorias(politica_id: int = Query(..., ge=1), db: Session = Depends(get_db)):
-    return [
-        schemas.CategoriaRead(id=r.id, id_politica=r.id_politica, nombre_categoria=r.nombre_categoria)
-        for r in proyecto_service.listar_categorias(db, politica_id)
-    ]
+async def categorias(request: Request, politica_id: int = Query(..., ge=1), db: AsyncSession = Depends(get_async_db)):
+    return await _catalogo(request, db, "categorias", politica_id)
 
 @router.get("/subcategorias", response_model=List[schemas.SubcategoriaRead])
-def subcategorias(categoria_id: int = Query(..., ge=1), db: Session = Depends(get_db)):
-    return [
-        schemas.SubcategoriaRead(id=r.id, id_categoria=r.id_categoria, nombre_subcategoria=r.nombre_subcategoria)
-        for r in proyecto_service.listar_subcategorias(db, categoria_id)
-    ]
+async def subcategorias(request: Request, categoria_id: int = Query(..., ge=1), db: AsyncSession = Depends(get_async_db)):
+    return await _catalogo(request, db, "subcategorias", categoria_id)
+
+@router.get("/catalogos")
+async def catalogos_bootstrap(request: Request, db: AsyncSession = Depends(get_async_db)):
+    body, etag, encoding = await catalogo_cache.bootstrap_async(db, request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.CATALOGO_CACHE_MAX_AGE}",
+        "Vary": "Accept-Encoding",
+    }
+    if etag_coincide(request.headers.get("if-none-match"), etag):
+        # El 304 no lleva cuerpo: solo validadores, Vary y Cache-Control
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.post("/catalogos/invalidar", dependencies=[Depends(requiere_admin)])
+def invalidar_catalogos():
+    catalogo_cache.invalidar()
+    return {"ok": True}
 
 @router.post("/formulario", response_model=schemas.FormularioRead)
 def crear_formulario(payload: schemas.FormularioCreate, db: Session = Depends(get_db)):
@@ -131,6 +152,8 @@ def crear_formulario(payload: schemas.FormularioCreate, db: Session = Depends(ge
     if payload.estructura_financiera:
         proyecto_service.asignar_estructura_financiera(db, form.id, payload.estructura_financiera)
 
+    reportes_service.marcar_cambio()
+
     form_db = proyecto_service.obtener_formulario(db, form.id)
     metas_db = proyecto_service.listar_metas_por_formulario_con_detalle(db, form.id)
     vars_sectorial_db = proyecto_service.listar_variables_sectorial_por_formulario(db, form.id)
@@ -178,22 +201,39 @@ def crear_formulario(payload: schemas.FormularioCreate, db: Session = Depends(ge
         categorias=[schemas.CategoriaRead(id=c.id, id_politica=c.id_politica, nombre_categoria=c.nombre_categoria) for c in cats_db],
         subcategorias=[schemas.SubcategoriaRead(id=s.id, id_categoria=s.id_categoria, nombre_subcategoria=s.nombre_subcategoria) for s in subcats_db],
         estructura_financiera=[schemas.EstructuraFinancieraRow(id=e.id, anio=e.anio, entidad=e.entidad, valor=e.valor) for e in est_fin_db],
+        version=form_db.version,
     )
 
 @router.get("/formulario/{form_id}", response_model=schemas.FormularioRead)
-def obtener_formulario(form_id: int, db: Session = Depends(get_db)):
-    form_db = proyecto_service.obtener_formulario(db, form_id)
-    if not form_db:
+async def obtener_formulario(
+    form_id: int,
+    response: Response,
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # Validacion condicional barata: solo se lee la version antes de armar el formulario
+    version = await proyecto_service.obtener_version_async(db, form_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Formulario no encontrado")
+    etag = etag_formulario(form_id, version)
+    if etag_coincide(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+    modelo = await proyecto_service.leer_modelo_formulario_async(db, form_id)
+    if not modelo:
         raise HTTPException(status_code=404, detail="Formulario no encontrado")
-    metas_db            = proyecto_service.listar_metas_por_formulario_con_detalle(db, form_id)
-    vars_sectorial_db   = proyecto_service.listar_variables_sectorial_por_formulario(db, form_id)
-    vars_tecnico_db     = proyecto_service.listar_variables_tecnico_por_formulario(db, form_id)
-    pols_db             = proyecto_service.listar_politicas_por_formulario(db, form_id)
-    cats_db             = proyecto_service.listar_categorias_por_formulario(db, form_id)
-    subcats_db          = proyecto_service.listar_subcategorias_por_formulario(db, form_id)
-    est_fin_db          = proyecto_service.listar_estructura_financiera(db, form_id)
-    viab_db = proyecto_service.listar_viabilidades_por_formulario(db, form_id)
-    func_db = proyecto_service.listar_funcionarios_viabilidad(db, form_id)
+    form_db = modelo["form"]
+    response.headers["ETag"] = etag_formulario(form_id, form_db.version)
+    response.headers["Cache-Control"] = "no-cache"
+    metas_db            = modelo["metas"]
+    vars_sectorial_db   = modelo["variables_sectorial"]
+    vars_tecnico_db     = modelo["variables_tecnico"]
+    pols_db             = modelo["politicas"]
+    cats_db             = modelo["categorias"]
+    subcats_db          = modelo["subcategorias"]
+    est_fin_db          = modelo["estructura_financiera"]
+    viab_db = modelo["viabilidades"]
+    func_db = modelo["funcionarios_viabilidad"]
 
     return schemas.FormularioRead(
         id=form_db.id,
@@ -214,17 +254,7 @@ def obtener_formulario(form_id: int, db: Session = Depends(get_db)):
         fuentes=getattr(form_db, "fuentes", None) or "",
         duracion_proyecto=getattr(form_db, "duracion_proyecto", None) or 0,
         cantidad_beneficiarios=getattr(form_db, "cantidad_beneficiarios", None) or 0,
-        metas=[schemas.MetaRead(
-            id=m.id,
-            numero_meta=m.numero_meta,
-            nombre_meta=m.nombre_meta,
-            codigo_producto=m.codigo_producto,
-            nombre_producto=m.nombre_producto,
-            unidad_medida=getattr(m, "unidad_medida", None),
-            codigo_indicador_producto=m.codigo_indicador_producto,
-            nombre_indicador_producto=m.nombre_indicador_producto,
-            meta_proyecto=meta_proyecto,
-        ) for (m, meta_proyecto) in metas_db] or [],
+        metas=[_map_meta(m, meta_proyecto) for (m, meta_proyecto) in metas_db] or [],
         variables_sectorial=[schemas.VariableSectorialRead(id=v.id, nombre_variable=v.nombre_variable) for v in vars_sectorial_db] or [],
         variables_tecnico=[schemas.VariableTecnicoRead(id=v.id, nombre_variable=v.nombre_variable) for v in vars_tecnico_db] or [],
         politicas=[schemas.PoliticaRead(id=p.id, nombre_politica=p.nombre_politica, valor_destinado=valor) for (p, valor) in pols_db] or [],
@@ -233,6 +263,7 @@ def obtener_formulario(form_id: int, db: Session = Depends(get_db)):
         estructura_financiera=[schemas.EstructuraFinancieraRow(id=e.id, anio=e.anio, entidad=e.entidad, valor=e.valor) for e in est_fin_db] or [],
         viabilidades=[schemas.ViabilidadRead(id=v.id, nombre=v.nombre) for v in viab_db] or [],
         funcionarios_viabilidad=[schemas.FuncionarioViabilidadIn(id_tipo_viabilidad=f.id_tipo_viabilidad, nombre=f.nombre, cargo=f.cargo) for f in func_db] or [],
+        version=form_db.version,
     )
 
 @router.post("", response_model=schemas.FormularioRead)
@@ -242,94 +273,193 @@ def crear_borrador_endpoint(db: Session = Depends(get_db)):
         id=form.id, nombre_proyecto=form.nombre_proyecto, cod_id_mga=form.cod_id_mga,
         id_dependencia=form.id_dependencia, id_linea_estrategica=form.id_linea_estrategica,
         id_programa=form.id_programa, id_sector=form.id_sector, nombre_secretario=form.nombre_secretario,
-        metas=[], variables_sectorial=[], variables_tecnico=[], estructura_financiera=[], politicas=[], categorias=[], subcategorias=[]
+        metas=[], variables_sectorial=[], variables_tecnico=[], estructura_financiera=[], politicas=[], categorias=[], subcategorias=[],
+        version=form.version,
     )
 
-@router.patch("/formulario/{form_id}/basicos", response_model=schemas.FormularioRead)
-def upsert_basicos(form_id:int, payload: schemas.FormularioUpsertBasicos, db: Session = Depends(get_db)):
-    proyecto_service.update_formulario_basicos(db, form_id, payload)
-    return obtener_formulario(form_id, db)
+@router.patch("/formulario/{form_id}/basicos", response_model=schemas.BasicosUpsertRead)
+def upsert_basicos(form_id:int, payload: schemas.FormularioUpsertBasicos, response: Response, db: Session = Depends(get_db)):
+    try:
+        form, version = proyecto_service.update_formulario_basicos(db, form_id, payload)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    _formulario_guardado(form.id, version, response)
+    return schemas.BasicosUpsertRead(
+        id=form.id, version=version,
+        nombre_proyecto=form.nombre_proyecto or "", cod_id_mga=form.cod_id_mga or 0,
+        id_dependencia=form.id_dependencia, id_linea_estrategica=form.id_linea_estrategica,
+        id_programa=form.id_programa, id_sector=form.id_sector,
+        nombre_secretario=form.nombre_secretario, fuentes=form.fuentes,
+        duracion_proyecto=form.duracion_proyecto, cantidad_beneficiarios=form.cantidad_beneficiarios,
+        cargo_responsable=form.cargo_responsable,
+    )
 
-@router.put("/formulario/{form_id}/radicacion", response_model=schemas.FormularioRead)
-def upsert_radicacion(form_id:int, payload: schemas.FormularioRadicacionUpsert, db: Session = Depends(get_db)):
-    proyecto_service.update_formulario_radicacion(db, form_id, payload)
-    return obtener_formulario(form_id, db)
+@router.put("/formulario/{form_id}/radicacion", response_model=schemas.RadicacionUpsertRead)
+def upsert_radicacion(form_id:int, payload: schemas.FormularioRadicacionUpsert, response: Response, db: Session = Depends(get_db)):
+    try:
+        form, version = proyecto_service.update_formulario_radicacion(db, form_id, payload)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    _formulario_guardado(form.id, version, response)
+    return schemas.RadicacionUpsertRead(
+        id=form.id, version=version,
+        numero_radicacion=form.numero_radicacion, fecha_radicacion=form.fecha_radicacion, bpin=form.bpin,
+        soportes_folios=form.soportes_folios or 0, soportes_planos=form.soportes_planos or 0,
+        soportes_cds=form.soportes_cds or 0, soportes_otros=form.soportes_otros or 0,
+    )
 
-@router.put("/formulario/{form_id}/metas", response_model=schemas.FormularioRead)
-def upsert_metas(form_id:int, body: schemas.MetasFormularioUpsertIn, db: Session = Depends(get_db)):
-    proyecto_service.replace_metas_detalle(db, form_id, [m.model_dump() for m in (body.metas or [])])
-    return obtener_formulario(form_id, db)
+@router.put("/formulario/{form_id}/metas", response_model=schemas.MetasUpsertRead)
+def upsert_metas(form_id:int, body: schemas.MetasFormularioUpsertIn, response: Response, db: Session = Depends(get_db)):
+    version = proyecto_service.replace_metas_detalle(db, form_id, [m.model_dump() for m in (body.metas or [])])
+    _version_o_404(form_id, version, response)
+    metas_db = proyecto_service.listar_metas_por_formulario_con_detalle(db, form_id)
+    return schemas.MetasUpsertRead(id=form_id, version=version, metas=[_map_meta(m, mp) for (m, mp) in metas_db])
 
-@router.put("/formulario/{form_id}/estructura-financiera", response_model=schemas.FormularioRead)
-def upsert_ef(form_id:int, body: schemas.EstructuraFinancieraRead, db: Session = Depends(get_db)):
+@router.put("/formulario/{form_id}/estructura-financiera", response_model=schemas.EstructuraFinancieraUpsertRead)
+def upsert_ef(form_id:int, body: schemas.EstructuraFinancieraRead, response: Response, db: Session = Depends(get_db)):
     filas = getattr(body, "filas", []) or []
-    proyecto_service.asignar_estructura_financiera(db, form_id, filas)
-    return obtener_formulario(form_id, db)
-
-@router.put("/formulario/{form_id}/variables-sectorial", response_model=schemas.FormularioRead)
-def upsert_vs(form_id:int, body: schemas.IdsIn, db: Session = Depends(get_db)):
-    proyecto_service.replace_variables_sectorial(db, form_id, body.ids or [])
-    return obtener_formulario(form_id, db)
-
-@router.put("/formulario/{form_id}/variables-tecnico", response_model=schemas.FormularioRead)
-def upsert_vt(form_id:int, body: schemas.IdsIn, db: Session = Depends(get_db)):
-    proyecto_service.replace_variables_tecnico(db, form_id, body.ids or [])
-    return obtener_formulario(form_id, db)
-
-@router.put("/formulario/{form_id}/politicas", response_model=schemas.FormularioRead)
-def upsert_politicas(form_id:int, body: schemas.PoliticasUpsertIn, db: Session = Depends(get_db)):
-    proyecto_service.replace_politicas(db, form_id, body.politicas or [], body.valores_politicas or [])
-    return obtener_formulario(form_id, db)
-
-@router.put("/formulario/{form_id}/categorias", response_model=schemas.FormularioRead)
-def upsert_categorias(form_id:int, body: schemas.IdsIn, db: Session = Depends(get_db)):
-    proyecto_service.replace_categorias(db, form_id, body.ids or [])
-    return obtener_formulario(form_id, db)
-
-@router.put("/formulario/{form_id}/subcategorias", response_model=schemas.FormularioRead)
-def upsert_subcats(form_id:int, body: schemas.IdsIn, db: Session = Depends(get_db)):
-    proyecto_service.replace_subcategorias(db, form_id, body.ids or [])
-    return obtener_formulario(form_id, db)
+    version = proyecto_service.asignar_estructura_financiera(db, form_id, filas)
+    _version_o_404(form_id, version, response)
+    return schemas.EstructuraFinancieraUpsertRead(
+        id=form_id, version=version,
+        estructura_financiera=[
+            schemas.EstructuraFinancieraRow(id=e.id, anio=e.anio, entidad=e.entidad, valor=e.valor)
+            for e in proyecto_service.listar_estructura_financiera(db, form_id)
+        ],
+    )
+
+@router.put("/formulario/{form_id}/variables-sectorial", response_model=schemas.VariablesSectorialUpsertRead)
+def upsert_vs(form_id:int, body: schemas.IdsIn, response: Response, db: Session = Depends(get_db)):
+    version = proyecto_service.replace_variables_sectorial(db, form_id, body.ids or [])
+    _version_o_404(form_id, version, response)
+    return schemas.VariablesSectorialUpsertRead(
+        id=form_id, version=version,
+        variables_sectorial=[
+            schemas.VariableSectorialRead(id=v.id, nombre_variable=v.nombre_variable)
+            for v in proyecto_service.listar_variables_sectorial_por_formulario(db, form_id)
+        ],
+    )
+
+@router.put("/formulario/{form_id}/variables-tecnico", response_model=schemas.VariablesTecnicoUpsertRead)
+def upsert_vt(form_id:int, body: schemas.IdsIn, response: Response, db: Session = Depends(get_db)):
+    version = proyecto_service.replace_variables_tecnico(db, form_id, body.ids or [])
+    _version_o_404(form_id, version, response)
+    return schemas.VariablesTecnicoUpsertRead(
+        id=form_id, version=version,
+        variables_tecnico=[
+            schemas.VariableTecnicoRead(id=v.id, nombre_variable=v.nombre_variable)
+            for v in proyecto_service.listar_variables_tecnico_por_formulario(db, form_id)
+        ],
+    )
+
+@router.put("/formulario/{form_id}/politicas", response_model=schemas.PoliticasUpsertRead)
+def upsert_politicas(form_id:int, body: schemas.PoliticasUpsertIn, response: Response, db: Session = Depends(get_db)):
+    version = proyecto_service.replace_politicas(db, form_id, body.politicas or [], body.valores_politicas or [])
+    _version_o_404(form_id, version, response)
+    return schemas.PoliticasUpsertRead(
+        id=form_id, version=version,
+        politicas=[
+            schemas.PoliticaRead(id=p.id, nombre_politica=p.nombre_politica, valor_destinado=valor)
+            for (p, valor) in proyecto_service.listar_politicas_por_formulario(db, form_id)
+        ],
+    )
+
+@router.put("/formulario/{form_id}/categorias", response_model=schemas.CategoriasUpsertRead)
+def upsert_categorias(form_id:int, body: schemas.IdsIn, response: Response, db: Session = Depends(get_db)):
+    version = proyecto_service.replace_categorias(db, form_id, body.ids or [])
+    _version_o_404(form_id, version, response)
+    return schemas.CategoriasUpsertRead(
+        id=form_id, version=version,
+        categorias=[
+            schemas.CategoriaRead(id=c.id, id_politica=c.id_politica, nombre_categoria=c.nombre_categoria)
+            for c in proyecto_service.listar_categorias_por_formulario(db, form_id)
+        ],
+    )
+
+@router.put("/formulario/{form_id}/subcategorias", response_model=schemas.SubcategoriasUpsertRead)
+def upsert_subcats(form_id:int, body: schemas.IdsIn, response: Response, db: Session = Depends(get_db)):
+    version = proyecto_service.replace_subcategorias(db, form_id, body.ids or [])
+    _version_o_404(form_id, version, response)
+    return schemas.SubcategoriasUpsertRead(
+        id=form_id, version=version,
+        subcategorias=[
+            schemas.SubcategoriaRead(id=x.id, id_categoria=x.id_categoria, nombre_subcategoria=x.nombre_subcategoria)
+            for x in proyecto_service.listar_subcategorias_por_formulario(db, form_id)
+        ],
+    )
 
 @router.get("/lista")
-def listar_proyectos_api(
+async def listar_proyectos_api(
     nombre: str | None = None,
     cod_id_mga: str | None = Query(None),
     id_dependencia: int | None = Query(None),
     page: int = Query(1, ge=1),
     page_size: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    rows, total = proyecto_service.listar_proyectos_pag(db, nombre, cod_id_mga, id_dependencia, page, page_size)
+    rows, total = await proyecto_service.listar_proyectos_pag_async(db, nombre, cod_id_mga, id_dependencia, page, page_size)
     items = [
         {"id": r.id, "nombre": r.nombre_proyecto, "cod_id_mga": r.cod_id_mga, "id_dependencia": r.id_dependencia}
         for r in rows
     ]
     return {"items": items, "total": total, "page": page, "page_size": page_size}
 
+@router.get("/lista/exportar")
+def exportar_proyectos_api(
+    formato: str = Query("csv", pattern="^(csv|xlsx)$"),
+    nombre: str | None = None,
+    cod_id_mga: str | None = Query(None),
+    id_dependencia: int | None = Query(None),
+):
+    if formato == "xlsx":
+        contenido = exportacion_service.exportar_xlsx(SessionLocal, nombre, cod_id_mga, id_dependencia)
+        media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    else:
+        contenido = exportacion_service.exportar_csv(SessionLocal, nombre, cod_id_mga, id_dependencia)
+        media_type = "text/csv; charset=utf-8"
+    return StreamingResponse(
+        contenido,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="proyectos.{formato}"'},
+    )
+
 @router.post("/formulario/minimo", response_model=schemas.FormularioId)
 def crear_minimo(payload: schemas.FormularioCreateMinimo, db: Session = Depends(get_db)):
     form = proyecto_service.crear_formulario_minimo(db, payload)
     return schemas.FormularioId(id=form.id)
 
 @router.get("/viabilidad", response_model=List[schemas.ViabilidadRead])
-def viabilidad(db: Session = Depends(get_db)):
-    return proyecto_service.listar_viabilidad(db)
+async def viabilidad(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await _catalogo(request, db, "viabilidad")
 
 @router.get("/tipos_viabilidad", response_model=List[schemas.TipoViabilidadRead])
-def tipos_viabilidad(db: Session = Depends(get_db)):
-    return proyecto_service.listar_tipos_viabilidad(db)
-
-@router.put("/formulario/{form_id}/viabilidades", response_model=schemas.FormularioRead)
-def upsert_viabilidades(form_id:int, body: schemas.IdsIn, db: Session = Depends(get_db)):
-    proyecto_service.replace_viabilidades(db, form_id, body.ids or [])
-    return obtener_formulario(form_id, db)
+async def tipos_viabilidad(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await _catalogo(request, db, "tipos_viabilidad")
+
+@router.put("/formulario/{form_id}/viabilidades", response_model=schemas.ViabilidadesUpsertRead)
+def upsert_viabilidades(form_id:int, body: schemas.IdsIn, response: Response, db: Session = Depends(get_db)):
+    version = proyecto_service.replace_viabilidades(db, form_id, body.ids or [])
+    _version_o_404(form_id, version, response)
+    return schemas.ViabilidadesUpsertRead(
+        id=form_id, version=version,
+        viabilidades=[
+            schemas.ViabilidadRead(id=v.id, nombre=v.nombre)
+            for v in proyecto_service.listar_viabilidades_por_formulario(db, form_id)
+        ],
+    )
 
-@router.put("/formulario/{form_id}/funcionarios-viabilidad", response_model=schemas.FormularioRead)
-def upsert_funcionarios_viabilidad(form_id:int, body: schemas.FuncionariosViabilidadUpsertIn, db: Session = Depends(get_db)):
+@router.put("/formulario/{form_id}/funcionarios-viabilidad", response_model=schemas.FuncionariosViabilidadUpsertRead)
+def upsert_funcionarios_viabilidad(form_id:int, body: schemas.FuncionariosViabilidadUpsertIn, response: Response, db: Session = Depends(get_db)):
     filas = getattr(body, "funcionarios", []) or []
-    proyecto_service.replace_funcionarios_viabilidad(db, form_id, [f.dict() for f in filas])
-    return obtener_formulario(form_id, db)
+    version = proyecto_service.replace_funcionarios_viabilidad(db, form_id, [f.dict() for f in filas])
+    _version_o_404(form_id, version, response)
+    return schemas.FuncionariosViabilidadUpsertRead(
+        id=form_id, version=version,
+        funcionarios_viabilidad=[
+            schemas.FuncionarioViabilidadIn(id_tipo_viabilidad=f.id_tipo_viabilidad, nombre=f.nombre, cargo=f.cargo)
+            for f in proyecto_service.listar_funcionarios_viabilidad(db, form_id)
+        ],
+    )
 
 @router.get("/formulario/{form_id}/variables-sectorial-respuestas", response_model=list[schemas.VarRespuestaRead])
 def get_vars_sec_resp(form_id:int, db:Session=Depends(get_db)):
@@ -346,10 +476,11 @@ def get_vars_sec_resp(form_id:int, db:Session=Depends(get_db)):
     return out
 
 @router.put("/formulario/{form_id}/variables-sectorial-respuestas")
-def put_vars_sec_resp(form_id:int, body:schemas.VarsRespuestaUpsertIn, db:Session=Depends(get_db)):
+def put_vars_sec_resp(form_id:int, body:schemas.VarsRespuestaUpsertIn, response: Response, db:Session=Depends(get_db)):
     pares = [(int(x.id), (x.respuesta or "").upper()) for x in (body.respuestas or [])]
-    proyecto_service.upsert_respuestas_sectorial(db, form_id, pares)
-    return {"ok": True}
+    version = proyecto_service.upsert_respuestas_sectorial(db, form_id, pares)
+    _version_o_404(form_id, version, response)
+    return {"ok": True, "id": form_id, "version": version}
 
 @router.get("/formulario/{form_id}/variables-tecnico-respuestas", response_model=list[schemas.VarRespuestaRead])
 def get_vars_tec_resp(form_id:int, db:Session=Depends(get_db)):
@@ -360,10 +491,11 @@ def get_vars_tec_resp(form_id:int, db:Session=Depends(get_db)):
     return [schemas.VarRespuestaRead(id=v.id, nombre=v.nombre_variable, no_aplica=bool(v.no_aplica), respuesta=res.get(v.id)) for v in cat]
 
 @router.put("/formulario/{form_id}/variables-tecnico-respuestas")
-def put_vars_tec_resp(form_id:int, body:schemas.VarsRespuestaUpsertIn, db:Session=Depends(get_db)):
+def put_vars_tec_resp(form_id:int, body:schemas.VarsRespuestaUpsertIn, response: Response, db:Session=Depends(get_db)):
     pares = [(int(x.id), (x.respuesta or "").upper()) for x in (body.respuestas or [])]
-    proyecto_service.upsert_respuestas_tecnico(db, form_id, pares)
-    return {"ok": True}
+    version = proyecto_service.upsert_respuestas_tecnico(db, form_id, pares)
+    _version_o_404(form_id, version, response)
+    return {"ok": True, "id": form_id, "version": version}
 
 @router.get("/formulario/{form_id}/viabilidades-respuestas", response_model=list[schemas.VarRespuestaRead])
 def get_viab_resp(form_id:int, db:Session=Depends(get_db)):
@@ -374,10 +506,11 @@ def get_viab_resp(form_id:int, db:Session=Depends(get_db)):
     return [schemas.VarRespuestaRead(id=v.id, nombre=v.nombre, no_aplica=bool(v.no_aplica), respuesta=res.get(v.id)) for v in cat]
 
 @router.put("/formulario/{form_id}/viabilidades-respuestas")
-def put_viab_resp(form_id:int, body:schemas.VarsRespuestaUpsertIn, db:Session=Depends(get_db)):
+def put_viab_resp(form_id:int, body:schemas.VarsRespuestaUpsertIn, response: Response, db:Session=Depends(get_db)):
     pares = [(int(x.id), (x.respuesta or "").upper()) for x in (body.respuestas or [])]
-    proyecto_service.upsert_respuestas_viab(db, form_id, pares)
-    return {"ok": True}
+    version = proyecto_service.upsert_respuestas_viab(db, form_id, pares)
+    _version_o_404(form_id, version, response)
+    return {"ok": True, "id": form_id, "version": version}
 
 
 @router.post("/formulario/{form_id}/observaciones", response_model=schemas.ObservacionEvaluacionRead)
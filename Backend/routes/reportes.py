@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncSession
+from Backend.utils.database import get_async_db
+from Backend.routes.metricas import requiere_admin
+from Backend.services import reportes_service
+
+router = APIRouter(prefix="/reportes", tags=["reportes"])
+
+def _dimensiones(agrupar: str) -> list[str]:
+    dims = [d.strip() for d in agrupar.split(",") if d.strip()]
+    invalidas = [d for d in dims if d not in reportes_service.DIMENSIONES]
+    if invalidas:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Dimensiones no validas: {', '.join(invalidas)}. Use: {', '.join(reportes_service.DIMENSIONES)}",
+        )
+    return list(dict.fromkeys(dims))
+
+# Los id 0 (y anio 0) agrupan los formularios sin ese dato
+@router.get("/financiero")
+async def resumen_financiero(
+    agrupar: str = Query("anio,entidad"),
+    anio: int | None = Query(None),
+    entidad: str | None = Query(None),
+    id_dependencia: int | None = Query(None),
+    id_sector: int | None = Query(None),
+    id_linea_estrategica: int | None = Query(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        return await reportes_service.resumen_financiero(
+            db, _dimensiones(agrupar), anio, entidad, id_dependencia, id_sector, id_linea_estrategica
+        )
+    except ProgrammingError:
+        raise HTTPException(status_code=503, detail="Falta mv_resumen_financiero (Migrations/06_mv_resumen_financiero.sql)")
+
+@router.post("/financiero/refrescar", dependencies=[Depends(requiere_admin)])
+def refrescar_resumen_financiero():
+    return {"actualizado": reportes_service.refrescar().isoformat()}
+
+@router.get("/cobertura-metas")
+async def cobertura_metas(
+    nivel: str = Query("meta", pattern="^(meta|programa|sector)$"),
+    id_sector: int | None = Query(None),
+    id_programa: int | None = Query(None),
+    solo_sin_cubrir: bool = False,
+    db: AsyncSession = Depends(get_async_db),
+):
+    filas = (await reportes_service.cobertura_metas(db))[nivel]
+    if id_sector is not None:
+        filas = [f for f in filas if (f["id"] if nivel == "sector" else f["id_sector"]) == id_sector]
+    if id_programa is not None and nivel != "sector":
+        filas = [f for f in filas if (f["id"] if nivel == "programa" else f["id_programa"]) == id_programa]
+    if solo_sin_cubrir:
+        filas = [f for f in filas if not f["proyectos"]]
+    return {"nivel": nivel, "total": len(filas), "filas": filas}
@@ -0,0 +1,19 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from Backend.services import salud_service
+
+router = APIRouter(prefix="/health", tags=["salud"])
+
+
+# Liveness: el proceso y su event loop responden; no depende de la base ni de Chromium
+@router.get("/live")
+async def live():
+    return {"status": "ok"}
+
+
+# Readiness: 503 mientras corre el precalentamiento, si falla un subsistema critico o si la
+# replica esta saturada, para que el balanceador deje de enrutarle solicitudes
+@router.get("/ready")
+def ready():
+    estado = salud_service.ready()
+    return JSONResponse(estado, status_code=200 if estado["listo"] else 503)
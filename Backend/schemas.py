@@ -157,6 +157,7 @@ class FormularioRead(BaseModel):
     soportes_planos: int = 0
     soportes_cds: int = 0
     soportes_otros: int = 0
+    version: Optional[int] = None
 
 class ProyectoListRead(BaseModel):
     nombre: str
@@ -264,3 +265,57 @@ class ObservacionEvaluacionRead(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class FormularioVersion(BaseModel):
+    id: int
+    version: int
+
+class BasicosUpsertRead(FormularioVersion):
+    nombre_proyecto: str
+    cod_id_mga: int
+    id_dependencia: Optional[int] = None
+    id_linea_estrategica: Optional[int] = None
+    id_programa: Optional[int] = None
+    id_sector: Optional[int] = None
+    nombre_secretario: Optional[str] = None
+    fuentes: Optional[str] = None
+    duracion_proyecto: Optional[int] = None
+    cantidad_beneficiarios: Optional[int] = None
+    cargo_responsable: Optional[str] = None
+
+class RadicacionUpsertRead(FormularioVersion):
+    numero_radicacion: Optional[str] = None
+    fecha_radicacion: Optional[date] = None
+    bpin: Optional[str] = None
+    soportes_folios: int = 0
+    soportes_planos: int = 0
+    soportes_cds: int = 0
+    soportes_otros: int = 0
+
+class MetasUpsertRead(FormularioVersion):
+    metas: List[MetaRead] = []
+
+class EstructuraFinancieraUpsertRead(FormularioVersion):
+    estructura_financiera: List[EstructuraFinancieraRow] = []
+
+class VariablesSectorialUpsertRead(FormularioVersion):
+    variables_sectorial: List[VariableSectorialRead] = []
+
+class VariablesTecnicoUpsertRead(FormularioVersion):
+    variables_tecnico: List[VariableTecnicoRead] = []
+
+class PoliticasUpsertRead(FormularioVersion):
+    politicas: List[PoliticaRead] = []
+
+class CategoriasUpsertRead(FormularioVersion):
+    categorias: List[CategoriaRead] = []
+
+class SubcategoriasUpsertRead(FormularioVersion):
+    subcategorias: List[SubcategoriaRead] = []
+
+class ViabilidadesUpsertRead(FormularioVersion):
+    viabilidades: List[ViabilidadRead] = []
+
+class FuncionariosViabilidadUpsertRead(FormularioVersion):
+    funcionarios_viabilidad: List[FuncionarioViabilidadIn] = []
@@ -0,0 +1,309 @@
+"""Benchmark de generacion de documentos sin base de datos.
+
+    python -m Backend.scripts.benchmark_documentos [--metas 1,5,20,50] [--anios 1,4] [--salida res.json]
+    python -m Backend.scripts.benchmark_documentos --comparar base.json [--umbral 10]
+
+Arma contextos sinteticos (N metas, M anios de estructura financiera con todas las entidades)
+y llama directamente a las funciones de llenado: fill_from_template, fill_cadena_valor,
+fill_viabilidad_dependencias, fill_docx por plantilla y _render_evaluador_filled_content por
+plantilla HTML. Por caso mide tiempo (una corrida de calentamiento y luego --repeticiones),
+pico de memoria con tracemalloc (corrida aparte, para no inflar los tiempos) y tamano de la
+salida. El JSON resultante (por defecto <tmp>/benchmark_documentos.json) se puede comparar con
+el de otra corrida con --comparar.
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from Backend.services import descarga_service as ds
+from Backend.services.excel_fill import fill_cadena_valor, fill_from_template, fill_viabilidad_dependencias
+from Backend.services.word_fill import fill_docx
+
+ENTIDADES = [
+    "PROPIOS", "SGP_LIBRE_INVERSION", "SGP_LIBRE_DESTINACION", "SGP_APSB", "SGP_EDUCACION",
+    "SGP_ALIMENTACION_ESCOLAR", "SGP_CULTURA", "SGP_DEPORTE", "SGP_SALUD", "MUNICIPIO", "NACION", "OTROS",
+]
+_TEXTO = "Fortalecer la capacidad institucional para la gestion integral del territorio"
+
+
+# =========================
+# Contextos sinteticos
+# =========================
+def base_sintetica(n_metas: int, n_anios: int) -> dict:
+    """Mismo formato que descarga_service._fetch_base_contexts."""
+    metas = [{
+        "numero": 100 + i,
+        "nombre": f"{_TEXTO} - meta {i}",
+        "meta_proyecto": str(i * 10),
+        "codigo_producto": 4001000 + i,
+        "nombre_producto": f"Servicio de asistencia tecnica {i}",
+        "unidad_medida": "Numero",
+        "codigo_indicador_producto": 400100100 + i,
+        "nombre_indicador_producto": f"Entidades asistidas tecnicamente {i}",
+    } for i in range(1, n_metas + 1)]
+    ef = [
+        {"anio": 2024 + a, "entidad": ent, "valor": Decimal(1_000_000 * (a + 1) + 1_000 * k)}
+        for a in range(n_anios) for k, ent in enumerate(ENTIDADES)
+    ]
+    return {
+        "form_id": 0,
+        "nombre_proyecto": f"{_TEXTO} en el departamento",
+        "cod_id_mga": 1234567,
+        "numero_radicacion": "RAD-2025-0001",
+        "fecha_radicacion": date(2025, 3, 14),
+        "bpin": "2025000100001",
+        "soportes_folios": 120, "soportes_planos": 3, "soportes_cds": 1, "soportes_otros": 0,
+        "id_dependencia": 1,
+        "nombre_dependencia": "Secretaria de Planeacion",
+        "codigo_sector": "45", "nombre_sector": "Gobierno territorial",
+        "codigo_programa": "4599", "nombre_programa": "Fortalecimiento a la gestion y direccion",
+        "nombre_linea_estrategica": "Gobernanza",
+        "cargo_responsable": "Secretario de Despacho",
+        "nombre_secretario": "Nombre Apellido",
+        "fuentes": "Recursos propios",
+        "duracion_proyecto": n_anios,
+        "cantidad_beneficiarios": 25000,
+        "metas": metas,
+        "estructura_financiera": ef,
+        "politicas": [{"nombre": f"Politica {i}", "valor": Decimal(5_000_000)} for i in range(2)],
+        "categorias": [{"id": i, "nombre": f"Categoria {i}", "id_politica": i} for i in range(2)],
+        "subcategorias": [{"id": i, "nombre": f"Subcategoria {i}", "id_categoria": i} for i in range(2)],
+        "variables_sectorial": [True] * 9,
+        "variables_sectorial_respuestas": ["SI"] * 9,
+        "variables_tecnico": [True] * 13,
+        "variables_tecnico_respuestas": ["SI"] * 13,
+    }
+
+
+def _datos_viabilidad(base: dict) -> dict:
+    # contexto_viabilidad_dependencias consulta la BD; se arma el mismo dict a mano
+    ef = base["estructura_financiera"]
+    anios = sorted({r["anio"] for r in ef})[:4]
+    anios += [None] * (4 - len(anios))
+    return {
+        "dependencia": base["nombre_dependencia"],
+        "nombre_proyecto": base["nombre_proyecto"],
+        "cod_id_mga": base["cod_id_mga"],
+        "anios": anios,
+        "estructura_financiera": {(r["anio"], r["entidad"]): r["valor"] for r in ef},
+        "viabilidades_respuestas": {i: "SI" for i in range(1, 7)},
+        "funcionarios": {i: {"nombre": f"Funcionario {i}", "cargo": "Profesional"} for i in (1, 2, 3)},
+        "nombre_secretario": base["nombre_secretario"],
+        "fecha_actual": "14 de marzo del 2025",
+        "metas": [{
+            "numero_meta": m["numero"], "nombre_meta": m["nombre"],
+            "codigo_producto": m["codigo_producto"], "nombre_producto": m["nombre_producto"],
+            "codigo_indicador_producto": m["codigo_indicador_producto"],
+            "nombre_indicador_producto": m["nombre_indicador_producto"],
+        } for m in base["metas"]],
+        "proyecto_fortalecimiento": "NO",
+    }
+
+
+def _contexto_carta(base: dict) -> dict:
+    # Equivalente a contexto_word_carta sin las consultas (_merge_ctx_carta, personas, lema)
+    ctx = ds._context_word_common(base)
+    ctx.update({"gobernador": "Nombre Gobernador", "jefe_oap": "Nombre Jefe", "Periodo": "2024-2027", "lema_periodo": "Lema"})
+    anios = sorted({r["anio"] for r in base["estructura_financiera"]})
+    anios = (anios + [anios[-1] + i + 1 for i in range(4)])[:4] if anios else [2025, 2026, 2027, 2028]
+    for i, a in enumerate(anios, start=1):
+        ctx[f"anio_{i}"] = str(a)
+    for r in base["estructura_financiera"]:
+        if r["anio"] in anios:
+            ctx[f"valor_{r['entidad'].lower()}_{anios.index(r['anio']) + 1}"] = ds._fmt(float(r["valor"]))
+    metas_ctx = [{
+        "cod_meta": m["numero"], "meta": m["nombre"],
+        "cod_producto": m["codigo_producto"], "producto": m["nombre_producto"],
+        "cod_indicador_producto": m["codigo_indicador_producto"], "indicador_producto": m["nombre_indicador_producto"],
+    } for m in base["metas"]]
+    for i, m in enumerate(metas_ctx, start=1):
+        for k, v in m.items():
+            ctx[f"{k}_{i}"] = v
+    ctx["__metas_ctx__"] = metas_ctx
+    if metas_ctx:
+        ctx.update(metas_ctx[0])
+    return ctx
+
+
+def _entradas_evaluador(base: dict) -> dict:
+    n = max(len(base["metas"]), 1)
+    return {
+        "contenido_html": "".join(f"<p>{_TEXTO} ({i}).</p>" for i in range(n)),
+        "nombre_evaluador": "Nombre Evaluador",
+        "cargo_evaluador": "Profesional Universitario",
+        "fecha_evaluador": "2025-03-14",
+        "indicadores_objetivo": [
+            {"indicador_objetivo_general": f"Indicador {i}", "unidad_medida": "Porcentaje", "meta_resultado": "100"}
+            for i in range(n)
+        ],
+        "productos_ajustados": [
+            {"descripcion": f"Producto {i}", "unidad_medida": "Numero", "meta_programada": "10", "meta_alcanzada": "8"}
+            for i in range(n)
+        ],
+        "resultados_ajustados": [
+            {"descripcion": f"Resultado {i}", "unidad_medida": "Numero", "meta_programada": "5", "meta_alcanzada": "5"}
+            for i in range(n)
+        ],
+        "concepto_tecnico_favorable_dep": "SI",
+        "concepto_sectorial_favorable_dep": "SI",
+        "proyecto_viable_dep": "SI",
+    }
+
+
+# =========================
+# Casos
+# =========================
+# Cada caso recibe (base, carpeta de salida) y devuelve el tamano en bytes de lo generado
+def _archivo(path: Path) -> int:
+    tamano = path.stat().st_size
+    path.unlink()
+    return tamano
+
+
+def _caso_evaluador(clave: str) -> Callable[[dict, Path], int]:
+    def _correr(base: dict, salida: Path) -> int:
+        html, _, _ = ds._render_evaluador_filled_content(None, 0, clave, base=base, **_entradas_evaluador(base))
+        return len(html.encode("utf-8"))
+    return _correr
+
+
+CASOS: Dict[str, Callable[[dict, Path], int]] = {
+    "excel.concepto": lambda base, salida: _archivo(fill_from_template(
+        ds.BASE_DIR, ds.contexto_excel_concepto(None, 0, base=base), force_index=1, output_dir=salida)),
+    "excel.cadena_valor": lambda base, salida: _archivo(fill_cadena_valor(
+        ds.BASE_DIR, ds.contexto_cadena_valor(None, 0, base=base), force_index=1, output_dir=salida)),
+    "excel.viabilidad": lambda base, salida: _archivo(fill_viabilidad_dependencias(
+        ds.BASE_DIR, _datos_viabilidad(base), force_index=1, output_dir=salida)),
+    "word.carta": lambda base, salida: _archivo(fill_docx(
+        ds.BASE_DIR, ds.TEMPLATE_MAP["carta"], _contexto_carta(base), output_dir=salida)),
+    "word.cert_precios": lambda base, salida: _archivo(fill_docx(
+        ds.BASE_DIR, ds.TEMPLATE_MAP["cert_precios"], ds._context_word_common(base), output_dir=salida)),
+    "word.no_doble_cofin": lambda base, salida: _archivo(fill_docx(
+        ds.BASE_DIR, ds.TEMPLATE_MAP["no_doble_cofin"], ds._context_word_common(base), output_dir=salida)),
+    **{f"html.{clave.replace('-', '_')}": _caso_evaluador(clave) for clave in ds._EVAL_TEMPLATE_MAP},
+}
+
+
+def medir(caso: Callable[[dict, Path], int], base: dict, salida: Path, repeticiones: int) -> dict:
+    tamano = caso(base, salida)  # calentamiento: plantillas en cache e imports resueltos
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        caso(base, salida)
+        tiempos.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        caso(base, salida)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "tiempo_s": {
+            "min": round(min(tiempos), 6),
+            "mediana": round(statistics.median(tiempos), 6),
+            "media": round(statistics.fmean(tiempos), 6),
+            "max": round(max(tiempos), 6),
+        },
+        "memoria_pico_kb": round(pico / 1024, 1),
+        "tamano_bytes": tamano,
+    }
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ds.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def ejecutar(metas: List[int], anios: List[int], casos: List[str], repeticiones: int) -> dict:
+    resultados = {}
+    with tempfile.TemporaryDirectory(prefix="bench_docs_") as tmp:
+        salida = Path(tmp)
+        for n_metas in metas:
+            for n_anios in anios:
+                base = base_sintetica(n_metas, n_anios)
+                for nombre in casos:
+                    clave = f"{nombre}/metas={n_metas}/anios={n_anios}"
+                    r = medir(CASOS[nombre], base, salida, repeticiones)
+                    resultados[clave] = {"documento": nombre, "metas": n_metas, "anios": n_anios, **r}
+                    print(f"{clave:<48} {r['tiempo_s']['mediana'] * 1000:9.1f} ms "
+                          f"{r['memoria_pico_kb']:10.1f} KB {r['tamano_bytes']:9d} B", flush=True)
+    return {
+        "version": 1,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "repeticiones": repeticiones,
+        "casos": resultados,
+    }
+
+
+def comparar(actual: dict, anterior: dict, umbral: float) -> List[str]:
+    """Imprime las diferencias por caso comun y devuelve los que empeoraron mas de umbral %."""
+    regresiones = []
+    print(f"\n{'caso':<48} {'tiempo':>18} {'memoria':>18}")
+    for clave, r in actual["casos"].items():
+        a = anterior.get("casos", {}).get(clave)
+        if a is None:
+            continue
+        dt = _delta(r["tiempo_s"]["mediana"], a["tiempo_s"]["mediana"])
+        dm = _delta(r["memoria_pico_kb"], a["memoria_pico_kb"])
+        marca = ""
+        if dt > umbral or dm > umbral:
+            regresiones.append(clave)
+            marca = "  <-- regresion"
+        print(f"{clave:<48} {dt:+17.1f}% {dm:+17.1f}%{marca}")
+    return regresiones
+
+
+def _delta(nuevo: float, viejo: float) -> float:
+    return (nuevo - viejo) * 100 / viejo if viejo else 0.0
+
+
+def _lista_enteros(valor: str) -> List[int]:
+    return [int(x) for x in valor.split(",") if x.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de llenado de plantillas con contextos sinteticos.")
+    parser.add_argument("--metas", type=_lista_enteros, default=[1, 5, 20, 50])
+    parser.add_argument("--anios", type=_lista_enteros, default=[1, 4], help="anios de estructura financiera")
+    parser.add_argument("--casos", default=",".join(CASOS), help="subconjunto separado por comas")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--salida", type=Path, default=Path(tempfile.gettempdir()) / "benchmark_documentos.json")
+    parser.add_argument("--comparar", type=Path, help="JSON de una corrida anterior")
+    parser.add_argument("--umbral", type=float, default=10.0, help="%% de empeoramiento que se reporta como regresion")
+    args = parser.parse_args(argv)
+
+    casos = [c.strip() for c in args.casos.split(",") if c.strip()]
+    desconocidos = [c for c in casos if c not in CASOS]
+    if desconocidos:
+        parser.error(f"casos desconocidos: {', '.join(desconocidos)} (disponibles: {', '.join(CASOS)})")
+
+    resultado = ejecutar(args.metas, args.anios, casos, max(args.repeticiones, 1))
+    args.salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultados en {args.salida}")
+
+    if args.comparar:
+        regresiones = comparar(resultado, json.loads(args.comparar.read_text(encoding="utf-8")), args.umbral)
+        if regresiones:
+            print(f"{len(regresiones)} caso(s) empeoraron mas de {args.umbral}%")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
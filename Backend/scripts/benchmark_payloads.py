@@ -0,0 +1,170 @@
+"""Benchmark de serializacion y compresion de respuestas JSON.
+
+    python -m Backend.scripts.benchmark_payloads [--metas 1,5,20,50] [--kbps 256,1024] [--salida res.json]
+    python -m Backend.scripts.benchmark_payloads --formularios 301,305   # payloads reales via la app (usa la BD)
+
+Payloads: FormularioRead sintetico con N metas (4 anios x todas las entidades de estructura
+financiera) y el {"html", "filename"} de /descarga/evaluador/template por plantilla. Por payload
+mide el render con JSONResponse (json de la stdlib) y ORJSONResponse, y para gzip (niveles 1/6/9)
+y brotli (calidades 4/11, si esta instalado) el tamano, el tiempo de compresion y la transferencia
+estimada en enlaces de --kbps. Resultados por defecto en <tmp>/benchmark_payloads.json.
+"""
+import argparse
+import gzip
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from fastapi.responses import JSONResponse, ORJSONResponse
+from Backend import schemas
+from Backend.scripts.benchmark_documentos import ENTIDADES, _TEXTO, _entradas_evaluador, _lista_enteros, base_sintetica
+from Backend.services import descarga_service as ds
+from Backend.utils.compresion import brotli
+
+COMPRESORES: Dict[str, Callable[[bytes], bytes]] = {
+    "gzip-1": lambda b: gzip.compress(b, compresslevel=1, mtime=0),
+    "gzip-6": lambda b: gzip.compress(b, compresslevel=6, mtime=0),
+    "gzip-9": lambda b: gzip.compress(b, compresslevel=9, mtime=0),
+}
+if brotli is not None:
+    COMPRESORES["br-4"] = lambda b: brotli.compress(b, quality=4)
+    COMPRESORES["br-11"] = lambda b: brotli.compress(b, quality=11)
+
+
+def formulario_sintetico(n_metas: int) -> dict:
+    """Contenido de GET /proyecto/formulario/{id} tal como lo entrega FastAPI al response class."""
+    modelo = schemas.FormularioRead(
+        id=1, nombre_proyecto=f"{_TEXTO} en el departamento", cod_id_mga=1234567, id_dependencia=1,
+        id_linea_estrategica=1, id_programa=1, id_sector=1, nombre_secretario="Nombre Apellido",
+        metas=[schemas.MetaRead(
+            id=i, numero_meta=100 + i, nombre_meta=f"{_TEXTO} - meta {i}", codigo_producto=4001000 + i,
+            nombre_producto=f"Servicio de asistencia tecnica {i}", unidad_medida="Numero",
+            codigo_indicador_producto=400100100 + i, nombre_indicador_producto=f"Entidades asistidas tecnicamente {i}",
+            meta_proyecto=str(i * 10),
+        ) for i in range(1, n_metas + 1)],
+        variables_sectorial=[schemas.VariableSectorialRead(id=i, nombre_variable=f"{_TEXTO} (variable sectorial {i})") for i in range(1, 10)],
+        variables_tecnico=[schemas.VariableTecnicoRead(id=i, nombre_variable=f"{_TEXTO} (variable tecnica {i})") for i in range(1, 14)],
+        estructura_financiera=[
+            schemas.EstructuraFinancieraRow(id=a * 100 + k, anio=2024 + a, entidad=ent, valor=Decimal(1_000_000 * (a + 1) + 1_000 * k))
+            for a in range(4) for k, ent in enumerate(ENTIDADES)
+        ],
+        viabilidades=[schemas.ViabilidadRead(id=i, nombre=f"Viabilidad {i}") for i in range(1, 7)],
+        funcionarios_viabilidad=[
+            schemas.FuncionarioViabilidadIn(id_tipo_viabilidad=i, nombre=f"Funcionario {i}", cargo="Profesional") for i in (1, 2, 3)
+        ],
+        fuentes="Recursos propios", duracion_proyecto=4, cantidad_beneficiarios=25000,
+        cargo_responsable="Secretario de Despacho", numero_radicacion="RAD-2025-0001",
+        fecha_radicacion=date(2025, 3, 14), bpin="2025000100001", soportes_folios=120, version=3,
+    )
+    return modelo.model_dump(mode="json")
+
+
+def evaluador_sintetico(clave: str, n_metas: int) -> dict:
+    base = base_sintetica(n_metas, 4)
+    html, filename, _ = ds._render_evaluador_filled_content(None, 0, clave, base=base, **_entradas_evaluador(base))
+    return {"html": html, "filename": filename}
+
+
+def formularios_reales(ids: List[int]) -> Dict[str, dict]:
+    from fastapi.testclient import TestClient
+    from Backend.main import app
+    cliente = TestClient(app)
+    payloads = {}
+    for form_id in ids:
+        r = cliente.get(f"/proyecto/formulario/{form_id}", headers={"Accept-Encoding": "identity"})
+        r.raise_for_status()
+        payloads[f"formulario/id={form_id}"] = r.json()
+    return payloads
+
+
+def _mediana_ms(fn: Callable[[], object], repeticiones: int) -> float:
+    fn()  # calentamiento
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - t0)
+    return round(statistics.median(tiempos) * 1000, 3)
+
+
+def medir(contenido: dict, repeticiones: int, kbps: List[int]) -> dict:
+    cuerpo = ORJSONResponse(contenido).body
+    r = {
+        "bytes": len(cuerpo),
+        "json_ms": _mediana_ms(lambda: JSONResponse(contenido).body, repeticiones),
+        "orjson_ms": _mediana_ms(lambda: ORJSONResponse(contenido).body, repeticiones),
+        "compresion": {},
+    }
+    for nombre, comprimir in COMPRESORES.items():
+        salida = comprimir(cuerpo)
+        r["compresion"][nombre] = {
+            "bytes": len(salida),
+            "ratio": round(len(cuerpo) / len(salida), 2),
+            "ms": _mediana_ms(lambda: comprimir(cuerpo), repeticiones),
+        }
+    r["transferencia_ms"] = {
+        str(k): {"identity": _transferencia_ms(len(cuerpo), k),
+                 **{n: _transferencia_ms(c["bytes"], k) for n, c in r["compresion"].items()}}
+        for k in kbps
+    }
+    return r
+
+
+def _transferencia_ms(n_bytes: int, kbps: int) -> float:
+    return round(n_bytes * 8 / kbps, 1)
+
+
+def ejecutar(payloads: Dict[str, dict], repeticiones: int, kbps: List[int]) -> dict:
+    resultados = {}
+    print(f"{'payload':<40} {'bytes':>9} {'json':>8} {'orjson':>8}  " + "  ".join(f"{n:>16}" for n in COMPRESORES))
+    for clave, contenido in payloads.items():
+        r = medir(contenido, repeticiones, kbps)
+        resultados[clave] = r
+        columnas = "  ".join(f"{c['bytes']:>7} {c['ms']:>6.2f}ms" for c in r["compresion"].values())
+        print(f"{clave:<40} {r['bytes']:>9} {r['json_ms']:>6.2f}ms {r['orjson_ms']:>6.2f}ms  {columnas}", flush=True)
+    k = str(kbps[0])
+    print(f"\nTransferencia estimada a {k} kbps (ms)")
+    for clave, r in resultados.items():
+        print(f"{clave:<40} " + "  ".join(f"{n}={ms}" for n, ms in r["transferencia_ms"][k].items()))
+    return {
+        "version": 1,
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "brotli": brotli is not None,
+        "repeticiones": repeticiones,
+        "payloads": resultados,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark de serializacion y compresion de respuestas JSON.")
+    parser.add_argument("--metas", type=_lista_enteros, default=[1, 5, 20, 50])
+    parser.add_argument("--formularios", type=_lista_enteros, default=[], help="ids reales a leer via la app (requiere BD)")
+    parser.add_argument("--kbps", type=_lista_enteros, default=[256, 1024], help="enlaces para estimar la transferencia")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--salida", type=Path, default=Path(tempfile.gettempdir()) / "benchmark_payloads.json")
+    args = parser.parse_args(argv)
+
+    if args.formularios:
+        payloads = formularios_reales(args.formularios)
+    else:
+        payloads = {f"formulario/metas={n}": formulario_sintetico(n) for n in args.metas}
+        for clave in ds._EVAL_TEMPLATE_MAP:
+            for n in args.metas:
+                payloads[f"evaluador.{clave}/metas={n}"] = evaluador_sintetico(clave, n)
+
+    resultado = ejecutar(payloads, max(args.repeticiones, 1), args.kbps or [256])
+    args.salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nResultados en {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
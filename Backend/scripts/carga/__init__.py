@@ -0,0 +1,11 @@
+"""Pruebas de carga del API contra un Postgres local.
+
+    python -m Backend.scripts.carga.sembrar --formularios 500 [--migrar] [--limpiar]
+    python -m Backend.scripts.carga.correr --url http://localhost:8000 --usuarios 20 --duracion 120
+
+sembrar usa la configuracion DB_* del backend: con --migrar aplica Migrations/0*.sql sobre una
+base vacia (o desechable) y luego inserta formularios sinteticos con prefijo "CARGA". --migrar se
+niega con ENV=production o una base que no sea local salvo que se agregue --si-borrar. correr
+simula evaluadores concurrentes (un hilo por usuario, solo biblioteca estandar) con una mezcla
+de escenarios (escenarios.MEZCLA) y reporta throughput, latencias p50/p95/p99 y errores por ruta.
+"""
@@ -0,0 +1,211 @@
+"""Ejecuta la mezcla de escenarios contra el API (ver Backend/scripts/carga/__init__.py)."""
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+from Backend.scripts.carga import escenarios
+from Backend.scripts.carga.sembrar import PREFIJO
+
+
+class Cliente:
+    """Conexion keep-alive por usuario simulado; registra (etiqueta, estado, segundos) de cada solicitud."""
+
+    def __init__(self, url: str, timeout: float):
+        partes = urlsplit(url)
+        self._clase = http.client.HTTPSConnection if partes.scheme == "https" else http.client.HTTPConnection
+        self._host, self._timeout = partes.netloc, timeout
+        self._conn: Optional[http.client.HTTPConnection] = None
+        self._etags: Dict[str, str] = {}
+        self.muestras: List[Tuple[str, int, float]] = []
+
+    def pedir(self, metodo: str, ruta: str, etiqueta: str, cuerpo_json: object = None,
+              revalidar: bool = False) -> Tuple[int, Dict[str, str], bytes]:
+        cabeceras = {"Accept-Encoding": "gzip"}
+        cuerpo = None
+        if cuerpo_json is not None:
+            cuerpo = json.dumps(cuerpo_json).encode("utf-8")
+            cabeceras["Content-Type"] = "application/json"
+        if revalidar and ruta in self._etags:
+            cabeceras["If-None-Match"] = self._etags[ruta]
+        t0 = time.perf_counter()
+        try:
+            estado, resp_cabeceras, datos = self._enviar(metodo, ruta, cuerpo, cabeceras)
+        except Exception:
+            self.muestras.append((etiqueta, 0, time.perf_counter() - t0))  # 0 = error de red
+            return 0, {}, b""
+        self.muestras.append((etiqueta, estado, time.perf_counter() - t0))
+        if revalidar and "etag" in resp_cabeceras:
+            self._etags[ruta] = resp_cabeceras["etag"]
+        return estado, resp_cabeceras, datos
+
+    def _enviar(self, metodo, ruta, cuerpo, cabeceras):
+        for intento in (1, 2):
+            if self._conn is None:
+                self._conn = self._clase(self._host, timeout=self._timeout)
+            try:
+                self._conn.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+                resp = self._conn.getresponse()
+                datos = resp.read()
+                return resp.status, {k.lower(): v for k, v in resp.getheaders()}, datos
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # El servidor cerro la conexion keep-alive; se reintenta una vez con una nueva
+                self.cerrar()
+                if intento == 2:
+                    raise
+            except Exception:
+                self.cerrar()
+                raise
+
+    def cerrar(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def descubrir(url: str, timeout: float) -> escenarios.Datos:
+    cliente = Cliente(url, timeout)
+    estado, cab, cuerpo = cliente.pedir("GET", "/proyecto/catalogos", "-")
+    if estado != 200:
+        raise SystemExit(f"GET /proyecto/catalogos devolvio {estado}; el API esta arriba?")
+    catalogos = escenarios.json_de(cuerpo, cab)
+    formularios, pagina = [], 1
+    while True:
+        _, cab, cuerpo = cliente.pedir("GET", f"/proyecto/lista?nombre={PREFIJO}&page={pagina}&page_size=100", "-")
+        datos = escenarios.json_de(cuerpo, cab)
+        formularios += [p["id"] for p in datos["items"]]
+        if len(formularios) >= datos["total"] or not datos["items"]:
+            break
+        pagina += 1
+    cliente.cerrar()
+    if not formularios:
+        raise SystemExit(f"No hay formularios {PREFIJO}; ejecuta primero python -m Backend.scripts.carga.sembrar")
+    return escenarios.Datos(formularios, catalogos)
+
+
+def _usuario(n: int, url: str, timeout: float, datos: escenarios.Datos, mezcla: Dict[str, int],
+             fin: float, pausa: float, semilla: int, clientes: list) -> None:
+    rnd = random.Random(semilla + n)
+    cliente = Cliente(url, timeout)
+    clientes.append(cliente)
+    nombres, pesos = list(mezcla), list(mezcla.values())
+    # Arranque escalonado para no sincronizar a todos los usuarios en el primer segundo
+    time.sleep(rnd.uniform(0, min(pausa, 1.0)))
+    while time.monotonic() < fin:
+        escenarios.ESCENARIOS[rnd.choices(nombres, pesos)[0]](cliente, datos, rnd)
+        if pausa:
+            time.sleep(rnd.uniform(0, 2 * pausa))
+    cliente.cerrar()
+
+
+def percentil(ordenados: List[float], p: float) -> float:
+    if not ordenados:
+        return 0.0
+    k = (len(ordenados) - 1) * p / 100
+    i = int(k)
+    j = min(i + 1, len(ordenados) - 1)
+    return ordenados[i] + (ordenados[j] - ordenados[i]) * (k - i)
+
+
+def resumir(muestras: List[Tuple[str, int, float]], duracion: float) -> dict:
+    por_ruta: Dict[str, List[Tuple[int, float]]] = defaultdict(list)
+    for etiqueta, estado, seg in muestras:
+        por_ruta[etiqueta].append((estado, seg))
+    rutas = {}
+    for etiqueta, filas in sorted(por_ruta.items()):
+        tiempos = sorted(seg for _, seg in filas)
+        errores = sum(1 for estado, _ in filas if estado == 0 or estado >= 400)
+        rutas[etiqueta] = {
+            "solicitudes": len(filas),
+            "rps": round(len(filas) / duracion, 2),
+            "errores": errores,
+            "tasa_error": round(errores / len(filas), 4),
+            "p50_ms": round(percentil(tiempos, 50) * 1000, 1),
+            "p95_ms": round(percentil(tiempos, 95) * 1000, 1),
+            "p99_ms": round(percentil(tiempos, 99) * 1000, 1),
+            "max_ms": round(tiempos[-1] * 1000, 1),
+            "estados": dict(sorted(_contar(estado for estado, _ in filas).items())),
+        }
+    total = len(muestras)
+    errores = sum(r["errores"] for r in rutas.values())
+    tiempos = sorted(seg for _, _, seg in muestras)
+    return {
+        "duracion_s": round(duracion, 1),
+        "solicitudes": total,
+        "rps": round(total / duracion, 2) if duracion else 0.0,
+        "tasa_error": round(errores / total, 4) if total else 0.0,
+        "p50_ms": round(percentil(tiempos, 50) * 1000, 1),
+        "p95_ms": round(percentil(tiempos, 95) * 1000, 1),
+        "p99_ms": round(percentil(tiempos, 99) * 1000, 1),
+        "rutas": rutas,
+    }
+
+
+def _contar(valores) -> Dict[str, int]:
+    out: Dict[str, int] = defaultdict(int)
+    for v in valores:
+        out[str(v)] += 1
+    return out
+
+
+def imprimir(resumen: dict) -> None:
+    print(f"\n{'ruta':<62} {'n':>6} {'rps':>7} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for etiqueta, r in resumen["rutas"].items():
+        print(f"{etiqueta:<62} {r['solicitudes']:>6} {r['rps']:>7.2f} {r['tasa_error'] * 100:>6.2f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+    print(f"\nTotal: {resumen['solicitudes']} solicitudes en {resumen['duracion_s']} s = {resumen['rps']} req/s, "
+          f"errores {resumen['tasa_error'] * 100:.2f}%, p50 {resumen['p50_ms']} ms, "
+          f"p95 {resumen['p95_ms']} ms, p99 {resumen['p99_ms']} ms")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Prueba de carga con evaluadores simulados.")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--usuarios", type=int, default=10, help="evaluadores concurrentes (hilos)")
+    parser.add_argument("--duracion", type=float, default=60.0, help="segundos")
+    parser.add_argument("--pausa", type=float, default=0.5, help="pausa media entre pasos de un usuario (s)")
+    parser.add_argument("--mezcla", help="pesos, p. ej. autoguardado=60,descarga=40 (por defecto escenarios.MEZCLA)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--salida", help="guarda el resumen en JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        mezcla = escenarios.parsear_mezcla(args.mezcla)
+    except ValueError as e:
+        parser.error(str(e))
+    datos = descubrir(args.url, args.timeout)
+    print(f"{len(datos.formularios)} formularios, {args.usuarios} usuarios, {args.duracion:.0f} s, mezcla {mezcla}")
+
+    clientes: list = []
+    inicio = time.monotonic()
+    hilos = [
+        threading.Thread(
+            target=_usuario, daemon=True,
+            args=(n, args.url, args.timeout, datos, mezcla, inicio + args.duracion, args.pausa, args.semilla, clientes),
+        )
+        for n in range(args.usuarios)
+    ]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    duracion = time.monotonic() - inicio
+
+    resumen = resumir([m for c in clientes for m in c.muestras], duracion)
+    resumen.update(usuarios=args.usuarios, pausa_s=args.pausa, mezcla=mezcla)
+    imprimir(resumen)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resumen, f, indent=2, ensure_ascii=False)
+        print(f"Resumen en {args.salida}")
+    return 1 if resumen["tasa_error"] > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Escenarios de la prueba de carga: cada uno replica lo que hace el frontend en un paso del evaluador."""
+import gzip
+import json
+import random
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class Datos:
+    """Ids descubiertos al arrancar (formularios sembrados y catalogos)."""
+
+    def __init__(self, formularios: List[int], catalogos: dict):
+        self.formularios = formularios
+        self.programas = [p["id"] for l in catalogos["lineas"] for s in l["sectores"] for p in s["programas"]]
+        self.dependencias = [d["id"] for d in catalogos["dependencias"]]
+        self.variables_sectorial = [v["id"] for v in catalogos["variables_sectorial"]]
+        self.variables_tecnico = [v["id"] for v in catalogos["variables_tecnico"]]
+        self.viabilidad = [v["id"] for v in catalogos["viabilidad"]]
+
+
+def json_de(cuerpo: bytes, cabeceras: Dict[str, str]) -> object:
+    if cabeceras.get("content-encoding") == "gzip":
+        cuerpo = gzip.decompress(cuerpo)
+    return json.loads(cuerpo)
+
+
+# Cada escenario recibe (cliente, datos, rnd); el cliente registra cada solicitud con su etiqueta
+def catalogos(cliente, datos: Datos, rnd: random.Random) -> None:
+    # El navegador revalida el bootstrap con el ETag guardado
+    cliente.pedir("GET", "/proyecto/catalogos", "GET /proyecto/catalogos", revalidar=True)
+    cliente.pedir("GET", f"/proyecto/metas?programa_id={rnd.choice(datos.programas)}", "GET /proyecto/metas")
+
+
+def autoguardado(cliente, datos: Datos, rnd: random.Random) -> None:
+    fid = rnd.choice(datos.formularios)
+    estado, _, cuerpo = cliente.pedir("GET", f"/proyecto/formulario/{fid}", "GET /proyecto/formulario/{id}")
+    if estado != 200:
+        return
+    form = json.loads(cuerpo)
+    pasos = rnd.sample(_PASOS_WIZARD, k=rnd.randint(1, 3))
+    for etiqueta, ruta, armar in pasos:
+        cliente.pedir("PUT", ruta.format(id=fid), etiqueta, cuerpo_json=armar(form, datos, rnd))
+
+
+def busqueda(cliente, datos: Datos, rnd: random.Random) -> None:
+    palabra = rnd.choice(["proyecto", "construccion", "mejoramiento", "fortalecimiento", "dotacion", "1", "2"])
+    ruta = f"/proyecto/lista?nombre={palabra}&page={rnd.randint(1, 3)}&page_size=10"
+    if rnd.random() < 0.3:
+        ruta += f"&id_dependencia={rnd.choice(datos.dependencias)}"
+    cliente.pedir("GET", ruta, "GET /proyecto/lista")
+
+
+def descarga(cliente, datos: Datos, rnd: random.Random) -> None:
+    fid = rnd.choice(datos.formularios)
+    doc = rnd.choice(_DESCARGAS)
+    cliente.pedir("GET", doc.format(id=fid), "GET " + doc)
+
+
+_DESCARGAS = [
+    "/descarga/excel/concepto-tecnico-sectorial/{id}",
+    "/descarga/excel/cadena-valor/{id}",
+    "/descarga/excel/viabilidad-dependencias/{id}",
+    "/descarga/word/carta/{id}",
+]
+
+
+def _radicacion(form: dict, datos: Datos, rnd: random.Random) -> dict:
+    return {
+        "numero_radicacion": form.get("numero_radicacion"), "fecha_radicacion": form.get("fecha_radicacion"),
+        "bpin": form.get("bpin"), "soportes_folios": rnd.randint(1, 300), "soportes_planos": rnd.randint(0, 5),
+        "soportes_cds": rnd.randint(0, 2), "soportes_otros": 0,
+    }
+
+
+def _metas(form: dict, datos: Datos, rnd: random.Random) -> dict:
+    return {"metas": [{"id_meta": m["id"], "meta_proyecto": str(rnd.randint(1, 100))} for m in form.get("metas", [])]}
+
+
+def _estructura(form: dict, datos: Datos, rnd: random.Random) -> dict:
+    filas = [
+        {"anio": anio, "entidad": ent, "valor": rnd.randint(1, 500) * 100000}
+        for anio in (2024, 2025, 2026, 2027) for ent in ("PROPIOS", "SGP_LIBRE_INVERSION", "MUNICIPIO")
+    ]
+    return {"filas": filas}
+
+
+def _respuestas(ids_de: Callable[[Datos], List[int]]) -> Callable[[dict, Datos, random.Random], dict]:
+    def _armar(form: dict, datos: Datos, rnd: random.Random) -> dict:
+        return {"respuestas": [{"id": i, "respuesta": rnd.choice(["SI", "SI", "NO"])} for i in ids_de(datos)]}
+    return _armar
+
+
+_PASOS_WIZARD: List[Tuple[str, str, Callable[[dict, Datos, random.Random], dict]]] = [
+    ("PUT /proyecto/formulario/{id}/radicacion", "/proyecto/formulario/{id}/radicacion", _radicacion),
+    ("PUT /proyecto/formulario/{id}/metas", "/proyecto/formulario/{id}/metas", _metas),
+    ("PUT /proyecto/formulario/{id}/estructura-financiera", "/proyecto/formulario/{id}/estructura-financiera", _estructura),
+    ("PUT /proyecto/formulario/{id}/variables-sectorial-respuestas",
+     "/proyecto/formulario/{id}/variables-sectorial-respuestas", _respuestas(lambda d: d.variables_sectorial)),
+    ("PUT /proyecto/formulario/{id}/variables-tecnico-respuestas",
+     "/proyecto/formulario/{id}/variables-tecnico-respuestas", _respuestas(lambda d: d.variables_tecnico)),
+    ("PUT /proyecto/formulario/{id}/viabilidades-respuestas",
+     "/proyecto/formulario/{id}/viabilidades-respuestas", _respuestas(lambda d: d.viabilidad)),
+]
+
+ESCENARIOS: Dict[str, Callable] = {
+    "catalogos": catalogos,
+    "autoguardado": autoguardado,
+    "busqueda": busqueda,
+    "descarga": descarga,
+}
+
+# Pesos por defecto: un evaluador navega y guarda mucho mas de lo que descarga
+MEZCLA: Dict[str, int] = {"catalogos": 25, "autoguardado": 45, "busqueda": 20, "descarga": 10}
+
+
+def parsear_mezcla(valor: Optional[str]) -> Dict[str, int]:
+    """"autoguardado=60,descarga=40" -> {"autoguardado": 60, "descarga": 40}"""
+    if not valor:
+        return dict(MEZCLA)
+    mezcla = {}
+    for parte in valor.split(","):
+        nombre, _, peso = parte.partition("=")
+        nombre = nombre.strip()
+        if nombre not in ESCENARIOS:
+            raise ValueError(f"Escenario desconocido: {nombre} (disponibles: {', '.join(ESCENARIOS)})")
+        mezcla[nombre] = int(peso or 1)
+    return mezcla
@@ -0,0 +1,159 @@
+"""Prepara un Postgres local para pruebas de carga (ver Backend/scripts/carga/__init__.py)."""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+from sqlalchemy import text
+from Backend.utils.config import settings
+from Backend.utils.database import SessionLocal, engine
+
+MIGRACIONES = Path(__file__).resolve().parents[3] / "Migrations"
+PREFIJO = "CARGA"
+
+# 01_Tablas.sql empieza con DROP TABLE sin IF EXISTS (pensado para recrear una base existente);
+# sobre una base vacia se ejecutan como IF EXISTS ... CASCADE
+_DROP = re.compile(r"^DROP TABLE (\w+);", re.MULTILINE)
+
+# Tablas hijas que escriben la siembra y los escenarios de autoguardado
+_HIJAS = [
+    "metas", "estructura_financiera", "variables_sectorial", "variables_tecnico", "politicas",
+    "categorias", "subcategorias", "viabilidades", "funcionario_viabilidad",
+]
+
+_SQL_FORMULARIOS = """
+INSERT INTO formulario (
+    nombre_proyecto, cod_id_mga, numero_radicacion, fecha_radicacion, bpin,
+    soportes_folios, id_dependencia, id_linea_estrategica, id_programa, id_sector,
+    cargo_responsable, nombre_secretario, fuentes, duracion_proyecto, cantidad_beneficiarios
+)
+SELECT
+    :prefijo || ' ' || (ARRAY['Construccion','Mejoramiento','Fortalecimiento','Dotacion','Implementacion'])[1 + g % 5]
+        || ' proyecto ' || g,
+    900000 + g, 'RAD-' || g, current_date - (g % 365), '2025' || lpad(g::text, 9, '0'),
+    10 + g % 90,
+    (SELECT id FROM dependencia ORDER BY id OFFSET g % (SELECT count(*) FROM dependencia) LIMIT 1),
+    x.id_linea_estrategica, x.id_programa, x.id_sector,
+    'Secretario de Despacho', 'Secretario ' || g, 'Recursos propios', 1 + g % 4, 100 * g
+FROM generate_series(1, :n) g
+CROSS JOIN LATERAL (
+    SELECT p.id AS id_programa, p.id_sector, s.id_linea_estrategica
+    FROM programa p JOIN sector s ON s.id = p.id_sector
+    ORDER BY p.id OFFSET g % (SELECT count(*) FROM programa) LIMIT 1
+) x
+RETURNING id
+"""
+
+_SQL_HIJAS = [
+    # 1 a :metas_max metas del programa del formulario
+    """
+    INSERT INTO metas (id_meta, id_formulario, meta_proyecto)
+    SELECT m.id, f.id, (1 + f.id % 50)::text
+    FROM formulario f
+    CROSS JOIN LATERAL (
+        SELECT id FROM meta WHERE id_programa = f.id_programa ORDER BY id LIMIT 1 + f.id % :metas_max
+    ) m
+    WHERE f.id = ANY(:ids)
+    """,
+    # 4 anios x 3 entidades
+    """
+    INSERT INTO estructura_financiera (id_formulario, anio, entidad, valor)
+    SELECT f.id, 2024 + a, e, (f.id % 97 + 1) * 1000000 + a * 250000
+    FROM formulario f, generate_series(0, 3) a, unnest(ARRAY['PROPIOS','SGP_LIBRE_INVERSION','MUNICIPIO']) e
+    WHERE f.id = ANY(:ids)
+    """,
+    """
+    INSERT INTO variables_sectorial (id_variable_sectorial, id_formulario, respuesta)
+    SELECT v.id, f.id, CASE WHEN (f.id + v.id) % 4 = 0 THEN 'NO' ELSE 'SI' END
+    FROM formulario f, variable_sectorial v WHERE f.id = ANY(:ids)
+    """,
+    """
+    INSERT INTO variables_tecnico (id_variable_tecnico, id_formulario, respuesta)
+    SELECT v.id, f.id, CASE WHEN (f.id + v.id) % 5 = 0 THEN 'NO' ELSE 'SI' END
+    FROM formulario f, variable_tecnico v WHERE f.id = ANY(:ids)
+    """,
+    """
+    INSERT INTO viabilidades (id_viabilidad, id_formulario, respuesta)
+    SELECT v.id, f.id, 'SI' FROM formulario f, viabilidad v WHERE f.id = ANY(:ids)
+    """,
+]
+
+
+def _motivo_no_migrar() -> Optional[str]:
+    # --migrar hace DROP TABLE ... CASCADE de todo: solo sobre una base local fuera de produccion
+    host = engine.url.host or ""
+    if settings.ENV == "production":
+        return "ENV=production"
+    if host and not host.startswith("/") and host not in ("localhost", "127.0.0.1", "::1"):
+        return f"la base esta en {host}, no en este equipo"
+    return None
+
+
+def migrar() -> None:
+    for archivo in sorted(MIGRACIONES.glob("0*.sql")):
+        sql = _DROP.sub(r"DROP TABLE IF EXISTS \1 CASCADE;", archivo.read_text(encoding="utf-8"))
+        conn = engine.raw_connection()
+        try:
+            conn.driver_connection.autocommit = True
+            conn.driver_connection.execute(sql)
+        finally:
+            conn.close()
+        print(f"  {archivo.name}")
+
+
+def limpiar() -> int:
+    with SessionLocal() as db:
+        ids = [r[0] for r in db.execute(
+            text("SELECT id FROM formulario WHERE nombre_proyecto LIKE :p"), {"p": f"{PREFIJO} %"}
+        )]
+        if ids:
+            for tabla in _HIJAS:
+                db.execute(text(f"DELETE FROM {tabla} WHERE id_formulario = ANY(:ids)"), {"ids": ids})
+            db.execute(text("DELETE FROM formulario WHERE id = ANY(:ids)"), {"ids": ids})
+        db.commit()
+    return len(ids)
+
+
+def sembrar(n: int, metas_max: int) -> List[int]:
+    with SessionLocal() as db:
+        ids = [r[0] for r in db.execute(text(_SQL_FORMULARIOS), {"prefijo": PREFIJO, "n": n})]
+        for sql in _SQL_HIJAS:
+            db.execute(text(sql), {"ids": ids, "metas_max": metas_max})
+        db.commit()
+        try:
+            db.execute(text("REFRESH MATERIALIZED VIEW mv_resumen_financiero"))
+            db.commit()
+        except Exception:
+            db.rollback()  # base sin la migracion 06
+    return ids
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Siembra formularios sinteticos para pruebas de carga.")
+    parser.add_argument("--formularios", type=int, default=500)
+    parser.add_argument("--metas-max", type=int, default=8, help="metas por formulario: 1..N")
+    parser.add_argument("--migrar", action="store_true", help="aplica Migrations/0*.sql (borra y recrea las tablas)")
+    parser.add_argument("--si-borrar", action="store_true",
+                        help="permite --migrar con ENV=production o contra una base remota")
+    parser.add_argument("--limpiar", action="store_true", help="borra los formularios sembrados antes")
+    args = parser.parse_args(argv)
+
+    if args.migrar:
+        motivo = _motivo_no_migrar()
+        if motivo and not args.si_borrar:
+            parser.error(f"--migrar borra todas las tablas de {engine.url.database} y {motivo}; "
+                         "agrega --si-borrar si es lo que quieres")
+        print("Aplicando migraciones")
+        migrar()
+    if args.limpiar:
+        print(f"Borrados {limpiar()} formularios {PREFIJO}")
+    t0 = time.perf_counter()
+    ids = sembrar(args.formularios, max(args.metas_max, 1))
+    print(f"Sembrados {len(ids)} formularios ({ids[0] if ids else '-'}..{ids[-1] if ids else '-'}) "
+          f"en {time.perf_counter() - t0:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
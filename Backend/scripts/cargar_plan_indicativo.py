@@ -0,0 +1,298 @@
+"""Carga el PLAN INDICATIVO (hoja DATOS) en linea_estrategica / sector / programa / meta.
+
+    python -m Backend.scripts.cargar_plan_indicativo "PLAN INDICATIVO 2024 - 2027 PROCESADO.xlsx" [--dry-run]
+
+La hoja se lee en streaming (openpyxl read_only) y se copia con COPY a una tabla temporal;
+la fusion con los catalogos se hace con sentencias por conjuntos dentro de una sola
+transaccion. Las metas se identifican por numero_meta y se actualizan en su lugar, asi que
+las relaciones de metas (formularios) se conservan; las metas que ya no estan en el plan se
+reportan pero no se borran. Con --dry-run se ejecuta todo y se revierte al final.
+"""
+import argparse
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from openpyxl import load_workbook
+
+# columna de staging -> encabezado en la hoja DATOS
+COLUMNAS = {
+    "numero_meta": "numero_meta_de_producto",
+    "linea": "linea_estrategica",
+    "codigo_sector": "codigo_del_sector",
+    "nombre_sector": "sector",
+    "codigo_programa": "codigo_del_programa",
+    "nombre_programa": "programa_presupuestal",
+    "codigo_producto": "codigo_del_producto",
+    "nombre_producto": "producto",
+    "codigo_indicador_producto": "codigo_del_indicador_de_producto",
+    "nombre_indicador_producto": "indicador_de_producto",
+    "nombre_meta": "meta_de_producto_programada_al_cuatrienio",
+    "unidad_medida": "unidad_de_medida_producto_cuatrenio",
+}
+_ENTEROS = {"numero_meta", "codigo_sector", "codigo_programa", "codigo_producto", "codigo_indicador_producto"}
+
+_SQL_STAGING = """
+CREATE TEMP TABLE stg_plan_indicativo (
+    fila INT NOT NULL,
+    numero_meta INT,
+    linea TEXT,
+    codigo_sector INT,
+    nombre_sector TEXT,
+    codigo_programa INT,
+    nombre_programa TEXT,
+    codigo_producto INT,
+    nombre_producto TEXT,
+    codigo_indicador_producto INT,
+    nombre_indicador_producto TEXT,
+    nombre_meta TEXT,
+    unidad_medida TEXT,
+    id_linea INT,
+    id_sector INT,
+    id_programa INT
+) ON COMMIT DROP
+"""
+
+# (etiqueta del reporte, sentencia). Las que devuelven filas listan lo afectado.
+_FUSION: List[Tuple[str, str]] = [
+    ("lineas_nuevas", """
+        INSERT INTO linea_estrategica (nombre_linea_estrategica)
+        SELECT DISTINCT ON (lower(s.linea)) s.linea
+        FROM stg_plan_indicativo s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM linea_estrategica l
+            WHERE lower(trim(l.nombre_linea_estrategica)) = lower(s.linea)
+        )
+        ORDER BY lower(s.linea), s.fila
+        RETURNING nombre_linea_estrategica
+    """),
+    (None, """
+        UPDATE stg_plan_indicativo s SET id_linea = l.id
+        FROM (
+            SELECT lower(trim(nombre_linea_estrategica)) AS nombre, min(id) AS id
+            FROM linea_estrategica GROUP BY 1
+        ) l
+        WHERE l.nombre = lower(s.linea)
+    """),
+    ("sectores_nuevos", """
+        INSERT INTO sector (id_linea_estrategica, codigo_sector, nombre_sector)
+        SELECT DISTINCT ON (s.id_linea, s.codigo_sector) s.id_linea, s.codigo_sector, s.nombre_sector
+        FROM stg_plan_indicativo s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM sector x
+            WHERE x.id_linea_estrategica = s.id_linea AND x.codigo_sector = s.codigo_sector
+        )
+        ORDER BY s.id_linea, s.codigo_sector, s.fila
+        RETURNING codigo_sector::text || ' ' || nombre_sector
+    """),
+    ("sectores_renombrados", """
+        UPDATE sector x SET nombre_sector = s.nombre_sector
+        FROM (
+            SELECT DISTINCT ON (id_linea, codigo_sector) id_linea, codigo_sector, nombre_sector
+            FROM stg_plan_indicativo ORDER BY id_linea, codigo_sector, fila
+        ) s
+        WHERE x.id_linea_estrategica = s.id_linea AND x.codigo_sector = s.codigo_sector
+          AND x.nombre_sector IS DISTINCT FROM s.nombre_sector
+        RETURNING x.codigo_sector::text || ' ' || x.nombre_sector
+    """),
+    (None, """
+        UPDATE stg_plan_indicativo s SET id_sector = x.id
+        FROM (
+            SELECT id_linea_estrategica, codigo_sector, min(id) AS id
+            FROM sector GROUP BY 1, 2
+        ) x
+        WHERE x.id_linea_estrategica = s.id_linea AND x.codigo_sector = s.codigo_sector
+    """),
+    ("programas_nuevos", """
+        INSERT INTO programa (id_sector, codigo_programa, nombre_programa)
+        SELECT DISTINCT ON (s.id_sector, s.codigo_programa) s.id_sector, s.codigo_programa, s.nombre_programa
+        FROM stg_plan_indicativo s
+        WHERE NOT EXISTS (
+            SELECT 1 FROM programa p
+            WHERE p.id_sector = s.id_sector AND p.codigo_programa = s.codigo_programa
+        )
+        ORDER BY s.id_sector, s.codigo_programa, s.fila
+        RETURNING codigo_programa::text || ' ' || nombre_programa
+    """),
+    ("programas_renombrados", """
+        UPDATE programa p SET nombre_programa = s.nombre_programa
+        FROM (
+            SELECT DISTINCT ON (id_sector, codigo_programa) id_sector, codigo_programa, nombre_programa
+            FROM stg_plan_indicativo ORDER BY id_sector, codigo_programa, fila
+        ) s
+        WHERE p.id_sector = s.id_sector AND p.codigo_programa = s.codigo_programa
+          AND p.nombre_programa IS DISTINCT FROM s.nombre_programa
+        RETURNING p.codigo_programa::text || ' ' || p.nombre_programa
+    """),
+    (None, """
+        UPDATE stg_plan_indicativo s SET id_programa = p.id
+        FROM (
+            SELECT id_sector, codigo_programa, min(id) AS id
+            FROM programa GROUP BY 1, 2
+        ) p
+        WHERE p.id_sector = s.id_sector AND p.codigo_programa = s.codigo_programa
+    """),
+    ("metas_actualizadas", """
+        UPDATE meta m SET
+            id_programa = s.id_programa,
+            nombre_meta = s.nombre_meta,
+            codigo_producto = s.codigo_producto,
+            nombre_producto = s.nombre_producto,
+            unidad_medida = s.unidad_medida,
+            codigo_indicador_producto = s.codigo_indicador_producto,
+            nombre_indicador_producto = s.nombre_indicador_producto
+        FROM stg_plan_indicativo s
+        WHERE m.numero_meta = s.numero_meta
+          AND (m.id_programa, m.nombre_meta, m.codigo_producto, m.nombre_producto, m.unidad_medida,
+               m.codigo_indicador_producto, m.nombre_indicador_producto)
+              IS DISTINCT FROM
+              (s.id_programa, s.nombre_meta, s.codigo_producto, s.nombre_producto, s.unidad_medida,
+               s.codigo_indicador_producto, s.nombre_indicador_producto)
+        RETURNING m.numero_meta::text
+    """),
+    ("metas_nuevas", """
+        INSERT INTO meta (id_programa, numero_meta, nombre_meta, codigo_producto, nombre_producto,
+                          unidad_medida, codigo_indicador_producto, nombre_indicador_producto)
+        SELECT s.id_programa, s.numero_meta, s.nombre_meta, s.codigo_producto, s.nombre_producto,
+               s.unidad_medida, s.codigo_indicador_producto, s.nombre_indicador_producto
+        FROM stg_plan_indicativo s
+        WHERE NOT EXISTS (SELECT 1 FROM meta m WHERE m.numero_meta = s.numero_meta)
+        ORDER BY s.numero_meta
+        RETURNING numero_meta::text
+    """),
+    ("metas_fuera_del_plan", """
+        SELECT m.numero_meta::text || CASE WHEN EXISTS (SELECT 1 FROM metas r WHERE r.id_meta = m.id)
+                                           THEN ' (con proyectos)' ELSE '' END
+        FROM meta m
+        WHERE NOT EXISTS (SELECT 1 FROM stg_plan_indicativo s WHERE s.numero_meta = m.numero_meta)
+        ORDER BY m.numero_meta
+    """),
+]
+
+_SQL_VALIDACION = """
+SELECT 'numero_meta repetido: ' || numero_meta::text || ' (filas ' || string_agg(fila::text, ', ') || ')'
+FROM stg_plan_indicativo GROUP BY numero_meta HAVING count(*) > 1
+UNION ALL
+SELECT 'fila ' || fila::text || ': faltan datos obligatorios'
+FROM stg_plan_indicativo
+WHERE numero_meta IS NULL OR linea IS NULL OR codigo_sector IS NULL OR nombre_sector IS NULL
+   OR codigo_programa IS NULL OR nombre_programa IS NULL OR codigo_producto IS NULL
+   OR nombre_producto IS NULL OR codigo_indicador_producto IS NULL
+   OR nombre_indicador_producto IS NULL OR nombre_meta IS NULL
+"""
+
+
+def _texto(v) -> Optional[str]:
+    if v is None:
+        return None
+    return str(v).strip() or None
+
+
+def _entero(v) -> Optional[int]:
+    # Los codigos llegan como int, float o texto ('2201', '220100602')
+    if v is None or isinstance(v, bool):
+        return None
+    if isinstance(v, (int, float)):
+        return int(v)
+    s = str(v).strip()
+    try:
+        return int(float(s)) if s else None
+    except ValueError:
+        raise ValueError(f"valor no numerico: {v!r}")
+
+
+def leer_filas(path: Path, hoja: str = "DATOS") -> Iterator[tuple]:
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        filas = wb[hoja].iter_rows(values_only=True)
+        encabezado = [str(c).strip() if c is not None else "" for c in next(filas)]
+        faltantes = [h for h in COLUMNAS.values() if h not in encabezado]
+        if faltantes:
+            raise ValueError(f"La hoja {hoja} no tiene las columnas: {', '.join(faltantes)}")
+        indices = {col: encabezado.index(h) for col, h in COLUMNAS.items()}
+        for n, fila in enumerate(filas, start=2):
+            if all(v is None for v in fila):
+                continue
+            valores = []
+            for col, i in indices.items():
+                v = fila[i] if i < len(fila) else None
+                try:
+                    valores.append(_entero(v) if col in _ENTEROS else _texto(v))
+                except ValueError as e:
+                    raise ValueError(f"fila {n}, {COLUMNAS[col]}: {e}")
+            yield (n, *valores)
+    finally:
+        wb.close()
+
+
+def cargar(path: Path, dry_run: bool = False, hoja: str = "DATOS") -> Dict[str, List[str]]:
+    from Backend.utils.database import engine
+
+    reporte: Dict[str, List[str]] = defaultdict(list)
+    raw = engine.raw_connection()
+    try:
+        conn = raw.driver_connection
+        with conn.cursor() as cur:
+            cur.execute(_SQL_STAGING)
+            columnas = ", ".join(["fila", *COLUMNAS])
+            with cur.copy(f"COPY stg_plan_indicativo ({columnas}) FROM STDIN") as copy:
+                for fila in leer_filas(path, hoja):
+                    copy.write_row(fila)
+            cur.execute("ANALYZE stg_plan_indicativo")
+            cur.execute("SELECT count(*) FROM stg_plan_indicativo")
+            reporte["filas_leidas"] = [str(cur.fetchone()[0])]
+
+            cur.execute(_SQL_VALIDACION)
+            errores = [r[0] for r in cur.fetchall()]
+            if errores:
+                conn.rollback()
+                raise ValueError("Plan indicativo invalido:\n  " + "\n  ".join(errores))
+
+            for etiqueta, sql in _FUSION:
+                cur.execute(sql)
+                if etiqueta is not None:
+                    reporte[etiqueta] = [r[0] for r in cur.fetchall()]
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    except BaseException:
+        raw.driver_connection.rollback()
+        raise
+    finally:
+        raw.close()
+    return reporte
+
+
+def _imprimir(reporte: Dict[str, List[str]], dry_run: bool, detalle: int) -> None:
+    print(f"Filas leidas: {reporte['filas_leidas'][0]}")
+    for etiqueta, _sql in _FUSION:
+        if etiqueta is None:
+            continue
+        items = reporte.get(etiqueta, [])
+        print(f"{etiqueta}: {len(items)}")
+        for item in items[:detalle]:
+            print(f"    {item}")
+        if len(items) > detalle:
+            print(f"    ... y {len(items) - detalle} mas")
+    print("Simulacion: no se guardo ningun cambio." if dry_run else "Cambios confirmados.")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Carga el PLAN INDICATIVO en los catalogos de metas.")
+    parser.add_argument("archivo", type=Path)
+    parser.add_argument("--hoja", default="DATOS")
+    parser.add_argument("--dry-run", action="store_true", help="calcula el diff y revierte la transaccion")
+    parser.add_argument("--detalle", type=int, default=20, help="elementos listados por categoria")
+    args = parser.parse_args(argv)
+    try:
+        reporte = cargar(args.archivo, dry_run=args.dry_run, hoja=args.hoja)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    _imprimir(reporte, args.dry_run, args.detalle)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Mide el tiempo de importar el API (arranque en frio, sin tocar la base).
+
+    python -m Backend.scripts.tiempo_importacion [--modulo Backend.main] [--max-ms 2500] [--top 15]
+
+Importa el modulo en un interprete nuevo con -X importtime (--repeticiones veces, se toma la
+corrida mas rapida), muestra el total y los modulos con mayor tiempo propio, y falla (codigo 1)
+si se supera --max-ms o si quedo importado alguno de arranque.MODULOS_PESADOS (o playwright), que
+deben cargarse en la primera descarga y no al arrancar.
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple
+from Backend.utils.arranque import MODULOS_PESADOS
+
+RAIZ = Path(__file__).resolve().parents[2]
+PESADOS = MODULOS_PESADOS + ("playwright",)
+
+_SONDA = """
+import json, sys, time
+t0 = time.perf_counter()
+import {modulo}
+total = time.perf_counter() - t0
+print(json.dumps({{"total_ms": total * 1000, "pesados": [m for m in {pesados!r} if m in sys.modules]}}))
+"""
+
+
+def medir(modulo: str) -> Tuple[dict, List[Tuple[str, int, int]]]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _SONDA.format(modulo=modulo, pesados=PESADOS)],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"No se pudo importar {modulo}:\n{proc.stderr[-2000:]}")
+    # Lineas "import time: <propio us> | <acumulado us> | <modulo>"
+    filas = []
+    for linea in proc.stderr.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = (p.strip() for p in linea[len("import time:"):].split("|"))
+        filas.append((nombre, int(propio), int(acumulado)))
+    return json.loads(proc.stdout.strip().splitlines()[-1]), filas
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Tiempo de importacion del API.")
+    parser.add_argument("--modulo", default="Backend.main")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--max-ms", type=float, help="falla si la importacion tarda mas")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    corridas = [medir(args.modulo) for _ in range(max(args.repeticiones, 1))]
+    resultado, filas = min(corridas, key=lambda c: c[0]["total_ms"])
+
+    print(f"{'modulo':<60} {'propio ms':>10} {'acum. ms':>10}")
+    for nombre, propio, acumulado in sorted(filas, key=lambda f: f[1], reverse=True)[:args.top]:
+        print(f"{nombre.strip():<60} {propio / 1000:>10.1f} {acumulado / 1000:>10.1f}")
+    tiempos = ", ".join(f"{c[0]['total_ms']:.0f}" for c in corridas)
+    print(f"\nimport {args.modulo}: {resultado['total_ms']:.0f} ms (mejor de {len(corridas)}: {tiempos})")
+
+    fallo = False
+    if resultado["pesados"]:
+        print(f"ERROR: se importan al arrancar: {', '.join(resultado['pesados'])}")
+        fallo = True
+    if args.max_ms is not None and resultado["total_ms"] > args.max_ms:
+        print(f"ERROR: supera --max-ms {args.max_ms:.0f}")
+        fallo = True
+    return 1 if fallo else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
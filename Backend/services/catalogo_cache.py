@@ -0,0 +1,326 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from Backend.services import proyecto_service
+from Backend.utils import arranque
+from Backend.utils.config import settings
+from Backend.utils.database import SessionLocal
+from Backend.utils.http_cache import codificaciones_aceptadas
+
+try:
+    import brotli
+except ImportError:  # opcional: sin brotli solo se ofrece gzip
+    brotli = None
+
+# Los catalogos solo cambian cuando una migracion carga un nuevo plan indicativo,
+# asi que se leen una vez por proceso y se sirven desde memoria hasta invalidar()
+# o hasta que cambie la huella de las tablas.
+
+_lock = threading.Lock()          # protege el intercambio de snapshot/respuestas (sin I/O dentro)
+_carga_lock = threading.Lock()    # serializa las recargas desde hilos
+_bootstrap_lock = threading.Lock()  # una sola compresion del bootstrap a la vez (siempre fuera del event loop)
+_lock_async: Optional[asyncio.Lock] = None
+_snapshot: Optional[Dict[str, List[dict]]] = None
+_version: Optional[str] = None
+_huella: Optional[str] = None
+_huella_revisada: float = 0.0
+_respuestas: Dict[Tuple[str, Optional[int]], Tuple[bytes, str]] = {}
+_bootstrap: Optional[Dict[str, Tuple[bytes, str]]] = None
+
+_TABLAS_CATALOGO = (
+    "linea_estrategica", "sector", "programa", "meta", "dependencia",
+    "variable_sectorial", "variable_tecnico", "politica", "categoria",
+    "subcategoria", "viabilidad", "tipo_viabilidad",
+)
+
+# clave -> (campo de filtro en el snapshot, campos expuestos por el endpoint)
+_VISTAS: Dict[str, Tuple[Optional[str], Tuple[str, ...]]] = {
+    "lineas": (None, ("id", "nombre")),
+    "sectores": ("id_linea_estrategica", ("id", "codigo_sector", "nombre_sector")),
+    "programas": ("id_sector", ("id", "codigo_programa", "nombre_programa")),
+    "metas": ("id_programa", (
+        "id", "numero_meta", "nombre_meta", "codigo_producto", "nombre_producto",
+        "unidad_medida", "codigo_indicador_producto", "nombre_indicador_producto",
+    )),
+    "dependencias": (None, ("id", "nombre_dependencia")),
+    "variables_sectorial": (None, ("id", "nombre_variable")),
+    "variables_tecnico": (None, ("id", "nombre_variable")),
+    "politicas": (None, ("id", "nombre_politica")),
+    "categorias": ("id_politica", ("id", "id_politica", "nombre_categoria")),
+    "subcategorias": ("id_categoria", ("id", "id_categoria", "nombre_subcategoria")),
+    "viabilidad": (None, ("id", "nombre")),
+    "tipos_viabilidad": (None, ("id", "nombre")),
+}
+
+
+_FILAS = {
+    "lineas": lambda r: {"id": r.id, "nombre": r.nombre_linea_estrategica},
+    "sectores": lambda r: {"id": r.id, "id_linea_estrategica": r.id_linea_estrategica,
+                           "codigo_sector": r.codigo_sector, "nombre_sector": r.nombre_sector},
+    "programas": lambda r: {"id": r.id, "id_sector": r.id_sector,
+                            "codigo_programa": r.codigo_programa, "nombre_programa": r.nombre_programa},
+    "metas": lambda r: {"id": r.id, "id_programa": r.id_programa, "numero_meta": r.numero_meta,
+                        "nombre_meta": r.nombre_meta, "codigo_producto": r.codigo_producto,
+                        "nombre_producto": r.nombre_producto, "unidad_medida": r.unidad_medida,
+                        "codigo_indicador_producto": r.codigo_indicador_producto,
+                        "nombre_indicador_producto": r.nombre_indicador_producto},
+    "dependencias": lambda r: {"id": r.id, "nombre_dependencia": r.nombre_dependencia},
+    "variables_sectorial": lambda r: {"id": r.id, "nombre_variable": r.nombre_variable, "no_aplica": bool(r.no_aplica)},
+    "variables_tecnico": lambda r: {"id": r.id, "nombre_variable": r.nombre_variable, "no_aplica": bool(r.no_aplica)},
+    "politicas": lambda r: {"id": r.id, "nombre_politica": r.nombre_politica},
+    "categorias": lambda r: {"id": r.id, "id_politica": r.id_politica, "nombre_categoria": r.nombre_categoria},
+    "subcategorias": lambda r: {"id": r.id, "id_categoria": r.id_categoria, "nombre_subcategoria": r.nombre_subcategoria},
+    "viabilidad": lambda r: {"id": r.id, "nombre": r.nombre, "no_aplica": bool(r.no_aplica)},
+    "tipos_viabilidad": lambda r: {"id": r.id, "nombre": r.nombre},
+}
+
+_LISTADORES = {
+    "lineas": proyecto_service.listar_lineas,
+    "sectores": proyecto_service.listar_sectores,
+    "programas": proyecto_service.listar_programas,
+    "metas": proyecto_service.listar_metas,
+    "dependencias": proyecto_service.listar_dependencias,
+    "variables_sectorial": proyecto_service.listar_variables_sectorial,
+    "variables_tecnico": proyecto_service.listar_variables_tecnico,
+    "politicas": proyecto_service.listar_politicas,
+    "categorias": proyecto_service.listar_categorias,
+    "subcategorias": proyecto_service.listar_subcategorias,
+    "viabilidad": proyecto_service.listar_viabilidad,
+    "tipos_viabilidad": proyecto_service.listar_tipos_viabilidad,
+}
+
+
+def _cargar(db: Session) -> Dict[str, List[dict]]:
+    return {clave: [fila(r) for r in _LISTADORES[clave](db)] for clave, fila in _FILAS.items()}
+
+
+async def _cargar_async(db: AsyncSession) -> Dict[str, List[dict]]:
+    return {
+        clave: [fila(r) for r in await proyecto_service.listar_catalogo_async(db, clave)]
+        for clave, fila in _FILAS.items()
+    }
+
+
+def _serializar(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+# md5 del contenido de cada tabla: detecta INSERT/UPDATE/DELETE hechos por migraciones
+_SQL_HUELLA = text("SELECT concat_ws('|', {})".format(", ".join(
+    f"(SELECT md5(coalesce(string_agg(t::text, ',' ORDER BY t.id), '')) FROM {tabla} t)"
+    for tabla in _TABLAS_CATALOGO
+)))
+
+
+def _revision_pendiente() -> bool:
+    intervalo = settings.CATALOGO_HUELLA_SEG
+    return intervalo > 0 and time.monotonic() - _huella_revisada >= intervalo
+
+
+def _instalar(data: Dict[str, List[dict]], huella: Optional[str]) -> Dict[str, List[dict]]:
+    global _snapshot, _version, _huella, _huella_revisada
+    version_nueva = hashlib.sha256(_serializar(data)).hexdigest()
+    with _lock:
+        if version_nueva != _version:
+            _respuestas.clear()
+            _reset_bootstrap()
+        _snapshot, _version, _huella = data, version_nueva, huella
+        _huella_revisada = time.monotonic()
+        return _snapshot
+
+
+def _huella_sin_cambios(huella: str) -> bool:
+    global _huella_revisada
+    if huella == _huella:
+        _huella_revisada = time.monotonic()
+        return True
+    return False
+
+
+def snapshot(db: Session) -> Dict[str, List[dict]]:
+    snap = _snapshot
+    if snap is not None and not _revision_pendiente():
+        return snap
+    with _carga_lock:
+        if _snapshot is not None and _snapshot is not snap:
+            return _snapshot
+        huella = None
+        if settings.CATALOGO_HUELLA_SEG > 0:
+            huella = db.execute(_SQL_HUELLA).scalar() or ""
+        if snap is not None and huella is not None and _huella_sin_cambios(huella):
+            return snap
+        return _instalar(_cargar(db), huella)
+
+
+async def snapshot_async(db: AsyncSession) -> Dict[str, List[dict]]:
+    # Nunca se toma _carga_lock aqui: bloquearia el event loop mientras otro hilo consulta
+    snap = _snapshot
+    if snap is not None and not _revision_pendiente():
+        return snap
+    async with _carga_lock_async():
+        if _snapshot is not None and _snapshot is not snap:
+            return _snapshot
+        huella = None
+        if settings.CATALOGO_HUELLA_SEG > 0:
+            huella = (await db.scalar(_SQL_HUELLA)) or ""
+        if snap is not None and huella is not None and _huella_sin_cambios(huella):
+            return snap
+        return _instalar(await _cargar_async(db), huella)
+
+
+def version(db: Session) -> str:
+    snapshot(db)
+    return _version
+
+
+async def version_async(db: AsyncSession) -> str:
+    await snapshot_async(db)
+    return _version
+
+
+def invalidar() -> None:
+    global _snapshot, _version, _huella
+    with _lock:
+        _snapshot = None
+        _version = None
+        _huella = None
+        _respuestas.clear()
+        _reset_bootstrap()
+
+
+def _reset_bootstrap() -> None:
+    global _bootstrap
+    _bootstrap = None
+
+
+def _carga_lock_async() -> asyncio.Lock:
+    global _lock_async
+    if _lock_async is None:
+        _lock_async = asyncio.Lock()
+    return _lock_async
+
+
+def respuesta(db: Session, clave: str, filtro: Optional[int] = None) -> Tuple[bytes, str]:
+    if clave not in _VISTAS:
+        raise ValueError(f"Catalogo no soportado: {clave}")
+    return _respuesta(snapshot(db), clave, filtro)
+
+
+async def respuesta_async(db: AsyncSession, clave: str, filtro: Optional[int] = None) -> Tuple[bytes, str]:
+    if clave not in _VISTAS:
+        raise ValueError(f"Catalogo no soportado: {clave}")
+    return _respuesta(await snapshot_async(db), clave, filtro)
+
+
+def _respuesta(snap: Dict[str, List[dict]], clave: str, filtro: Optional[int]) -> Tuple[bytes, str]:
+    cacheada = _respuestas.get((clave, filtro))
+    if cacheada is not None and _snapshot is snap:
+        return cacheada
+    campo_filtro, campos = _VISTAS[clave]
+    filas = snap[clave]
+    if campo_filtro is not None and filtro is not None:
+        filas = [f for f in filas if f[campo_filtro] == filtro]
+    body = _serializar([{k: f[k] for k in campos} for f in filas])
+    out = (body, _etag(body))
+    if not filas and filtro is not None:
+        # Ids inexistentes no se memorizan para no crecer sin limite
+        return out
+    with _lock:
+        # Solo se guarda si nadie invalido mientras se armaba la respuesta
+        if _snapshot is snap:
+            _respuestas[(clave, filtro)] = out
+    return out
+
+
+# =========================
+# Bootstrap: jerarquia completa precalculada
+# =========================
+def _jerarquia(snap: Dict[str, List[dict]], version_cat: str) -> dict:
+    def _agrupar(filas: List[dict], campo: str) -> Dict[int, List[dict]]:
+        out: Dict[int, List[dict]] = {}
+        for f in filas:
+            out.setdefault(f[campo], []).append({k: v for k, v in f.items() if k != campo})
+        return out
+
+    metas_por_programa = _agrupar(snap["metas"], "id_programa")
+    programas_por_sector = _agrupar(snap["programas"], "id_sector")
+    sectores_por_linea = _agrupar(snap["sectores"], "id_linea_estrategica")
+    subcats_por_cat = _agrupar(snap["subcategorias"], "id_categoria")
+    cats_por_politica = _agrupar(snap["categorias"], "id_politica")
+
+    for programas in programas_por_sector.values():
+        for p in programas:
+            p["metas"] = metas_por_programa.get(p["id"], [])
+    for sectores in sectores_por_linea.values():
+        for sec in sectores:
+            sec["programas"] = programas_por_sector.get(sec["id"], [])
+    for cats in cats_por_politica.values():
+        for c in cats:
+            c["subcategorias"] = subcats_por_cat.get(c["id"], [])
+
+    return {
+        "version": version_cat,
+        "lineas": [dict(l, sectores=sectores_por_linea.get(l["id"], [])) for l in snap["lineas"]],
+        "politicas": [dict(p, categorias=cats_por_politica.get(p["id"], [])) for p in snap["politicas"]],
+        "dependencias": snap["dependencias"],
+        "variables_sectorial": snap["variables_sectorial"],
+        "variables_tecnico": snap["variables_tecnico"],
+        "viabilidad": snap["viabilidad"],
+        "tipos_viabilidad": snap["tipos_viabilidad"],
+    }
+
+
+def bootstrap(db: Session, accept_encoding: Optional[str] = None) -> Tuple[bytes, str, Optional[str]]:
+    """Devuelve (cuerpo, etag, content-encoding) segun lo que acepte el cliente."""
+    return _codificacion(_artefactos_bootstrap(snapshot(db)), accept_encoding)
+
+
+async def bootstrap_async(db: AsyncSession, accept_encoding: Optional[str] = None) -> Tuple[bytes, str, Optional[str]]:
+    snap = await snapshot_async(db)
+    artefactos = _bootstrap
+    if artefactos is None:
+        # gzip 9 y brotli 11 tardan: se arman en un hilo para no bloquear el event loop
+        artefactos = await asyncio.to_thread(_artefactos_bootstrap, snap)
+    return _codificacion(artefactos, accept_encoding)
+
+
+def _artefactos_bootstrap(snap: Dict[str, List[dict]]) -> Dict[str, Tuple[bytes, str]]:
+    global _bootstrap
+    artefactos = _bootstrap
+    if artefactos is not None:
+        return artefactos
+    with _bootstrap_lock:
+        if _bootstrap is not None:
+            return _bootstrap
+        body = _serializar(_jerarquia(snap, _version))
+        base = hashlib.sha256(body).hexdigest()[:32]
+        artefactos = {"identity": (body, f'"{base}"')}
+        artefactos["gzip"] = (gzip.compress(body, compresslevel=9, mtime=0), f'"{base}-gz"')
+        if brotli is not None:
+            artefactos["br"] = (brotli.compress(body, quality=11), f'"{base}-br"')
+        with _lock:
+            # Solo se publica si nadie invalido mientras se comprimia
+            if _snapshot is snap:
+                _bootstrap = artefactos
+        return artefactos
+
+
+def _codificacion(artefactos: Dict[str, Tuple[bytes, str]], accept_encoding: Optional[str]) -> Tuple[bytes, str, Optional[str]]:
+    aceptadas = codificaciones_aceptadas(accept_encoding)
+    for enc in ("br", "gzip"):
+        if enc in aceptadas and enc in artefactos:
+            body, etag = artefactos[enc]
+            return body, etag, enc
+    body, etag = artefactos["identity"]
+    return body, etag, None
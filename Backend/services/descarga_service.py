@@ -1,13 +1,17 @@
 ﻿from __future__ import annotations
 from collections import defaultdict
 from decimal import Decimal
-from io import BytesIO
+from concurrent.futures import Future, as_completed
+from io import BytesIO, RawIOBase
 from pathlib import Path
 import re
 import base64
+import tempfile
+import zipfile
 import asyncio
-import sys
-from typing import Dict, Optional, Tuple
+from functools import partial
+from itertools import chain
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 from datetime import datetime
@@ -23,12 +27,22 @@ from Backend.models import (
     EstructuraFinanciera, Politica, Categoria, Subcategoria, PeriodoLema,
     Viabilidad, Viabilidades, FuncionarioViabilidad
 )
-from Backend.services.excel_fill import fill_from_template, fill_viabilidad_dependencias, fill_cadena_valor
+from Backend.services.excel_fill import (
+    fill_from_template, fill_viabilidad_dependencias, fill_cadena_valor,
+    TEMPLATE_CONCEPTO, TEMPLATE_CADENA, TEMPLATE_VIABILIDAD,
+)
 from Backend.services.word_fill import fill_docx
-from Backend.services import proyecto_service
-from num2words import num2words as n2w
+from Backend.services import proyecto_service, catalogo_cache, documento_cache, navegador, plantillas, render_pool
+from Backend.utils import arranque
+from Backend.utils.instrumentacion import span
 from decimal import Decimal, ROUND_HALF_UP
 
+
+def n2w(n: int, lang: str = "es") -> str:
+    # num2words carga todos sus idiomas al importarse; se difiere al primer documento
+    from num2words import num2words
+    return num2words(n, lang=lang)
+
 # =========================
 # Utilidades de fecha/mes
 # =========================
@@ -70,7 +84,22 @@ def _now_bogota() -> datetime:
 # Carga base (comÃºn) desde BD
 # =========================
 def _fetch_base_context(db: Session, form_id: int) -> dict:
-    row = (
+    base = _fetch_base_contexts(db, [form_id]).get(form_id)
+    if not base:
+        raise ValueError("Formulario no encontrado")
+    return base
+
+
+def _fetch_base_contexts(db: Session, form_ids: list) -> Dict[int, dict]:
+    """Contexto base de varios formularios con una consulta por tabla (IN) en vez de una por formulario."""
+    if not form_ids:
+        return {}
+    with span("db.base"):
+        return _leer_bases(db, form_ids)
+
+
+def _leer_bases(db: Session, form_ids: list) -> Dict[int, dict]:
+    rows = (
         db.query(
             Formulario,
             Dependencia.nombre_dependencia,
@@ -82,46 +111,53 @@ def _fetch_base_context(db: Session, form_id: int) -> dict:
         .outerjoin(LineaEstrategica, LineaEstrategica.id == Formulario.id_linea_estrategica)
         .outerjoin(Sector, Sector.id == Formulario.id_sector)
         .outerjoin(Programa, Programa.id == Formulario.id_programa)
-        .filter(Formulario.id == form_id)
-        .one_or_none()
+        .filter(Formulario.id.in_(form_ids))
+        .all()
     )
-    if not row:
-        raise ValueError("Formulario no encontrado")
+    bases: Dict[int, dict] = {}
+    for form, dep_nom, linea_nom, prog_cod, prog_nom, sec_cod, sec_nom in rows:
+        bases[form.id] = {
+            "form_id": form.id,
+            "nombre_proyecto": form.nombre_proyecto,
+            "cod_id_mga": form.cod_id_mga,
+            "numero_radicacion": getattr(form, "numero_radicacion", None),
+            "fecha_radicacion": getattr(form, "fecha_radicacion", None),
+            "bpin": getattr(form, "bpin", None),
+            "soportes_folios": getattr(form, "soportes_folios", 0),
+            "soportes_planos": getattr(form, "soportes_planos", 0),
+            "soportes_cds": getattr(form, "soportes_cds", 0),
+            "soportes_otros": getattr(form, "soportes_otros", 0),
+            "id_dependencia": form.id_dependencia,
+            "nombre_dependencia": dep_nom or "",
+            "codigo_sector": sec_cod or "",
+            "nombre_sector": sec_nom or "",
+            "codigo_programa": prog_cod or "",
+            "nombre_programa": prog_nom or "",
+            "nombre_linea_estrategica": linea_nom or "",
+            "cargo_responsable": form.cargo_responsable,
+            "nombre_secretario": form.nombre_secretario,
+            "fuentes": getattr(form, "fuentes", None),
+            "duracion_proyecto": getattr(form, "duracion_proyecto", None),
+            "cantidad_beneficiarios": getattr(form, "cantidad_beneficiarios", None),
+            "metas": [],
+            "estructura_financiera": [],
+            "politicas": [],
+            "categorias": [],
+            "subcategorias": [],
+        }
+    ids = list(bases)
+    if not ids:
+        return bases
 
-    form, dep_nom, linea_nom, prog_cod, prog_nom, sec_cod, sec_nom = row
-    base = {
-        "form_id": form.id,
-        "nombre_proyecto": form.nombre_proyecto,
-        "cod_id_mga": form.cod_id_mga,
-        "numero_radicacion": getattr(form, "numero_radicacion", None),
-        "fecha_radicacion": getattr(form, "fecha_radicacion", None),
-        "bpin": getattr(form, "bpin", None),
-        "soportes_folios": getattr(form, "soportes_folios", 0),
-        "soportes_planos": getattr(form, "soportes_planos", 0),
-        "soportes_cds": getattr(form, "soportes_cds", 0),
-        "soportes_otros": getattr(form, "soportes_otros", 0),
-        "id_dependencia": form.id_dependencia,
-        "nombre_dependencia": dep_nom or "",
-        "codigo_sector": sec_cod or "",
-        "nombre_sector": sec_nom or "",
-        "codigo_programa": prog_cod or "",
-        "nombre_programa": prog_nom or "",
-        "nombre_linea_estrategica": linea_nom or "",
-        "cargo_responsable": form.cargo_responsable,
-        "nombre_secretario": form.nombre_secretario,
-        "fuentes": getattr(form, "fuentes", None),
-        "duracion_proyecto": getattr(form, "duracion_proyecto", None),
-        "cantidad_beneficiarios": getattr(form, "cantidad_beneficiarios", None),
-    }
     metas = (
-        db.query(Meta, Metas.meta_proyecto)
+        db.query(Metas.id_formulario, Meta, Metas.meta_proyecto)
         .join(Metas, Metas.id_meta == Meta.id)
-        .filter(Metas.id_formulario == form_id)
+        .filter(Metas.id_formulario.in_(ids))
         .order_by(Meta.numero_meta)
         .all()
     )
-    base["metas"] = [
-        {
+    for fid, m, meta_proyecto in metas:
+        bases[fid]["metas"].append({
             "numero": m.numero_meta,
             "nombre": m.nombre_meta,
             "meta_proyecto": meta_proyecto,
@@ -130,81 +166,100 @@ def _fetch_base_context(db: Session, form_id: int) -> dict:
             "unidad_medida": getattr(m, "unidad_medida", None),
             "codigo_indicador_producto": m.codigo_indicador_producto,
             "nombre_indicador_producto": m.nombre_indicador_producto,
-        }
-        for (m, meta_proyecto) in metas
-    ]
-    ef_rows = (
-        db.query(EstructuraFinanciera)
-        .filter(EstructuraFinanciera.id_formulario == form_id)
+        })
+    for r in db.query(EstructuraFinanciera).filter(EstructuraFinanciera.id_formulario.in_(ids)).all():
+        bases[r.id_formulario]["estructura_financiera"].append(
+            {"anio": r.anio, "entidad": (r.entidad or "").strip().upper(), "valor": r.valor}
+        )
+
+    # Variables: el catalogo se lee una vez y las respuestas de todos los formularios juntas
+    ids_sec = [v.id for v in db.query(VariableSectorial).order_by(VariableSectorial.id).all()]
+    ids_tec = [v.id for v in db.query(VariableTecnico).order_by(VariableTecnico.id).all()]
+    res_sec: Dict[int, dict] = defaultdict(dict)
+    for fid, vid, resp in (
+        db.query(VariablesSectorialRel.id_formulario, VariablesSectorialRel.id_variable_sectorial, VariablesSectorialRel.respuesta)
+        .filter(VariablesSectorialRel.id_formulario.in_(ids))
         .all()
-    )
-    base["estructura_financiera"] = [
-        {"anio": r.anio, "entidad": (r.entidad or "").strip().upper(), "valor": r.valor}
-        for r in ef_rows
-    ]
-    sec_rows = (
-        db.query(VariablesSectorialRel.id_variable_sectorial, VariablesSectorialRel.respuesta)
-        .filter(VariablesSectorialRel.id_formulario == form_id)
+    ):
+        res_sec[fid][vid] = (resp or "").strip()
+    res_tec: Dict[int, dict] = defaultdict(dict)
+    for fid, vid, resp in (
+        db.query(VariablesTecnicoRel.id_formulario, VariablesTecnicoRel.id_variable_tecnico, VariablesTecnicoRel.respuesta)
+        .filter(VariablesTecnicoRel.id_formulario.in_(ids))
         .all()
-    )
-    sel_sec_ids = {vid for (vid, _resp) in sec_rows}
-    res_sec_map = {vid: (resp or "").strip() for (vid, resp) in sec_rows}
-    ids_sec = [v.id for v in db.query(VariableSectorial).order_by(VariableSectorial.id).all()]
-    base["variables_sectorial"] = [vid in sel_sec_ids for vid in ids_sec][:9] + [""] * max(0, 9 - len(ids_sec))
-    base["variables_sectorial_respuestas"] = [res_sec_map.get(vid, "") for vid in ids_sec][:9] + [""] * max(0, 9 - len(ids_sec))
+    ):
+        res_tec[fid][vid] = (resp or "").strip()
+    for fid, base in bases.items():
+        sec, tec = res_sec.get(fid, {}), res_tec.get(fid, {})
+        base["variables_sectorial"] = [vid in sec for vid in ids_sec][:9] + [""] * max(0, 9 - len(ids_sec))
+        base["variables_sectorial_respuestas"] = [sec.get(vid, "") for vid in ids_sec][:9] + [""] * max(0, 9 - len(ids_sec))
+        base["variables_tecnico"] = [vid in tec for vid in ids_tec][:13] + [""] * max(0, 13 - len(ids_tec))
+        base["variables_tecnico_respuestas"] = [tec.get(vid, "") for vid in ids_tec][:13] + [""] * max(0, 13 - len(ids_tec))
 
-    # ========== Variables TÃ‰CNICO ==========
-    tec_rows = (
-        db.query(VariablesTecnicoRel.id_variable_tecnico, VariablesTecnicoRel.respuesta)
-        .filter(VariablesTecnicoRel.id_formulario == form_id)
-        .all()
-    )
-    sel_tec_ids = {vid for (vid, _resp) in tec_rows}
-    res_tec_map = {vid: (resp or "").strip() for (vid, resp) in tec_rows}
-    ids_tec = [v.id for v in db.query(VariableTecnico).order_by(VariableTecnico.id).all()]
-    base["variables_tecnico"] = [vid in sel_tec_ids for vid in ids_tec][:13] + [""] * max(0, 13 - len(ids_tec))
-    base["variables_tecnico_respuestas"] = [res_tec_map.get(vid, "") for vid in ids_tec][:13] + [""] * max(0, 13 - len(ids_tec))
     politicas = (
-        db.query(Politica.nombre_politica, PoliticasRel.valor_destinado)
+        db.query(PoliticasRel.id_formulario, Politica.nombre_politica, PoliticasRel.valor_destinado)
         .join(PoliticasRel, PoliticasRel.id_politica == Politica.id)
-        .filter(PoliticasRel.id_formulario == form_id)
+        .filter(PoliticasRel.id_formulario.in_(ids))
         .order_by(Politica.id)
         .all()
     )
-    base["politicas"] = [{"nombre": p, "valor": v} for (p, v) in politicas]
+    for fid, p, v in politicas:
+        bases[fid]["politicas"].append({"nombre": p, "valor": v})
     categorias = (
-        db.query(Categoria)
+        db.query(CategoriasRel.id_formulario, Categoria)
         .join(CategoriasRel, CategoriasRel.id_categoria == Categoria.id)
-        .filter(CategoriasRel.id_formulario == form_id)
+        .filter(CategoriasRel.id_formulario.in_(ids))
         .order_by(Categoria.id)
         .all()
     )
-    base["categorias"] = [{"id": c.id, "nombre": c.nombre_categoria, "id_politica": c.id_politica} for c in categorias]
+    for fid, c in categorias:
+        bases[fid]["categorias"].append({"id": c.id, "nombre": c.nombre_categoria, "id_politica": c.id_politica})
     subcats = (
-        db.query(Subcategoria)
+        db.query(SubcategoriasRel.id_formulario, Subcategoria)
         .join(SubcategoriasRel, SubcategoriasRel.id_subcategoria == Subcategoria.id)
-        .filter(SubcategoriasRel.id_formulario == form_id)
+        .filter(SubcategoriasRel.id_formulario.in_(ids))
         .order_by(Subcategoria.id)
         .all()
     )
-    base["subcategorias"] = [{"id": s.id, "nombre": s.nombre_subcategoria, "id_categoria": s.id_categoria} for s in subcats]
-    return base
+    for fid, sc in subcats:
+        bases[fid]["subcategorias"].append({"id": sc.id, "nombre": sc.nombre_subcategoria, "id_categoria": sc.id_categoria})
+    return bases
 
 
 # =========================
 # EXCELS (uno por funciÃ³n)
 # =========================
+# Cada documento se arma en dos fases: contexto_* lee la BD y devuelve un dict plano
+# (la sesion se puede cerrar enseguida) y render_* llena la plantilla sin tocar la BD.
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+
+def _leer_salida(out_path: Path) -> Tuple[BytesIO, str]:
+    bio = BytesIO(out_path.read_bytes())
+    bio.seek(0)
+    return bio, out_path.name
+
+
+def _llenar(fill: Callable[..., Path], **kwargs) -> Tuple[BytesIO, str]:
+    # Cada llenado escribe en su propio directorio temporal: dos hilos o workers nunca eligen
+    # el mismo archivo de salida y no se acumulan documentos junto a las plantillas
+    with tempfile.TemporaryDirectory(prefix="formulario_") as tmp:
+        return _leer_salida(fill(base_dir=BASE_DIR, output_dir=Path(tmp), **kwargs))
+
+
 def excel_concepto_tecnico_sectorial(db: Session, form_id: int) -> Tuple[BytesIO, str]:
-    base_dir = Path(__file__).resolve().parents[2]
-    data = _context_excel_concepto(_fetch_base_context(db, form_id))
+    return render_excel_concepto(form_id, contexto_excel_concepto(db, form_id))
+
+def contexto_excel_concepto(db: Session, form_id: int, base: Optional[dict] = None) -> Dict[str, object]:
+    data = _context_excel_concepto(base or _fetch_base_context(db, form_id))
     now = _now_bogota()
     data["fecha_firma_texto"] = (f"Para constancia se firma el dÃ­a {now.day} del mes de {_spanish_month(now.month)} del aÃ±o {now.year}.")
     dep_nom = (data.get("nombre_dependencia") or "").strip()
     data["firma_secretaria_texto"] = f"Firma del Secretario(a)/Jefe de oficina de {dep_nom}."
-    out_path = fill_from_template(base_dir=base_dir, data=data)
-    bio = BytesIO(out_path.read_bytes())
-    bio.seek(0)
-    return bio, out_path.name
+    return data
+
+def render_excel_concepto(form_id: int, data: Dict[str, object]) -> Tuple[BytesIO, str]:
+    return _llenar(fill_from_template, data=data, force_index=form_id)
 
 def _context_excel_concepto(base: Dict[str, object]) -> Dict[str, object]:
     metas = base.get("metas", [])
@@ -248,7 +303,17 @@ TEMPLATE_MAP = {
 }
 
 def word_carta(db: Session, form_id: int) -> Tuple[BytesIO, str]:
-    base = _fetch_base_context(db, form_id)
+    return _render_word("carta", form_id, contexto_word_carta(db, form_id))
+
+def word_cert_precios(db: Session, form_id: int) -> Tuple[BytesIO, str]:
+    return _render_word("cert_precios", form_id, contexto_word_common(db, form_id))
+
+def word_no_doble_cofin(db: Session, form_id: int) -> Tuple[BytesIO, str]:
+    return _render_word("no_doble_cofin", form_id, contexto_word_common(db, form_id))
+
+
+def contexto_word_carta(db: Session, form_id: int, base: Optional[dict] = None) -> Dict[str, object]:
+    base = base or _fetch_base_context(db, form_id)
     ctx = _context_word_common(base)
     ctx["gobernador"] = _persona_por_rol(db, "Gobernador")
     ctx["jefe_oap"]   = _persona_por_rol(db, "SecretarÃ­a de PlaneaciÃ³n")
@@ -260,17 +325,10 @@ def word_carta(db: Session, form_id: int) -> Tuple[BytesIO, str]:
         ctx["Periodo"] = ""
         ctx["lema_periodo"] = ""
     ctx.update(_merge_ctx_carta(db, form_id))
-    return _render_word("carta", form_id, ctx)
-
-def word_cert_precios(db: Session, form_id: int) -> Tuple[BytesIO, str]:
-    base = _fetch_base_context(db, form_id)
-    ctx = _context_word_common(base)
-    return _render_word("cert_precios", form_id, ctx)
+    return ctx
 
-def word_no_doble_cofin(db: Session, form_id: int) -> Tuple[BytesIO, str]:
-    base = _fetch_base_context(db, form_id)
-    ctx = _context_word_common(base)
-    return _render_word("no_doble_cofin", form_id, ctx)
+def contexto_word_common(db: Session, form_id: int, base: Optional[dict] = None) -> Dict[str, object]:
+    return _context_word_common(base or _fetch_base_context(db, form_id))
 
 
 def _context_word_common(base: Dict[str, object]) -> Dict[str, object]:
@@ -532,13 +590,9 @@ def _merge_ctx_carta(db, form_id: int) -> dict:
 def _render_word(key: str, form_id: int, context: Dict[str, object]) -> Tuple[BytesIO, str]:
     if key not in TEMPLATE_MAP:
         raise ValueError("Documento no soportado")
-    base_dir = Path(__file__).resolve().parents[2]
     template_name = TEMPLATE_MAP[key]
     output_name = f"{form_id}_{template_name}"
-    out_path = fill_docx(base_dir=base_dir, template_name=template_name, context=context, output_name=output_name)
-    bio = BytesIO(out_path.read_bytes())
-    bio.seek(0)
-    return bio, out_path.name
+    return _llenar(fill_docx, template_name=template_name, context=context, output_name=output_name)
 
 def _persona_por_rol(db: Session, rol: str) -> str:
     row = db.execute(text("SELECT nombre FROM personas WHERE LOWER(rol)=LOWER(:r) LIMIT 1"), {"r": rol}).first()
@@ -554,8 +608,10 @@ def word_formulario(db: Session, form_id: int, doc: str, extras: Optional[Dict[s
     raise ValueError("Documento no soportado")
 
 def excel_cadena_valor(db: Session, form_id: int) -> Tuple[BytesIO, str]:
-    base_dir = Path(__file__).resolve().parents[2]
-    base = _fetch_base_context(db, form_id)
+    return render_cadena_valor(form_id, contexto_cadena_valor(db, form_id))
+
+def contexto_cadena_valor(db: Session, form_id: int, base: Optional[dict] = None) -> Dict[str, object]:
+    base = base or _fetch_base_context(db, form_id)
     now = _now_bogota()
 
     metas_base = base.get("metas", []) or []
@@ -573,15 +629,16 @@ def excel_cadena_valor(db: Session, form_id: int) -> Tuple[BytesIO, str]:
         "fecha_actual": f"{now.day} de {_spanish_month(now.month)} del {now.year}",
         "metas": metas,
     }
+    return data
 
-    out_path = fill_cadena_valor(base_dir=base_dir, data=data)
-    bio = BytesIO(out_path.read_bytes())
-    bio.seek(0)
-    return bio, out_path.name
+def render_cadena_valor(form_id: int, data: Dict[str, object]) -> Tuple[BytesIO, str]:
+    return _llenar(fill_cadena_valor, data=data, force_index=form_id)
 
 def excel_viabilidad_dependencias(db: Session, form_id: int) -> Tuple[BytesIO, str]:
-    base_dir = Path(__file__).resolve().parents[2]
-    base = _fetch_base_context(db, form_id)
+    return render_viabilidad_dependencias(form_id, contexto_viabilidad_dependencias(db, form_id))
+
+def contexto_viabilidad_dependencias(db: Session, form_id: int, base: Optional[dict] = None) -> Dict[str, object]:
+    base = base or _fetch_base_context(db, form_id)
 
     # 1) Metas asociadas al formulario
     metas = [
@@ -621,7 +678,7 @@ def excel_viabilidad_dependencias(db: Session, form_id: int) -> Tuple[BytesIO, s
 
     # 4) Funcionarios que certifican viabilidad
     funcs = {
-        f.id_tipo_viabilidad: f
+        f.id_tipo_viabilidad: {"nombre": f.nombre, "cargo": f.cargo}
         for f in db.query(FuncionarioViabilidad)
         .filter(FuncionarioViabilidad.id_formulario == form_id)
         .all()
@@ -652,11 +709,230 @@ def excel_viabilidad_dependencias(db: Session, form_id: int) -> Tuple[BytesIO, s
         "metas": metas,
         "proyecto_fortalecimiento": proyecto_fortalecimiento,
     }
+    return data
 
-    out_path = fill_viabilidad_dependencias(base_dir=base_dir, data=data)
-    bio = BytesIO(out_path.read_bytes())
-    bio.seek(0)
-    return bio, out_path.name
+def render_viabilidad_dependencias(form_id: int, data: Dict[str, object]) -> Tuple[BytesIO, str]:
+    return _llenar(fill_viabilidad_dependencias, data=data, force_index=form_id)
+
+
+MEDIA_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+MEDIA_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+class Documento(NamedTuple):
+    contexto: Callable[..., Dict[str, object]]   # (db, form_id, base=None)
+    render: Callable[[int, Dict[str, object]], Tuple[BytesIO, str]]
+    media_type: str
+    etiqueta: str
+    plantilla: str
+
+
+DOCUMENTOS: Dict[str, Documento] = {
+    "concepto-tecnico-sectorial": Documento(contexto_excel_concepto, render_excel_concepto, MEDIA_XLSX, "Excel", TEMPLATE_CONCEPTO),
+    "cadena-valor": Documento(contexto_cadena_valor, render_cadena_valor, MEDIA_XLSX, "Excel", TEMPLATE_CADENA),
+    "viabilidad-dependencias": Documento(contexto_viabilidad_dependencias, render_viabilidad_dependencias, MEDIA_XLSX, "Excel", TEMPLATE_VIABILIDAD),
+    "carta": Documento(contexto_word_carta, partial(_render_word, "carta"), MEDIA_DOCX, "Word", TEMPLATE_MAP["carta"]),
+    "cert-precios": Documento(contexto_word_common, partial(_render_word, "cert_precios"), MEDIA_DOCX, "Word", TEMPLATE_MAP["cert_precios"]),
+    "no-doble-cofin": Documento(contexto_word_common, partial(_render_word, "no_doble_cofin"), MEDIA_DOCX, "Word", TEMPLATE_MAP["no_doble_cofin"]),
+}
+
+
+# =========================
+# Paquete ZIP con todos los documentos
+# =========================
+class _SalidaZip(RawIOBase):
+    """Destino no posicionable: zipfile escribe descriptores de datos y nunca retrocede."""
+
+    def __init__(self):
+        self._buf = bytearray()
+        self._pos = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._buf += b
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def vaciar(self) -> bytes:
+        out = bytes(self._buf)
+        self._buf.clear()
+        return out
+
+
+class EntradaPaquete(NamedTuple):
+    doc: str
+    clave: str
+    cacheado: Optional[Tuple[bytes, dict]]
+    contexto: Optional[dict]
+    error: Optional[str] = None
+
+
+def contextos_paquete(db: Session, form_id: int, docs: Optional[List[str]] = None) -> list:
+    """Una entrada por documento (todos o `docs`); la base comun se lee una sola vez y los HIT de cache no se vuelven a armar."""
+    entradas, base = [], None
+    for doc in (DOCUMENTOS if docs is None else docs):
+        documento = DOCUMENTOS[doc]
+        clave = clave_documento(db, doc, form_id)
+        cacheado = documento_cache.leer(clave)
+        if cacheado is not None:
+            entradas.append(EntradaPaquete(doc, clave, cacheado, None))
+            continue
+        if base is None:
+            base = _fetch_base_context(db, form_id)
+        try:
+            entradas.append(EntradaPaquete(doc, clave, None, documento.contexto(db, form_id, base=base)))
+        except Exception as e:
+            db.rollback()
+            entradas.append(EntradaPaquete(doc, clave, None, None, str(e)))
+    return entradas
+
+
+def _construir(entrada: EntradaPaquete, generado: Optional[Tuple[BytesIO, str]]) -> Tuple[str, bytes]:
+    if entrada.error:
+        raise ValueError(entrada.error)
+    if entrada.cacheado is not None:
+        contenido, meta = entrada.cacheado
+        return meta["filename"], contenido
+    documento = DOCUMENTOS[entrada.doc]
+    bio, filename = generado
+    contenido = bio.getvalue()
+    if contenido:
+        documento_cache.guardar(entrada.clave, contenido, filename, documento.media_type)
+    return filename, contenido
+
+
+def generar_paquete(form_id: int, entradas: list, bloque: int = 64 * 1024) -> Iterator[bytes]:
+    salida = _SalidaZip()
+    errores = []
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        # Los documentos sin HIT ni error se generan en render_pool; el resto se resuelve aqui
+        listos = [e for e in entradas if e.error or e.cacheado is not None]
+        futuros = {
+            render_pool.enviar(DOCUMENTOS[e.doc].render, form_id, e.contexto): e
+            for e in entradas if not (e.error or e.cacheado is not None)
+        }
+        pendientes = ((futuros[f], f) for f in as_completed(futuros))
+        for entrada, fut in chain(((e, None) for e in listos), pendientes):
+            try:
+                filename, contenido = _construir(entrada, render_pool.resultado(fut) if fut is not None else None)
+            except Exception as e:
+                errores.append(f"{entrada.doc}: {e}")
+                continue
+            with zf.open(filename, "w") as entry:
+                for i in range(0, len(contenido), bloque):
+                    entry.write(contenido[i:i + bloque])
+                    yield salida.vaciar()
+        if errores:
+            zf.writestr("ERRORES.txt", "\n".join(errores))
+    yield salida.vaciar()
+
+
+# Tablas que lee un documento fuera del formulario y de los catalogos (la carta firma con el
+# gobernador, el jefe de la OAP y el lema del periodo vigente): su md5 entra en la clave
+_SQL_SELLO_CARTA = text(
+    "SELECT concat_ws('|',"
+    " (SELECT md5(coalesce(string_agg(t::text, ',' ORDER BY t.id), '')) FROM personas t),"
+    " (SELECT md5(coalesce(string_agg(t::text, ',' ORDER BY t.id), '')) FROM periodo_lema t))"
+)
+_SELLOS: Dict[str, Callable[[Session], str]] = {
+    "carta": lambda db: db.execute(_SQL_SELLO_CARTA).scalar_one(),
+}
+
+
+def clave_documento(db: Session, doc: str, form_id: int) -> str:
+    # El contenido depende del formulario, de los catalogos, de la plantilla y de la fecha del dia
+    version = proyecto_service.obtener_version(db, form_id)
+    if version is None:
+        raise ValueError("Formulario no encontrado")
+    sello = _SELLOS[doc](db) if doc in _SELLOS else ""
+    return _clave(doc, form_id, version, catalogo_cache.version(db), sello)
+
+
+def _clave(doc: str, form_id: int, version: int, version_catalogos: str, sello: str = "") -> str:
+    return documento_cache.clave(
+        doc, form_id, version, f"{version_catalogos}|{sello}" if sello else version_catalogos,
+        documento_cache.hash_plantilla(BASE_DIR / DOCUMENTOS[doc].plantilla),
+        _now_bogota().date().isoformat(),
+    )
+
+
+# =========================
+# Exportacion masiva del concepto tecnico y sectorial
+# =========================
+def generar_lote_conceptos(sesion: Callable[[], Session], form_ids: list, lote: int = 25,
+                           bloque: int = 64 * 1024) -> Iterator[bytes]:
+    """ZIP con el Excel de concepto de cada formulario. Los contextos se leen por lotes
+    (una consulta por tabla) y mientras render_pool genera un lote se lee el siguiente."""
+    doc = "concepto-tecnico-sectorial"
+    documento = DOCUMENTOS[doc]
+    salida = _SalidaZip()
+    errores = []
+
+    def _preparar(ids: list) -> dict:
+        futuros = {}
+        with sesion() as db:
+            versiones = proyecto_service.obtener_versiones(db, ids)
+            version_catalogos = catalogo_cache.version(db)
+            claves, faltantes = {}, []
+            for fid in ids:
+                if fid not in versiones:
+                    errores.append(f"{fid}: Formulario no encontrado")
+                    continue
+                claves[fid] = _clave(doc, fid, versiones[fid], version_catalogos)
+                cacheado = documento_cache.leer(claves[fid])
+                if cacheado is not None:
+                    fut = Future()
+                    fut.set_result(_leer_cacheado(cacheado))
+                    futuros[fut] = (fid, None)
+                else:
+                    faltantes.append(fid)
+            bases = _fetch_base_contexts(db, faltantes)
+        for fid in faltantes:
+            ctx = documento.contexto(None, fid, base=bases[fid])
+            futuros[render_pool.enviar(documento.render, fid, ctx)] = (fid, claves[fid])
+        return futuros
+
+    def _volcar(zf: zipfile.ZipFile, futuros: dict) -> Iterator[bytes]:
+        for fut in as_completed(futuros):
+            fid, clave = futuros[fut]
+            try:
+                bio, filename = render_pool.resultado(fut)
+            except Exception as e:
+                errores.append(f"{fid}: {e}")
+                continue
+            contenido = bio.getvalue()
+            if clave is not None and contenido:
+                documento_cache.guardar(clave, contenido, filename, documento.media_type)
+            with zf.open(f"{fid}_{documento.plantilla}", "w") as entry:
+                for i in range(0, len(contenido), bloque):
+                    entry.write(contenido[i:i + bloque])
+                    yield salida.vaciar()
+
+    with zipfile.ZipFile(salida, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        en_curso: dict = {}
+        for i in range(0, len(form_ids), lote):
+            ids = form_ids[i:i + lote]
+            try:
+                siguiente = _preparar(ids)
+            except Exception as e:
+                errores.append(f"{ids[0]}..{ids[-1]}: {e}")
+                siguiente = {}
+            yield from _volcar(zf, en_curso)
+            en_curso = siguiente
+        yield from _volcar(zf, en_curso)
+        if errores:
+            zf.writestr("ERRORES.txt", "\n".join(errores))
+    yield salida.vaciar()
+
+
+def _leer_cacheado(cacheado: Tuple[bytes, dict]) -> Tuple[BytesIO, str]:
+    contenido, meta = cacheado
+    return BytesIO(contenido), meta["filename"]
 
 
 _EVAL_TEMPLATE_MAP = {
@@ -664,6 +940,32 @@ _EVAL_TEMPLATE_MAP = {
     "viabilidad": "viabilidad.html",
     "viabilidad-ajustada": "viabilidad ajustada.html",
 }
+_LOGO = "Logo-sec-planeacion.png"
+
+
+def plantillas_requeridas() -> List[str]:
+    """Plantillas Excel, Word y HTML, relativas a BASE_DIR (el logo es opcional)."""
+    return sorted({d.plantilla for d in DOCUMENTOS.values()} | set(_EVAL_TEMPLATE_MAP.values()))
+
+
+def precargar_plantillas() -> int:
+    # Bytes de todas las plantillas (Excel, Word, HTML y logo) en memoria y un parseo de cada
+    # libro/documento, que deja importado y en caliente el codigo de openpyxl/python-docx.
+    # El arbol parseado no se guarda: cada llenado lo modifica.
+    from openpyxl import load_workbook
+    from docx import Document
+    nombres = plantillas_requeridas()
+    total = plantillas.precargar(BASE_DIR, nombres + [_LOGO])
+    for nombre in nombres:
+        path = BASE_DIR / nombre
+        if nombre.endswith(".xlsx") and path.exists():
+            load_workbook(plantillas.abrir(path))
+        elif nombre.endswith(".docx") and path.exists():
+            Document(plantillas.abrir(path))
+    return total
+
+
+arranque.al_precalentar("plantillas", precargar_plantillas)
 
 
 def _fmt_money_eval(v: float | int | None) -> str:
@@ -1028,11 +1330,11 @@ def _inject_cargo_evaluador(template_html: str, cargo: str) -> str:
 
 
 def _logo_data_uri(base_dir: Path) -> str:
-    candidates = list(base_dir.glob("Logo-sec-planeacion.png"))
+    candidates = list(base_dir.glob(_LOGO))
     if not candidates:
         return ""
     try:
-        raw = candidates[0].read_bytes()
+        raw = plantillas.abrir(candidates[0]).getvalue()
         b64 = base64.b64encode(raw).decode("ascii")
         return f"data:image/png;base64,{b64}"
     except Exception:
@@ -1053,6 +1355,7 @@ def render_evaluador_template_html(
     concepto_tecnico_favorable_dep: str | None = None,
     concepto_sectorial_favorable_dep: str | None = None,
     proyecto_viable_dep: str | None = None,
+    base: dict | None = None,
 ) -> tuple[str, str]:
     filled, file_name, base_dir = _render_evaluador_filled_content(
         db=db,
@@ -1068,6 +1371,7 @@ def render_evaluador_template_html(
         concepto_tecnico_favorable_dep=concepto_tecnico_favorable_dep,
         concepto_sectorial_favorable_dep=concepto_sectorial_favorable_dep,
         proyecto_viable_dep=proyecto_viable_dep,
+        base=base,
     )
 
     logo_uri = _logo_data_uri(base_dir)
@@ -1106,6 +1410,10 @@ def render_evaluador_template_html(
     return full_html, file_name
 
 
+def contexto_evaluador(db: Session, form_id: int) -> dict:
+    return _fetch_base_context(db, form_id)
+
+
 def _render_evaluador_filled_content(
     db: Session,
     form_id: int,
@@ -1120,6 +1428,7 @@ def _render_evaluador_filled_content(
     concepto_tecnico_favorable_dep: str | None = None,
     concepto_sectorial_favorable_dep: str | None = None,
     proyecto_viable_dep: str | None = None,
+    base: dict | None = None,
 ) -> tuple[str, str, Path]:
     if template_key not in _EVAL_TEMPLATE_MAP:
         raise ValueError("Template no soportado")
@@ -1129,14 +1438,15 @@ def _render_evaluador_filled_content(
     if not template_path.exists():
         raise ValueError(f"No existe plantilla: {_EVAL_TEMPLATE_MAP[template_key]}")
 
-    base = _fetch_base_context(db, form_id)
+    if base is None:
+        base = _fetch_base_context(db, form_id)
     tokens = _build_eval_tokens(
         base,
         nombre_evaluador,
         cargo_evaluador or "",
         fecha_evaluador=fecha_evaluador,
     )
-    raw = template_path.read_text(encoding="utf-8", errors="ignore")
+    raw = plantillas.abrir(template_path).getvalue().decode("utf-8", errors="ignore")
     filled = _replace_tokens_in_html(raw, tokens)
 
     heading_by_template = {
@@ -1189,6 +1499,7 @@ def render_evaluador_template_pdf(
     concepto_tecnico_favorable_dep: str | None = None,
     concepto_sectorial_favorable_dep: str | None = None,
     proyecto_viable_dep: str | None = None,
+    base: dict | None = None,
 ) -> tuple[BytesIO, str]:
     filled, file_name, base_dir = _render_evaluador_filled_content(
         db=db,
@@ -1204,13 +1515,9 @@ def render_evaluador_template_pdf(
         concepto_tecnico_favorable_dep=concepto_tecnico_favorable_dep,
         concepto_sectorial_favorable_dep=concepto_sectorial_favorable_dep,
         proyecto_viable_dep=proyecto_viable_dep,
+        base=base,
     )
 
-    try:
-        from playwright.sync_api import sync_playwright
-    except Exception as e:
-        raise ValueError(f"Playwright no disponible para PDF: {e}")
-
     logo_uri = _logo_data_uri(base_dir)
     header_logo = f"<div style='width:100%;text-align:center;'><img src='{logo_uri}' style='height:76px;' /></div>" if logo_uri else "<div></div>"
     footer_html = (
@@ -1230,24 +1537,11 @@ def render_evaluador_template_pdf(
     )
 
     try:
-        with sync_playwright() as p:
-            executable = p.chromium.executable_path
-            if not executable or not Path(executable).exists():
-                raise ValueError(
-                    "Chromium de Playwright no instalado. Ejecuta: python -m playwright install chromium"
-                )
-            browser = p.chromium.launch()
-            page = browser.new_page()
-            page.set_content(html, wait_until="networkidle")
-            pdf_bytes = page.pdf(
-                format="A4",
-                print_background=True,
-                display_header_footer=True,
-                header_template=header_logo,
-                footer_template=footer_html,
+        with span("chromium.pdf"):
+            pdf_bytes = navegador.pdf(
+                html, header_logo, footer_html,
                 margin={"top": "36mm", "bottom": "28mm", "left": "8mm", "right": "8mm"},
             )
-            browser.close()
     except Exception as e:
         raise ValueError(f"Fallo Playwright al generar PDF: {repr(e)}")
 
@@ -1270,6 +1564,7 @@ async def render_evaluador_template_pdf_async(
     concepto_tecnico_favorable_dep: str | None = None,
     concepto_sectorial_favorable_dep: str | None = None,
     proyecto_viable_dep: str | None = None,
+    base: dict | None = None,
 ) -> tuple[BytesIO, str]:
     filled, file_name, base_dir = _render_evaluador_filled_content(
         db=db,
@@ -1285,6 +1580,7 @@ async def render_evaluador_template_pdf_async(
         concepto_tecnico_favorable_dep=concepto_tecnico_favorable_dep,
         concepto_sectorial_favorable_dep=concepto_sectorial_favorable_dep,
         proyecto_viable_dep=proyecto_viable_dep,
+        base=base,
     )
 
     logo_uri = _logo_data_uri(base_dir)
@@ -1320,30 +1616,9 @@ async def render_evaluador_template_pdf_async(
 
 
 def _generate_pdf_sync_playwright(html: str, header_logo: str, footer_html: str) -> bytes:
-    try:
-        if sys.platform.startswith("win"):
-            asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
-        from playwright.sync_api import sync_playwright
-    except Exception as e:
-        raise ValueError(f"Playwright no disponible para PDF: {e}")
-
-    with sync_playwright() as p:
-        executable = p.chromium.executable_path
-        if not executable or not Path(executable).exists():
-            raise ValueError(
-                "Chromium de Playwright no instalado. Ejecuta: python -m playwright install chromium"
-            )
-        browser = p.chromium.launch()
-        page = browser.new_page()
-        page.set_content(html, wait_until="networkidle")
-        pdf_bytes = page.pdf(
-            format="A4",
-            print_background=True,
-            display_header_footer=True,
-            header_template=header_logo,
-            footer_template=footer_html,
+    with span("chromium.pdf"):
+        return navegador.pdf(
+            html, header_logo, footer_html,
             margin={"top": "30mm", "bottom": "30mm", "left": "8mm", "right": "8mm"},
         )
-        browser.close()
-    return pdf_bytes
 
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from Backend.utils import bloqueo
+from Backend.utils.config import settings
+
+# Documentos ya generados (Excel/Word) guardados en disco. La clave cambia cuando cambia
+# el formulario (version), los catalogos, la plantilla o el dia, asi que nunca se invalida
+# a mano: las entradas viejas simplemente salen por LRU.
+# El directorio es la unica fuente de verdad, compartida por todos los workers del host: el
+# mtime de cada .bin hace de marca LRU, la expulsion corre bajo un flock del directorio y
+# exclusivo(clave) evita que dos procesos generen el mismo documento a la vez.
+
+_hashes_plantilla: Dict[Tuple[str, int, int], str] = {}
+
+
+def _directorio() -> Path:
+    d = Path(settings.DOC_CACHE_DIR) if settings.DOC_CACHE_DIR else Path(tempfile.gettempdir()) / "formulario_docs"
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def _limite() -> int:
+    return settings.DOC_CACHE_MAX_MB * 1024 * 1024
+
+
+def hash_plantilla(path: Path) -> str:
+    st = path.stat()
+    llave = (str(path), st.st_mtime_ns, st.st_size)
+    h = _hashes_plantilla.get(llave)
+    if h is None:
+        h = hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+        _hashes_plantilla[llave] = h
+    return h
+
+
+def clave(doc: str, form_id: int, version: int, version_catalogos: str, plantilla: str, fecha: str) -> str:
+    raw = f"{doc}|{form_id}|{version}|{version_catalogos}|{plantilla}|{fecha}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def obtener(k: str) -> Optional[Tuple[Path, dict]]:
+    if not settings.DOC_CACHE_ENABLED:
+        return None
+    d = _directorio()
+    path, meta_path = d / f"{k}.bin", d / f"{k}.json"
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        os.utime(path)  # el mtime hace de marca LRU entre procesos y reinicios
+    except (FileNotFoundError, ValueError):
+        return None
+    return path, meta
+
+
+def leer(k: str) -> Optional[Tuple[bytes, dict]]:
+    """Como obtener(), pero con el contenido ya leido. La expulsion (de este u otro worker) puede
+    borrar el .bin en cualquier momento, asi que un archivo que desaparece cuenta como MISS."""
+    cacheado = obtener(k)
+    if cacheado is None:
+        return None
+    path, meta = cacheado
+    try:
+        return path.read_bytes(), meta
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def exclusivo(k: str) -> Iterator[None]:
+    """Serializa la generacion de una clave entre hilos y procesos; al entrar conviene volver
+    a llamar a obtener(k), otro worker pudo haberla guardado mientras se esperaba."""
+    # 256 archivos de bloqueo (prefijo del hash) en vez de uno por clave: nunca se borran
+    with bloqueo.exclusivo(f"doc-{k[:2]}.lock"):
+        yield
+
+
+def guardar(k: str, contenido: bytes, filename: str, media_type: str) -> None:
+    if not settings.DOC_CACHE_ENABLED or len(contenido) > _limite():
+        return
+    d = _directorio()
+    meta = json.dumps({"filename": filename, "media_type": media_type, "size": len(contenido)})
+    # Escritura atomica: archivo temporal en el mismo directorio + os.replace. El .json va
+    # despues del .bin, asi que quien ve el .json siempre encuentra el contenido completo
+    for sufijo, data in ((".bin", contenido), (".json", meta.encode("utf-8"))):
+        fd, tmp = tempfile.mkstemp(dir=d, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, d / f"{k}{sufijo}")
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+    _expulsar(conservar=k)
+
+
+def _entradas() -> List[Tuple[float, str, int]]:
+    entradas = []
+    for p in _directorio().glob("*.bin"):
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        entradas.append((st.st_mtime, p.stem, st.st_size))
+    return sorted(entradas)
+
+
+def _expulsar(conservar: str) -> None:
+    # Un solo proceso a la vez recorre el directorio y borra las entradas menos recientes
+    with bloqueo.exclusivo("doc-expulsion.lock"):
+        entradas = _entradas()
+        total = sum(size for _, _, size in entradas)
+        for _, k, size in entradas:
+            if total <= _limite():
+                break
+            if k == conservar:
+                continue
+            _borrar_archivos(k)
+            total -= size
+
+
+def _borrar_archivos(k: str) -> None:
+    d = _directorio()
+    for sufijo in (".json", ".bin"):
+        (d / f"{k}{sufijo}").unlink(missing_ok=True)
+
+
+def estado() -> dict:
+    entradas = _entradas()
+    return {"entradas": len(entradas), "bytes": sum(size for _, _, size in entradas), "limite_bytes": _limite()}
@@ -1,11 +1,15 @@
+from __future__ import annotations
 from pathlib import Path
-from typing import Optional, List, Tuple
-from openpyxl import load_workbook
-from openpyxl.utils import get_column_letter, coordinate_to_tuple
-from openpyxl.worksheet.worksheet import Worksheet
+from typing import TYPE_CHECKING, Optional, List, Tuple
 import copy
 import re
 import unicodedata
+from Backend.services import plantillas
+from Backend.utils.instrumentacion import span
+
+# openpyxl se importa al llenar el primer documento, no al arrancar el API
+if TYPE_CHECKING:
+    from openpyxl.worksheet.worksheet import Worksheet
 
 TEMPLATE_CONCEPTO = "3_y_4_Concepto_tecnico_y_sectorial_2025.xlsx"
 TEMPLATE_CADENA = "6.Cadena_de_valor.xlsx"
@@ -43,6 +47,7 @@ def _next_sequential_index(out_dir: Path) -> int:
     return max_n + 1
 
 def _anchor_of_merged(ws: Worksheet, coord: str) -> str:
+    from openpyxl.utils import coordinate_to_tuple
     r, c = coordinate_to_tuple(coord)
     for mr in ws.merged_cells.ranges:
         if mr.min_row <= r <= mr.max_row and mr.min_col <= c <= mr.max_col:
@@ -122,6 +127,7 @@ def _remerge_with_offset(ws: Worksheet, ranges: List[Tuple[int, int, int, int]],
 def _move_down_from_row(ws: Worksheet, start_row: int, row_off: int):
     if row_off <= 0:
         return
+    from openpyxl.utils import get_column_letter
     max_col_letter = get_column_letter(ws.max_column)
     max_row = ws.max_row
     heights = {r: ws.row_dimensions[r].height for r in range(start_row, max_row + 1)}
@@ -133,11 +139,14 @@ def _move_down_from_row(ws: Worksheet, start_row: int, row_off: int):
     _remerge_with_offset(ws, merges, row_off)
 
 def fill_from_template(base_dir: Path, data: dict, force_index: Optional[int] = None, output_dir: Optional[Path] = None) -> Path:
+    from openpyxl import load_workbook
+    from openpyxl.utils import get_column_letter
     template_path = base_dir / TEMPLATE_CONCEPTO
     if not template_path.exists():
         raise FileNotFoundError(f"No se encontró el template: {template_path}")
 
-    wb = load_workbook(filename=str(template_path))
+    with span("openpyxl.cargar"):
+        wb = load_workbook(filename=plantillas.abrir(template_path))
     ws = wb.active
     numero_meta: List[str] = list(map(str, data.get("numero_meta", [])))
     nombre_meta: List[str] = list(map(str, data.get("nombre_meta", [])))
@@ -433,12 +442,15 @@ def fill_from_template(base_dir: Path, data: dict, force_index: Optional[int] =
     n = force_index if force_index is not None else _next_sequential_index(out_dir)
     out_path = out_dir / OUTPUT_CONCEPTO.format(n)
 
-    wb.save(str(out_path))
+    with span("openpyxl.guardar"):
+        wb.save(str(out_path))
     return out_path
 
 def fill_cadena_valor(base_dir: Path, data: dict, force_index: Optional[int] = None, output_dir: Optional[Path] = None) -> Path:
+    from openpyxl import load_workbook
     template = base_dir / TEMPLATE_CADENA
-    wb = load_workbook(str(template))
+    with span("openpyxl.cargar"):
+        wb = load_workbook(plantillas.abrir(template))
     ws = wb.active
 
     _write(ws, "B2", data.get("nombre_proyecto", ""))
@@ -462,12 +474,15 @@ def fill_cadena_valor(base_dir: Path, data: dict, force_index: Optional[int] = N
     n = force_index if force_index is not None else _next_sequential_index(out_dir)
     out_path = out_dir / OUTPUT_CADENA.format(n)
 
-    wb.save(str(out_path))
+    with span("openpyxl.guardar"):
+        wb.save(str(out_path))
     return out_path
 
 def fill_viabilidad_dependencias(base_dir: Path, data: dict, force_index: Optional[int] = None, output_dir: Optional[Path] = None) -> Path:
+    from openpyxl import load_workbook
     template = base_dir / TEMPLATE_VIABILIDAD
-    wb = load_workbook(str(template))
+    with span("openpyxl.cargar"):
+        wb = load_workbook(plantillas.abrir(template))
     ws = wb.active
 
     _write(ws, "G3", data.get("dependencia", ""))
@@ -515,11 +530,11 @@ def fill_viabilidad_dependencias(base_dir: Path, data: dict, force_index: Option
     funcs = data.get("funcionarios", {})
     for itv, f in funcs.items():
         if itv == 1:
-            _write(ws, "B41", f"Funcionario que certifica viabilidad técnica:\nNombre: {f.nombre}\nCargo: {f.cargo}")
+            _write(ws, "B41", f"Funcionario que certifica viabilidad técnica:\nNombre: {f['nombre']}\nCargo: {f['cargo']}")
         elif itv == 2:
-            _write(ws, "B42", f"Funcionario que certifica viabilidad jurídica:\nNombre: {f.nombre}\nCargo: {f.cargo}")
+            _write(ws, "B42", f"Funcionario que certifica viabilidad jurídica:\nNombre: {f['nombre']}\nCargo: {f['cargo']}")
         elif itv == 3:
-            _write(ws, "B43", f"Funcionario que certifica viabilidad financiera:\nNombre: {f.nombre}\nCargo: {f.cargo}")
+            _write(ws, "B43", f"Funcionario que certifica viabilidad financiera:\nNombre: {f['nombre']}\nCargo: {f['cargo']}")
 
     _write(ws, "E48", data.get("nombre_secretario", ""))
     _write(ws, "E49", data.get("dependencia", ""))
@@ -567,7 +582,8 @@ def fill_viabilidad_dependencias(base_dir: Path, data: dict, force_index: Option
     n = force_index if force_index is not None else _next_sequential_index(out_dir)
     out_path = out_dir / OUTPUT_VIABILIDAD.format(n)
 
-    wb.save(str(out_path))
+    with span("openpyxl.guardar"):
+        wb.save(str(out_path))
     return out_path
 
 def _normaliza_resp_str(v: str) -> str:
@@ -0,0 +1,112 @@
+import csv
+import io
+import os
+import tempfile
+from typing import Callable, Iterator, List, Optional, Tuple
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.orm import Session
+from Backend.models import Dependencia, EstructuraFinanciera, Formulario
+from Backend.services.proyecto_service import filtros_proyectos
+
+# Exportacion del listado de proyectos (mismos filtros que /proyecto/lista) con los totales
+# de estructura financiera por anio y entidad. Las sumas se pivotean en SQL y las filas se
+# leen con cursor de servidor (yield_per), asi que la memoria no crece con la cantidad de
+# proyectos: solo depende del numero de columnas anio/entidad.
+
+_LOTE = 500
+_COLUMNAS_BASE = [
+    "id", "nombre_proyecto", "cod_id_mga", "bpin", "numero_radicacion",
+    "fecha_radicacion", "dependencia",
+]
+
+
+def _entidad():
+    # Misma normalizacion que los documentos: sin espacios y en mayusculas
+    return func.upper(func.trim(EstructuraFinanciera.entidad))
+
+
+def _columnas_financieras(db: Session, filtros: list) -> List[Tuple[Optional[int], str]]:
+    rows = db.execute(
+        select(EstructuraFinanciera.anio, _entidad().label("entidad"))
+        .join(Formulario, Formulario.id == EstructuraFinanciera.id_formulario)
+        .where(*filtros)
+        .distinct()
+    ).all()
+    return sorted(((a, e) for a, e in rows), key=lambda r: (r[0] is None, r[0] or 0, r[1]))
+
+
+def _consulta(filtros: list, columnas: List[Tuple[Optional[int], str]]):
+    ef = EstructuraFinanciera
+    sumas = []
+    for anio, entidad in columnas:
+        cond_anio = ef.anio.is_(None) if anio is None else ef.anio == anio
+        sumas.append(func.sum(case((and_(cond_anio, _entidad() == entidad), ef.valor))))
+    pivote = (
+        select(ef.id_formulario, *[s.label(f"c{i}") for i, s in enumerate(sumas)], func.sum(ef.valor).label("total"))
+        .group_by(ef.id_formulario)
+        .subquery()
+    )
+    return (
+        select(
+            Formulario.id, Formulario.nombre_proyecto, Formulario.cod_id_mga, Formulario.bpin,
+            Formulario.numero_radicacion, Formulario.fecha_radicacion, Dependencia.nombre_dependencia,
+            *[pivote.c[f"c{i}"] for i in range(len(columnas))], pivote.c.total,
+        )
+        .outerjoin(Dependencia, Dependencia.id == Formulario.id_dependencia)
+        .outerjoin(pivote, pivote.c.id_formulario == Formulario.id)
+        .where(*filtros)
+        .order_by(Formulario.id.desc())
+        .execution_options(yield_per=_LOTE)
+    )
+
+
+def _filas(db: Session, nombre: Optional[str], cod_id_mga: Optional[str],
+           id_dependencia: Optional[int]) -> Tuple[List[str], Iterator[tuple]]:
+    filtros = filtros_proyectos(nombre, cod_id_mga, id_dependencia)
+    columnas = _columnas_financieras(db, filtros)
+    encabezado = _COLUMNAS_BASE + [
+        f"{anio if anio is not None else 'SIN ANIO'} {entidad}" for anio, entidad in columnas
+    ] + ["total"]
+    return encabezado, (tuple(r) for r in db.execute(_consulta(filtros, columnas)))
+
+
+def exportar_csv(sesion: Callable[[], Session], nombre: Optional[str], cod_id_mga: Optional[str],
+                 id_dependencia: Optional[int]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=";")
+    with sesion() as db:
+        encabezado, filas = _filas(db, nombre, cod_id_mga, id_dependencia)
+        writer.writerow(encabezado)
+        yield buf.getvalue().encode("utf-8-sig")  # BOM para que Excel reconozca UTF-8
+        buf.seek(0); buf.truncate()
+        for n, fila in enumerate(filas, start=1):
+            writer.writerow(["" if v is None else v for v in fila])
+            if n % _LOTE == 0:
+                yield buf.getvalue().encode("utf-8")
+                buf.seek(0); buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+def exportar_xlsx(sesion: Callable[[], Session], nombre: Optional[str], cod_id_mga: Optional[str],
+                  id_dependencia: Optional[int], bloque: int = 64 * 1024) -> Iterator[bytes]:
+    # write_only vuelca cada fila a disco; el libro terminado se envia por bloques y se borra
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Proyectos")
+    with sesion() as db:
+        encabezado, filas = _filas(db, nombre, cod_id_mga, id_dependencia)
+        ws.append(encabezado)
+        for fila in filas:
+            ws.append(list(fila))
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        wb.save(path)
+        with open(path, "rb") as f:
+            while True:
+                trozo = f.read(bloque)
+                if not trozo:
+                    break
+                yield trozo
+    finally:
+        os.unlink(path)
@@ -0,0 +1,219 @@
+import asyncio
+import queue
+import sys
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+from Backend.utils import arranque
+from Backend.utils.config import settings
+
+# Chromium persistente para los PDF del evaluador. Los objetos de sync_playwright solo se pueden
+# usar desde el hilo que los creo, asi que cada hilo de CHROMIUM_HILOS lanza su navegador una vez
+# y atiende trabajos de una cola compartida; cada PDF usa un contexto nuevo (sin estado entre
+# documentos). Si el navegador se cae se relanza en el siguiente trabajo; `error` del hilo solo
+# refleja fallos al lanzar o desconexiones, no errores de un PDF. Con CHROMIUM_HILOS=0 se
+# lanza y cierra un Chromium por PDF en el hilo que llama.
+
+_INSTALAR = "Chromium de Playwright no instalado. Ejecuta: python -m playwright install chromium"
+
+_cola: "queue.Queue" = queue.Queue()
+_lock = threading.Lock()
+_hilos: List["_Hilo"] = []
+
+
+def _lanzar(pw):
+    executable = pw.chromium.executable_path
+    if not executable or not Path(executable).exists():
+        raise ValueError(_INSTALAR)
+    return pw.chromium.launch()
+
+
+_local = threading.local()
+
+if sys.platform.startswith("win"):
+    class PoliticaWindows(asyncio.WindowsSelectorEventLoopPolicy):
+        """Selector para el servidor (el modo async de psycopg no funciona sobre Proactor) y
+        Proactor solo para el loop propio de Playwright, que necesita lanzar el subproceso."""
+
+        def new_event_loop(self):
+            if getattr(_local, "playwright", False):
+                return asyncio.ProactorEventLoop()
+            return super().new_event_loop()
+
+
+def _iniciar_playwright():
+    try:
+        from playwright.sync_api import sync_playwright
+    except Exception as e:
+        raise ValueError(f"Playwright no disponible para PDF: {e}")
+    _local.playwright = True
+    try:
+        return sync_playwright().start()
+    finally:
+        _local.playwright = False
+
+
+class _Hilo(threading.Thread):
+    def __init__(self, n: int):
+        super().__init__(name=f"chromium-{n}", daemon=True)
+        self.listo = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.lanzamientos = 0
+        self._pw = None
+        self._browser = None
+
+    def _navegador(self):
+        if self._browser is None or not self._browser.is_connected():
+            if self._pw is None:
+                self._pw = _iniciar_playwright()
+            self._browser = _lanzar(self._pw)
+            self.lanzamientos += 1
+        return self._browser
+
+    def run(self) -> None:
+        try:
+            self._navegador()
+            # Primer PDF en blanco: carga fuentes y el pipeline de impresion antes del primer usuario
+            _pdf_con(self._browser, "<p>&nbsp;</p>", "<div></div>", "<div></div>", {})
+        except BaseException as e:
+            self.error = e
+        self.listo.set()
+        try:
+            while True:
+                trabajo = _cola.get()
+                if trabajo is None:
+                    return
+                fn, fut = trabajo
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                try:
+                    browser = self._navegador()
+                except BaseException as e:
+                    self.error = e
+                    fut.set_exception(e)
+                    continue
+                self.error = None
+                try:
+                    fut.set_result(fn(browser))
+                except BaseException as e:
+                    # Un error de plantilla o de contenido no marca a Chromium como caido
+                    if not browser.is_connected():
+                        self.error = e
+                    fut.set_exception(e)
+        finally:
+            for cerrar in (getattr(self._browser, "close", None), getattr(self._pw, "stop", None)):
+                try:
+                    if cerrar is not None:
+                        cerrar()
+                except Exception:
+                    pass
+
+
+def iniciar(esperar: bool = False, timeout: float = 60.0) -> None:
+    with _lock:
+        while len(_hilos) < settings.CHROMIUM_HILOS:
+            hilo = _Hilo(len(_hilos) + 1)
+            hilo.start()
+            _hilos.append(hilo)
+        hilos = list(_hilos)
+    if esperar:
+        for hilo in hilos:
+            hilo.listo.wait(timeout)
+            if hilo.error is not None:
+                raise hilo.error
+
+
+arranque.al_precalentar("chromium", lambda: iniciar(esperar=True))
+
+
+def _efimero(fn: Callable):
+    pw = _iniciar_playwright()
+    try:
+        browser = _lanzar(pw)
+        try:
+            return fn(browser)
+        finally:
+            browser.close()
+    finally:
+        pw.stop()
+
+
+def ejecutar(fn: Callable):
+    """Ejecuta fn(browser) con un Chromium ya lanzado y devuelve su resultado."""
+    if settings.CHROMIUM_HILOS <= 0:
+        return _efimero(fn)
+    iniciar()
+    fut: Future = Future()
+    _cola.put((fn, fut))
+    return fut.result()
+
+
+def _pdf_con(browser, html: str, header: str, footer: str, margin: dict) -> bytes:
+    context = browser.new_context()
+    try:
+        page = context.new_page()
+        page.set_content(html, wait_until="networkidle")
+        return page.pdf(
+            format="A4",
+            print_background=True,
+            display_header_footer=True,
+            header_template=header,
+            footer_template=footer,
+            margin=margin,
+        )
+    finally:
+        context.close()
+
+
+def pdf(html: str, header: str, footer: str, margin: dict) -> bytes:
+    return ejecutar(lambda browser: _pdf_con(browser, html, header, footer, margin))
+
+
+_instalado: Optional[Tuple[bool, Optional[str]]] = None
+
+
+def disponible() -> Tuple[bool, Optional[str]]:
+    """(ok, error) sin lanzar un navegador: usa el estado de los hilos o, si aun no arrancan,
+    comprueba una vez por proceso que Playwright tenga el ejecutable de Chromium."""
+    global _instalado
+    with _lock:
+        hilos = list(_hilos)
+    errores = [h.error for h in hilos if h.listo.is_set() and h.error is not None]
+    if errores:
+        return False, str(errores[0])
+    if any(h.listo.is_set() for h in hilos):
+        return True, None
+    if _instalado is None:
+        try:
+            pw = _iniciar_playwright()
+            try:
+                executable = pw.chromium.executable_path
+            finally:
+                pw.stop()
+            _instalado = (True, None) if executable and Path(executable).exists() else (False, _INSTALAR)
+        except Exception as e:
+            _instalado = (False, str(e))
+    return _instalado
+
+
+def estado() -> dict:
+    with _lock:
+        hilos = list(_hilos)
+    return {
+        "hilos": settings.CHROMIUM_HILOS,
+        "lanzados": sum(1 for h in hilos if h.listo.is_set() and h.error is None),
+        "pendientes": _cola.qsize(),
+        "lanzamientos": sum(h.lanzamientos for h in hilos),
+        "error": next((str(h.error) for h in hilos if h.error is not None), None),
+    }
+
+
+def cerrar() -> None:
+    with _lock:
+        hilos = list(_hilos)
+        _hilos.clear()
+    for _ in hilos:
+        _cola.put(None)
+    for hilo in hilos:
+        hilo.join(timeout=10)
@@ -0,0 +1,31 @@
+import threading
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
+
+# Bytes de las plantillas en memoria: cada llenado parte de un BytesIO en vez de releer el disco.
+# Se revalida por mtime/tamano, asi que reemplazar una plantilla no exige reiniciar.
+
+_lock = threading.Lock()
+_cache: Dict[str, Tuple[int, int, bytes]] = {}
+
+
+def abrir(path: Path) -> BytesIO:
+    st = path.stat()
+    clave = str(path)
+    with _lock:
+        hit = _cache.get(clave)
+    if hit is None or hit[0] != st.st_mtime_ns or hit[1] != st.st_size:
+        hit = (st.st_mtime_ns, st.st_size, path.read_bytes())
+        with _lock:
+            _cache[clave] = hit
+    return BytesIO(hit[2])
+
+
+def precargar(base_dir: Path, nombres: Iterable[str]) -> int:
+    total = 0
+    for nombre in nombres:
+        path = base_dir / nombre
+        if path.exists():
+            total += len(abrir(path).getbuffer())
+    return total
@@ -0,0 +1,109 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set
+from Backend.utils.config import settings
+from Backend.utils.database import SessionLocal
+from Backend.services import descarga_service, documento_cache, render_pool
+
+# Tras guardar un formulario se generan en segundo plano los documentos configurados y se
+# dejan en documento_cache, de modo que la descarga posterior sea un HIT. Los guardados
+# seguidos del mismo formulario se agrupan (PRERENDER_DELAY_SEG) y solo se genera la
+# ultima version; si llega una version nueva a mitad de trabajo, el resto se abandona.
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_objetivo: Dict[int, int] = {}   # form_id -> ultima version pedida
+_activos: Set[int] = set()       # formularios programados o en proceso
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _docs() -> List[str]:
+    pedidos = settings.PRERENDER_DOCS
+    if "*" in pedidos:
+        return list(descarga_service.DOCUMENTOS)
+    return [d for d in pedidos if d in descarga_service.DOCUMENTOS]
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, settings.PRERENDER_WORKERS), thread_name_prefix="prerender"
+                )
+    return _executor
+
+
+def encolar(form_id: int, version: int) -> None:
+    if not settings.PRERENDER_ENABLED:
+        return
+    with _lock:
+        _objetivo[form_id] = max(version, _objetivo.get(form_id, 0))
+        if form_id in _activos:
+            return
+        _activos.add(form_id)
+    _programar(form_id)
+
+
+def _programar(form_id: int) -> None:
+    t = threading.Timer(settings.PRERENDER_DELAY_SEG, lambda: _pool().submit(_procesar, form_id))
+    t.daemon = True
+    t.start()
+
+
+def _obsoleto(form_id: int, version: int) -> bool:
+    return _objetivo.get(form_id, 0) > version
+
+
+def _procesar(form_id: int) -> None:
+    with _lock:
+        version = _objetivo.get(form_id, 0)
+    try:
+        _renderizar(form_id, version)
+    except Exception:
+        log.exception("Pre-generacion fallida para formulario %s", form_id)
+    finally:
+        with _lock:
+            repetir = _obsoleto(form_id, version)
+            if not repetir:
+                _activos.discard(form_id)
+                _objetivo.pop(form_id, None)
+        if repetir:
+            _programar(form_id)
+
+
+def _renderizar(form_id: int, version: int) -> None:
+    if _obsoleto(form_id, version):
+        return
+    # Misma lectura que el paquete ZIP: la base comun una vez para todos los documentos
+    with SessionLocal() as db:
+        entradas = descarga_service.contextos_paquete(db, form_id, _docs())
+
+    for entrada in entradas:
+        if entrada.cacheado is not None:
+            continue
+        if entrada.error:
+            log.warning("Pre-generacion de %s omitida para formulario %s: %s", entrada.doc, form_id, entrada.error)
+            continue
+        if _obsoleto(form_id, version):
+            return
+        documento = descarga_service.DOCUMENTOS[entrada.doc]
+        with documento_cache.exclusivo(entrada.clave):
+            if documento_cache.obtener(entrada.clave) is not None:
+                continue  # lo genero una descarga u otro worker mientras tanto
+            bio, filename = render_pool.ejecutar(documento.render, form_id, entrada.contexto)
+            contenido = bio.getvalue()
+            if contenido:
+                documento_cache.guardar(entrada.clave, contenido, filename, documento.media_type)
+
+
+def estado() -> dict:
+    with _lock:
+        return {
+            "habilitado": settings.PRERENDER_ENABLED,
+            "documentos": _docs(),
+            "formularios_pendientes": sorted(_activos),
+        }
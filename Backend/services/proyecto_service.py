@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import func, cast, String
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, cast, String, select, update
 from typing import List, Optional, Tuple
 from Backend.models import (
     LineaEstrategica, Programa, Sector, Meta,
@@ -27,29 +28,23 @@ _TRANS   = str.maketrans(_ACCENTS, _ASCII)
 def listar_lineas(db: Session) -> List[LineaEstrategica]:
     return db.query(LineaEstrategica).order_by(LineaEstrategica.nombre_linea_estrategica).all()
 
-def listar_sectores(db: Session, linea_id: int) -> List[Sector]:
-    return (
-        db.query(Sector)
-        .filter(Sector.id_linea_estrategica == linea_id)
-        .order_by(Sector.nombre_sector)
-        .all()
-    )
+def listar_sectores(db: Session, linea_id: Optional[int] = None) -> List[Sector]:
+    q = db.query(Sector)
+    if linea_id is not None:
+        q = q.filter(Sector.id_linea_estrategica == linea_id)
+    return q.order_by(Sector.nombre_sector).all()
 
-def listar_programas(db: Session, sector_id: int) -> List[Programa]:
-    return (
-        db.query(Programa)
-        .filter(Programa.id_sector == sector_id)
-        .order_by(Programa.nombre_programa)
-        .all()
-    )
+def listar_programas(db: Session, sector_id: Optional[int] = None) -> List[Programa]:
+    q = db.query(Programa)
+    if sector_id is not None:
+        q = q.filter(Programa.id_sector == sector_id)
+    return q.order_by(Programa.nombre_programa).all()
 
-def listar_metas(db: Session, programa_id: int) -> List[Meta]:
-    return (
-        db.query(Meta)
-        .filter(Meta.id_programa == programa_id)
-        .order_by(Meta.numero_meta)
-        .all()
-    )
+def listar_metas(db: Session, programa_id: Optional[int] = None) -> List[Meta]:
+    q = db.query(Meta)
+    if programa_id is not None:
+        q = q.filter(Meta.id_programa == programa_id)
+    return q.order_by(Meta.numero_meta, Meta.id).all()
 
 def listar_dependencias(db: Session):
     return db.query(Dependencia).order_by(Dependencia.nombre_dependencia).all()
@@ -111,6 +106,23 @@ def crear_formulario(db: Session, data: schemas.FormularioCreate) -> Formulario:
 def obtener_formulario(db: Session, form_id: int) -> Optional[Formulario]:
     return db.get(Formulario, form_id)
 
+def obtener_version(db: Session, form_id: int) -> Optional[int]:
+    return db.query(Formulario.version).filter(Formulario.id == form_id).scalar()
+
+def obtener_versiones(db: Session, form_ids: list) -> dict[int, int]:
+    return dict(db.query(Formulario.id, Formulario.version).filter(Formulario.id.in_(form_ids)).all())
+
+def _marcar_cambio(db: Session, form_id: int) -> Optional[int]:
+    # Se confirma junto con la escritura que lo invoca. Devuelve la version que deja esta escritura
+    # (None si el formulario no existe): releerla despues del commit podria traer la de otro guardado
+    return db.execute(
+        update(Formulario)
+        .where(Formulario.id == form_id)
+        .values(version=Formulario.version + 1)
+        .returning(Formulario.version)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
 def leer_formulario(db: Session, form_id: int) -> Tuple[Optional[Formulario], List[Meta]]:
     form = db.get(Formulario, form_id)
     if not form:
@@ -166,8 +178,9 @@ def asignar_subcategorias(db: Session, form_id: int, subcategoria_ids: List[int]
     db.add_all(rows)
     db.commit()
 
-def asignar_estructura_financiera(db: Session, form_id: int, filas) -> None:
+def asignar_estructura_financiera(db: Session, form_id: int, filas) -> Optional[int]:
     db.query(EstructuraFinanciera).filter(EstructuraFinanciera.id_formulario == form_id).delete()
+    version = _marcar_cambio(db, form_id)
     to_add = []
     by_year = {}
 
@@ -202,6 +215,7 @@ def asignar_estructura_financiera(db: Session, form_id: int, filas) -> None:
     if to_add:
         db.add_all(to_add)
     db.commit()
+    return version
 
 # -------------------------
 # Listar por formulario (JOIN)
@@ -286,18 +300,19 @@ def listar_proyectos(db: Session) -> List[Formulario]:
         .all()
     )
 
-def update_formulario_basicos(db: Session, form_id: int, data: schemas.FormularioUpsertBasicos) -> Formulario:
+def update_formulario_basicos(db: Session, form_id: int, data: schemas.FormularioUpsertBasicos) -> Tuple[Formulario, int]:
     form = db.get(Formulario, form_id)
     if not form:
         raise ValueError("Formulario no encontrado")
     for field, value in data.model_dump(exclude_unset=True).items():
         setattr(form, field, value)
+    version = _marcar_cambio(db, form_id)
     db.commit()
     db.refresh(form)
-    return form
+    return form, version
 
 
-def update_formulario_radicacion(db: Session, form_id: int, data: schemas.FormularioRadicacionUpsert) -> Formulario:
+def update_formulario_radicacion(db: Session, form_id: int, data: schemas.FormularioRadicacionUpsert) -> Tuple[Formulario, int]:
     form = db.get(Formulario, form_id)
     if not form:
         raise ValueError("Formulario no encontrado")
@@ -309,16 +324,20 @@ def update_formulario_radicacion(db: Session, form_id: int, data: schemas.Formul
     form.soportes_planos = max(0, int(data.soportes_planos or 0))
     form.soportes_cds = max(0, int(data.soportes_cds or 0))
     form.soportes_otros = max(0, int(data.soportes_otros or 0))
+    version = _marcar_cambio(db, form_id)
 
     db.commit()
     db.refresh(form)
-    return form
+    return form, version
 
-def replace_metas(db: Session, form_id: int, meta_ids: List[int]) -> None:
+def replace_metas(db: Session, form_id: int, meta_ids: List[int]) -> Optional[int]:
     db.query(Metas).filter(Metas.id_formulario == form_id).delete()
+    version = _marcar_cambio(db, form_id)
     asignar_metas(db, form_id, meta_ids or [])
+    db.commit()
+    return version
 
-def replace_metas_detalle(db: Session, form_id: int, metas_detalle: List[dict]) -> None:
+def replace_metas_detalle(db: Session, form_id: int, metas_detalle: List[dict]) -> Optional[int]:
     db.query(Metas).filter(Metas.id_formulario == form_id).delete()
     rows = []
     for item in metas_detalle or []:
@@ -335,42 +354,68 @@ def replace_metas_detalle(db: Session, form_id: int, metas_detalle: List[dict])
         ))
     if rows:
         db.add_all(rows)
+    version = _marcar_cambio(db, form_id)
     db.commit()
+    return version
 
-def replace_variables_sectorial(db: Session, form_id: int, variable_ids: List[int]) -> None:
+def replace_variables_sectorial(db: Session, form_id: int, variable_ids: List[int]) -> Optional[int]:
     db.query(VariablesSectorialRel).filter(VariablesSectorialRel.id_formulario == form_id).delete()
+    version = _marcar_cambio(db, form_id)
     asignar_variables_sectorial(db, form_id, variable_ids or [])
+    db.commit()
+    return version
 
-def replace_variables_tecnico(db: Session, form_id: int, variable_ids: List[int]) -> None:
+def replace_variables_tecnico(db: Session, form_id: int, variable_ids: List[int]) -> Optional[int]:
     db.query(VariablesTecnicoRel).filter(VariablesTecnicoRel.id_formulario == form_id).delete()
+    version = _marcar_cambio(db, form_id)
     asignar_variables_tecnico(db, form_id, variable_ids or [])
+    db.commit()
+    return version
 
-def replace_politicas(db: Session, form_id: int, politica_ids: List[int], valores: List[float] | None = None) -> None:
+def replace_politicas(db: Session, form_id: int, politica_ids: List[int], valores: List[float] | None = None) -> Optional[int]:
     db.query(PoliticasRel).filter(PoliticasRel.id_formulario == form_id).delete()
+    version = _marcar_cambio(db, form_id)
     asignar_politicas(db, form_id, politica_ids or [], valores or [])
+    db.commit()
+    return version
 
-def replace_categorias(db: Session, form_id: int, categoria_ids: List[int]) -> None:
+def replace_categorias(db: Session, form_id: int, categoria_ids: List[int]) -> Optional[int]:
     db.query(CategoriasRel).filter(CategoriasRel.id_formulario == form_id).delete()
+    version = _marcar_cambio(db, form_id)
     asignar_categorias(db, form_id, categoria_ids or [])
+    db.commit()
+    return version
 
-def replace_subcategorias(db: Session, form_id: int, subcategoria_ids: List[int]) -> None:
+def replace_subcategorias(db: Session, form_id: int, subcategoria_ids: List[int]) -> Optional[int]:
     db.query(SubcategoriasRel).filter(SubcategoriasRel.id_formulario == form_id).delete()
+    version = _marcar_cambio(db, form_id)
     asignar_subcategorias(db, form_id, subcategoria_ids or [])
+    db.commit()
+    return version
 
 def listar_proyectos_pag(db: Session, nombre: Optional[str], cod_id_mga: Optional[str], id_dependencia: Optional[int],
                          page:int, page_size:int) -> tuple[list[Formulario], int]:
-    q = db.query(Formulario)
+    q = db.query(Formulario).filter(*filtros_proyectos(nombre, cod_id_mga, id_dependencia))
+    total = q.count()
+    rows = q.order_by(Formulario.id.desc()).offset((page-1)*page_size).limit(page_size).all()
+    return rows, total
+
+def listar_ids_proyectos(db: Session, nombre: Optional[str], cod_id_mga: Optional[str],
+                         id_dependencia: Optional[int]) -> list[int]:
+    q = db.query(Formulario.id).filter(*filtros_proyectos(nombre, cod_id_mga, id_dependencia))
+    return [fid for (fid,) in q.order_by(Formulario.id.desc()).all()]
+
+def filtros_proyectos(nombre: Optional[str], cod_id_mga: Optional[str], id_dependencia: Optional[int]) -> list:
+    filtros = []
     if nombre:
-        q = q.filter(_ilike_no_accents(Formulario.nombre_proyecto, nombre))
+        filtros.append(_ilike_no_accents(Formulario.nombre_proyecto, nombre))
     if cod_id_mga is not None:
         cod_txt = "".join(ch for ch in cod_id_mga if ch.isdigit())
         if cod_txt:
-            q = q.filter(cast(Formulario.cod_id_mga, String).like(f"%{cod_txt}%"))
+            filtros.append(cast(Formulario.cod_id_mga, String).like(f"%{cod_txt}%"))
     if id_dependencia is not None:
-        q = q.filter(Formulario.id_dependencia == id_dependencia)
-    total = q.count()
-    rows = q.order_by(Formulario.id.desc()).offset((page-1)*page_size).limit(page_size).all()
-    return rows, total
+        filtros.append(Formulario.id_dependencia == id_dependencia)
+    return filtros
 
 def crear_formulario_minimo(db: Session, data: schemas.FormularioCreateMinimo) -> Formulario:
     existing = (
@@ -385,6 +430,7 @@ def crear_formulario_minimo(db: Session, data: schemas.FormularioCreateMinimo) -
     if existing:
         if data.nombre_proyecto and data.nombre_proyecto.strip() and data.nombre_proyecto.strip() != (existing.nombre_proyecto or "").strip():
             existing.nombre_proyecto = data.nombre_proyecto.strip()
+            _marcar_cambio(db, existing.id)
             db.commit()
             db.refresh(existing)
         return existing
@@ -423,14 +469,16 @@ def listar_funcionarios_viabilidad(db: Session, form_id: int):
         .all()
     )
 
-def replace_viabilidades(db: Session, form_id: int, ids: List[int]):
+def replace_viabilidades(db: Session, form_id: int, ids: List[int]) -> Optional[int]:
     db.query(Viabilidades).filter(Viabilidades.id_formulario == form_id).delete()
     rows = [Viabilidades(id_formulario=form_id, id_viabilidad=i) for i in (ids or [])]
     if rows:
         db.add_all(rows)
+    version = _marcar_cambio(db, form_id)
     db.commit()
+    return version
 
-def replace_funcionarios_viabilidad(db: Session, form_id: int, filas: List[dict]):
+def replace_funcionarios_viabilidad(db: Session, form_id: int, filas: List[dict]) -> Optional[int]:
     db.query(FuncionarioViabilidad).filter(FuncionarioViabilidad.id_formulario == form_id).delete()
     to_add = []
     for f in filas or []:
@@ -446,7 +494,9 @@ def replace_funcionarios_viabilidad(db: Session, form_id: int, filas: List[dict]
             ))
     if to_add:
         db.add_all(to_add)
+    version = _marcar_cambio(db, form_id)
     db.commit()
+    return version
 
 def _ilike_no_accents(column, term: str):
     term_norm = (term or "").translate(_TRANS).lower()
@@ -465,7 +515,7 @@ def listar_cat_viabilidad(db):
 def leer_respuestas_viab(db, form_id:int):
     return leer_respuestas_viabilidad(db, form_id)
 
-def upsert_respuestas_sectorial(db, form_id:int, pares:list[tuple[int,str]]):
+def upsert_respuestas_sectorial(db, form_id:int, pares:list[tuple[int,str]]) -> Optional[int]:
     cat = {v.id: v.no_aplica for v in listar_variables_sectorial(db)}
     db.query(VariablesSectorialRel).filter(VariablesSectorialRel.id_formulario==form_id).delete()
     to_add=[]
@@ -478,9 +528,11 @@ def upsert_respuestas_sectorial(db, form_id:int, pares:list[tuple[int,str]]):
             continue
         to_add.append(VariablesSectorialRel(id_formulario=form_id, id_variable_sectorial=vid, respuesta=resp))
     if to_add: db.add_all(to_add)
+    version = _marcar_cambio(db, form_id)
     db.commit()
+    return version
 
-def upsert_respuestas_tecnico(db, form_id:int, pares:list[tuple[int,str]]):
+def upsert_respuestas_tecnico(db, form_id:int, pares:list[tuple[int,str]]) -> Optional[int]:
     cat = {v.id: v.no_aplica for v in listar_variables_tecnico(db)}
     db.query(VariablesTecnicoRel).filter(VariablesTecnicoRel.id_formulario==form_id).delete()
     to_add=[]
@@ -493,9 +545,11 @@ def upsert_respuestas_tecnico(db, form_id:int, pares:list[tuple[int,str]]):
             continue
         to_add.append(VariablesTecnicoRel(id_formulario=form_id, id_variable_tecnico=vid, respuesta=resp))
     if to_add: db.add_all(to_add)
+    version = _marcar_cambio(db, form_id)
     db.commit()
+    return version
 
-def upsert_respuestas_viab(db, form_id:int, pares:list[tuple[int,str]]):
+def upsert_respuestas_viab(db, form_id:int, pares:list[tuple[int,str]]) -> Optional[int]:
     cat = {v.id: v.no_aplica for v in listar_viabilidad(db)}
     db.query(Viabilidades).filter(Viabilidades.id_formulario==form_id).delete()
     to_add=[]
@@ -508,7 +562,9 @@ def upsert_respuestas_viab(db, form_id:int, pares:list[tuple[int,str]]):
             continue
         to_add.append(Viabilidades(id_formulario=form_id, id_viabilidad=vid, respuesta=resp))
     if to_add: db.add_all(to_add)
+    version = _marcar_cambio(db, form_id)
     db.commit()
+    return version
 
 
 def crear_observacion_evaluacion(
@@ -596,3 +652,107 @@ def listar_observaciones_evaluacion(db: Session, form_id: int) -> list[Observaci
         .order_by(ObservacionEvaluacion.created_at.desc(), ObservacionEvaluacion.id.desc())
         .all()
     )
+
+
+# -------------------------
+# Lecturas async (AsyncSession)
+# -------------------------
+# Mismo orden que los listar_* sincronos para que el snapshot de catalogos sea identico
+_ORDEN_CATALOGOS = {
+    "lineas": (LineaEstrategica, (LineaEstrategica.nombre_linea_estrategica,)),
+    "sectores": (Sector, (Sector.nombre_sector,)),
+    "programas": (Programa, (Programa.nombre_programa,)),
+    "metas": (Meta, (Meta.numero_meta, Meta.id)),
+    "dependencias": (Dependencia, (Dependencia.nombre_dependencia,)),
+    "variables_sectorial": (VariableSectorial, (VariableSectorial.nombre_variable,)),
+    "variables_tecnico": (VariableTecnico, (VariableTecnico.nombre_variable,)),
+    "politicas": (Politica, (Politica.nombre_politica,)),
+    "categorias": (Categoria, (Categoria.nombre_categoria,)),
+    "subcategorias": (Subcategoria, (Subcategoria.nombre_subcategoria,)),
+    "viabilidad": (Viabilidad, (Viabilidad.id,)),
+    "tipos_viabilidad": (TipoViabilidad, (TipoViabilidad.id,)),
+}
+
+async def listar_catalogo_async(db: AsyncSession, clave: str) -> list:
+    modelo, orden = _ORDEN_CATALOGOS[clave]
+    return list((await db.scalars(select(modelo).order_by(*orden))).all())
+
+async def listar_proyectos_pag_async(db: AsyncSession, nombre: Optional[str], cod_id_mga: Optional[str],
+                                     id_dependencia: Optional[int], page: int, page_size: int):
+    filtros = filtros_proyectos(nombre, cod_id_mga, id_dependencia)
+    total = await db.scalar(select(func.count(Formulario.id)).where(*filtros))
+    rows = await db.scalars(
+        select(Formulario).where(*filtros)
+        .order_by(Formulario.id.desc()).offset((page-1)*page_size).limit(page_size)
+    )
+    return list(rows.all()), total or 0
+
+async def obtener_version_async(db: AsyncSession, form_id: int) -> Optional[int]:
+    return await db.scalar(select(Formulario.version).where(Formulario.id == form_id))
+
+async def leer_modelo_formulario_async(db: AsyncSession, form_id: int) -> Optional[dict]:
+    form = await db.get(Formulario, form_id)
+    if not form:
+        return None
+
+    async def _todas(stmt):
+        return list((await db.execute(stmt)).all())
+
+    async def _escalares(stmt):
+        return list((await db.scalars(stmt)).all())
+
+    return {
+        "form": form,
+        "metas": await _todas(
+            select(Meta, Metas.meta_proyecto)
+            .join(Metas, Metas.id_meta == Meta.id)
+            .where(Metas.id_formulario == form_id)
+            .order_by(Meta.numero_meta, Meta.id)
+        ),
+        "variables_sectorial": await _escalares(
+            select(VariableSectorial)
+            .join(VariablesSectorialRel, VariablesSectorialRel.id_variable_sectorial == VariableSectorial.id)
+            .where(VariablesSectorialRel.id_formulario == form_id)
+            .order_by(VariableSectorial.nombre_variable)
+        ),
+        "variables_tecnico": await _escalares(
+            select(VariableTecnico)
+            .join(VariablesTecnicoRel, VariablesTecnicoRel.id_variable_tecnico == VariableTecnico.id)
+            .where(VariablesTecnicoRel.id_formulario == form_id)
+            .order_by(VariableTecnico.nombre_variable)
+        ),
+        "politicas": await _todas(
+            select(Politica, PoliticasRel.valor_destinado)
+            .join(PoliticasRel, PoliticasRel.id_politica == Politica.id)
+            .where(PoliticasRel.id_formulario == form_id)
+            .order_by(Politica.id)
+        ),
+        "categorias": await _escalares(
+            select(Categoria)
+            .join(CategoriasRel, CategoriasRel.id_categoria == Categoria.id)
+            .where(CategoriasRel.id_formulario == form_id)
+            .order_by(Categoria.nombre_categoria)
+        ),
+        "subcategorias": await _escalares(
+            select(Subcategoria)
+            .join(SubcategoriasRel, SubcategoriasRel.id_subcategoria == Subcategoria.id)
+            .where(SubcategoriasRel.id_formulario == form_id)
+            .order_by(Subcategoria.nombre_subcategoria)
+        ),
+        "estructura_financiera": await _escalares(
+            select(EstructuraFinanciera)
+            .where(EstructuraFinanciera.id_formulario == form_id)
+            .order_by(EstructuraFinanciera.anio.nullsfirst(), EstructuraFinanciera.entidad)
+        ),
+        "viabilidades": await _escalares(
+            select(Viabilidad)
+            .join(Viabilidades, Viabilidades.id_viabilidad == Viabilidad.id)
+            .where(Viabilidades.id_formulario == form_id)
+            .order_by(Viabilidad.nombre)
+        ),
+        "funcionarios_viabilidad": await _escalares(
+            select(FuncionarioViabilidad)
+            .where(FuncionarioViabilidad.id_formulario == form_id)
+            .order_by(FuncionarioViabilidad.id_tipo_viabilidad)
+        ),
+    }
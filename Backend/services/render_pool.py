@@ -0,0 +1,154 @@
+import multiprocessing
+import os
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional
+from Backend.utils import bloqueo, instrumentacion
+from Backend.utils.config import settings
+
+# Llenado de plantillas fuera del hilo de la peticion. openpyxl/python-docx son CPU puro y
+# retienen el GIL, asi que con RENDER_BACKEND=process varias generaciones corren en paralelo
+# real; "thread" solo acota la concurrencia e "inline" genera en el mismo hilo.
+# Los procesos se crean con spawn (no heredan el engine ni hilos del padre) y al arrancar
+# importan los modulos de llenado y dejan en memoria los bytes de todas las plantillas.
+# Los spans medidos dentro del worker (p. ej. openpyxl.cargar) viajan con el resultado y
+# se registran en la solicitud que lo espera (resultado()/ejecutar()).
+# RENDER_MAX_GLOBAL acota los llenados simultaneos de todo el host (todos los workers de
+# gunicorn/uvicorn y sus pools) con un semaforo de archivos; la espera se mide como render.espera.
+
+_lock = threading.Lock()
+_executor: Optional[Executor] = None
+_en_curso = 0
+_completados = 0
+_fallidos = 0
+
+
+def _backend() -> str:
+    backend = (settings.RENDER_BACKEND or "inline").lower()
+    return backend if backend in ("inline", "thread", "process") else "inline"
+
+
+def _workers() -> int:
+    return settings.RENDER_WORKERS if settings.RENDER_WORKERS > 0 else (os.cpu_count() or 2)
+
+
+def _inicializar_worker() -> None:
+    from Backend.services import descarga_service, plantillas
+    plantillas.precargar(descarga_service.BASE_DIR, {d.plantilla for d in descarga_service.DOCUMENTOS.values()})
+
+
+def _pool() -> Executor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                if _backend() == "process":
+                    _executor = ProcessPoolExecutor(
+                        max_workers=_workers(),
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_inicializar_worker,
+                    )
+                else:
+                    _executor = ThreadPoolExecutor(max_workers=_workers(), thread_name_prefix="render")
+    return _executor
+
+
+def _terminado(fut: Future) -> None:
+    global _en_curso, _completados, _fallidos
+    with _lock:
+        _en_curso -= 1
+        if fut.cancelled() or fut.exception() is not None:
+            _fallidos += 1
+        else:
+            _completados += 1
+
+
+def _cupo():
+    if settings.RENDER_MAX_GLOBAL <= 0:
+        return nullcontext()
+    return bloqueo.semaforo("render", settings.RENDER_MAX_GLOBAL)
+
+
+def _medido(fn: Callable, *args):
+    t0 = time.perf_counter()
+    with _cupo():
+        espera = time.perf_counter() - t0
+        with instrumentacion.recolectar() as m:
+            t0 = time.perf_counter()
+            valor = fn(*args)
+            total = time.perf_counter() - t0
+    # Lo que no cae en cargar/guardar es el llenado propio de la libreria
+    libs = {nombre.split(".", 1)[0] for nombre, _ in m.spans}
+    lib = libs.pop() if len(libs) == 1 else "render"
+    medido = sum(seg for _, seg in m.spans)
+    spans = m.spans + [(f"{lib}.llenar", max(total - medido, 0.0))]
+    if settings.RENDER_MAX_GLOBAL > 0:
+        spans.append(("render.espera", espera))
+    return valor, spans
+
+
+def enviar(fn: Callable, *args) -> Future:
+    """fn y sus argumentos deben poder serializarse con pickle (funciones de modulo, partial, dicts)."""
+    global _en_curso
+    with _lock:
+        _en_curso += 1
+    fut: Future = Future()
+    fut.spans = []
+
+    def _copiar(interno: Future) -> None:
+        try:
+            valor, fut.spans = interno.result()
+        except BaseException as e:
+            fut.set_exception(e)
+        else:
+            fut.set_result(valor)
+
+    if _backend() == "inline":
+        interno: Future = Future()
+        try:
+            interno.set_result(_medido(fn, *args))
+        except BaseException as e:
+            interno.set_exception(e)
+        _copiar(interno)
+    else:
+        try:
+            interno = _pool().submit(_medido, fn, *args)
+        except BaseException:
+            with _lock:
+                _en_curso -= 1
+            raise
+        interno.add_done_callback(_copiar)
+    fut.add_done_callback(_terminado)
+    return fut
+
+
+def resultado(fut: Future):
+    """fut.result() registrando los spans del worker en la solicitud actual."""
+    valor = fut.result()
+    instrumentacion.registrar_spans(getattr(fut, "spans", []))
+    return valor
+
+
+def ejecutar(fn: Callable, *args):
+    return resultado(enviar(fn, *args))
+
+
+def cerrar() -> None:
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def estado() -> dict:
+    with _lock:
+        return {
+            "backend": _backend(),
+            "workers": 1 if _backend() == "inline" else _workers(),
+            "en_curso": _en_curso,
+            "completados": _completados,
+            "fallidos": _fallidos,
+        }
@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import Numeric, and_, case, cast, column, distinct, func, not_, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from Backend.models import Dependencia, EstructuraFinanciera, Formulario, LineaEstrategica, Meta, Metas, Programa, Sector
+from Backend.services import catalogo_cache
+from Backend.utils.config import settings
+from Backend.utils.database import SessionLocal
+
+# Totales de estructura_financiera servidos desde mv_resumen_financiero
+# (Migrations/06). Cada guardado de formulario llama marcar_cambio(); los guardados
+# seguidos se agrupan en un solo REFRESH CONCURRENTLY, que no bloquea las lecturas.
+
+log = logging.getLogger(__name__)
+
+_mv = table(
+    "mv_resumen_financiero",
+    column("anio"), column("entidad"), column("id_dependencia"),
+    column("id_sector"), column("id_linea_estrategica"), column("valor"), column("registros"),
+)
+
+# dimension -> (columna de la vista, (modelo, columna nombre) para mostrar)
+DIMENSIONES = {
+    "anio": (_mv.c.anio, None),
+    "entidad": (_mv.c.entidad, None),
+    "dependencia": (_mv.c.id_dependencia, (Dependencia, Dependencia.nombre_dependencia)),
+    "sector": (_mv.c.id_sector, (Sector, Sector.nombre_sector)),
+    "linea": (_mv.c.id_linea_estrategica, (LineaEstrategica, LineaEstrategica.nombre_linea_estrategica)),
+}
+
+_lock = threading.Lock()
+_refresco_lock = threading.Lock()
+_programado = False
+_version_datos = 0
+
+
+def version_datos() -> int:
+    """Contador de escrituras de formularios en este proceso; sirve de clave para caches de reportes."""
+    return _version_datos
+
+
+def marcar_cambio() -> None:
+    global _programado, _version_datos
+    with _lock:
+        _version_datos += 1
+        if _programado or not settings.REPORTES_REFRESH_AUTO:
+            return
+        _programado = True
+    t = threading.Timer(settings.REPORTES_REFRESH_SEG, _refresco_programado)
+    t.daemon = True
+    t.start()
+
+
+def _refresco_programado() -> None:
+    global _programado
+    with _lock:
+        _programado = False
+    try:
+        refrescar()
+    except Exception:
+        log.exception("No se pudo refrescar mv_resumen_financiero")
+
+
+# La hora del ultimo refresco se guarda como comentario de la vista: la ven todos los workers
+_SQL_ACTUALIZADO = text("SELECT obj_description('mv_resumen_financiero'::regclass, 'pg_class')")
+
+
+def refrescar() -> datetime:
+    actualizado = datetime.now(timezone.utc)
+    with _refresco_lock, SessionLocal() as db:
+        db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY mv_resumen_financiero"))
+        db.execute(text(f"COMMENT ON MATERIALIZED VIEW mv_resumen_financiero IS '{actualizado.isoformat()}'"))
+        db.commit()
+    return actualizado
+
+
+async def resumen_financiero(
+    db: AsyncSession,
+    agrupar: List[str],
+    anio: Optional[int] = None,
+    entidad: Optional[str] = None,
+    id_dependencia: Optional[int] = None,
+    id_sector: Optional[int] = None,
+    id_linea_estrategica: Optional[int] = None,
+) -> dict:
+    filtros = []
+    if anio is not None:
+        filtros.append(_mv.c.anio == anio)
+    if entidad:
+        # "SGP" agrupa todas las variantes SGP_*
+        ent = entidad.strip().upper()
+        filtros.append(_mv.c.entidad.like(f"{ent}%") if ent == "SGP" else _mv.c.entidad == ent)
+    if id_dependencia is not None:
+        filtros.append(_mv.c.id_dependencia == id_dependencia)
+    if id_sector is not None:
+        filtros.append(_mv.c.id_sector == id_sector)
+    if id_linea_estrategica is not None:
+        filtros.append(_mv.c.id_linea_estrategica == id_linea_estrategica)
+
+    cols, grupo, origen = [], [], _mv
+    for dim in agrupar:
+        col, nombre = DIMENSIONES[dim]
+        cols.append(col.label(dim if nombre is None else f"id_{dim}"))
+        grupo.append(col)
+        if nombre is not None:
+            modelo, col_nombre = nombre
+            origen = origen.outerjoin(modelo, modelo.id == col)
+            cols.append(func.max(col_nombre).label(f"nombre_{dim}"))
+
+    stmt = (
+        select(*cols, func.sum(_mv.c.valor).label("valor"))
+        .select_from(origen)
+        .where(*filtros)
+        .group_by(*grupo)
+        .order_by(*grupo)
+    )
+    filas = [dict(r._mapping) for r in (await db.execute(stmt)).all()]
+    actualizado = (await db.execute(_SQL_ACTUALIZADO)).scalar()
+    return {
+        "agrupado_por": agrupar,
+        "filas": filas,
+        "total": sum((f["valor"] or 0) for f in filas),
+        "actualizado": actualizado,
+    }
+
+
+# =========================
+# Cobertura de metas del plan indicativo
+# =========================
+# Por meta: proyectos que la incluyen, suma de metas.meta_proyecto (texto; solo se suman
+# los valores numericos) y financiacion total de esos proyectos. Un proyecto con varias
+# metas aporta su financiacion completa a cada una; en programa y sector se cuenta una vez.
+# El resultado completo se guarda en memoria con clave (catalogos, escrituras locales,
+# huella de formulario en BD), asi que solo se recalcula cuando algo cambio.
+
+_NUMERO = r"^[0-9]+(\.[0-9]+)?$"
+_cobertura: Optional[Tuple[tuple, dict]] = None
+_huella_datos: Optional[str] = None
+_huella_datos_revisada = 0.0
+_cobertura_lock: Optional[asyncio.Lock] = None
+
+
+def _financiacion():
+    ef = EstructuraFinanciera
+    return select(ef.id_formulario, func.sum(ef.valor).label("total")).group_by(ef.id_formulario).subquery()
+
+
+def _sql_por_meta():
+    num = func.replace(func.trim(Metas.meta_proyecto), ",", ".")
+    es_numero = num.regexp_match(_NUMERO)
+    ef = _financiacion()
+    return (
+        select(
+            Metas.id_meta,
+            func.count(distinct(Metas.id_formulario)).label("proyectos"),
+            func.sum(case((es_numero, cast(num, Numeric(18, 4))))).label("meta_proyecto_total"),
+            func.sum(case((and_(func.coalesce(func.trim(Metas.meta_proyecto), "") != "", not_(es_numero)), 1), else_=0))
+            .label("meta_proyecto_no_numerico"),
+            func.sum(ef.c.total).label("financiacion"),
+        )
+        .outerjoin(ef, ef.c.id_formulario == Metas.id_formulario)
+        .group_by(Metas.id_meta)
+    )
+
+
+def _sql_por_grupo(col_grupo, *joins):
+    # Pares (grupo, formulario) distintos: la financiacion de un proyecto se suma una vez por grupo
+    pares = select(col_grupo.label("id_grupo"), Metas.id_formulario).join(Meta, Meta.id == Metas.id_meta)
+    for modelo, cond in joins:
+        pares = pares.join(modelo, cond)
+    pares = pares.distinct().subquery()
+    ef = _financiacion()
+    return (
+        select(pares.c.id_grupo, func.count().label("proyectos"), func.sum(ef.c.total).label("financiacion"))
+        .outerjoin(ef, ef.c.id_formulario == pares.c.id_formulario)
+        .group_by(pares.c.id_grupo)
+    )
+
+
+async def _calcular_cobertura(db: AsyncSession, snap: Dict[str, List[dict]]) -> dict:
+    por_meta = {r.id_meta: r for r in (await db.execute(_sql_por_meta())).all()}
+    por_programa = {r.id_grupo: r for r in (await db.execute(_sql_por_grupo(Meta.id_programa))).all()}
+    por_sector = {r.id_grupo: r for r in (await db.execute(
+        _sql_por_grupo(Programa.id_sector, (Programa, Programa.id == Meta.id_programa))
+    )).all()}
+
+    programas = {p["id"]: p for p in snap["programas"]}
+    sectores = {s["id"]: s for s in snap["sectores"]}
+    acumulado: Dict[int, dict] = {}
+
+    metas = []
+    for m in snap["metas"]:
+        r = por_meta.get(m["id"])
+        prog = programas.get(m["id_programa"]) or {}
+        fila = {
+            "id": m["id"],
+            "numero_meta": m["numero_meta"],
+            "nombre_meta": m["nombre_meta"],
+            "id_programa": m["id_programa"],
+            "id_sector": prog.get("id_sector"),
+            "proyectos": r.proyectos if r else 0,
+            "meta_proyecto_total": r.meta_proyecto_total if r else None,
+            "meta_proyecto_no_numerico": int(r.meta_proyecto_no_numerico or 0) if r else 0,
+            "financiacion": r.financiacion if r else None,
+        }
+        metas.append(fila)
+        acc = acumulado.setdefault(m["id_programa"], {"metas": 0, "metas_cubiertas": 0, "meta_proyecto_total": Decimal(0)})
+        acc["metas"] += 1
+        acc["metas_cubiertas"] += 1 if fila["proyectos"] else 0
+        acc["meta_proyecto_total"] += fila["meta_proyecto_total"] or 0
+    metas.sort(key=lambda f: (f["numero_meta"] is None, f["numero_meta"] or 0, f["id"]))
+
+    lista_programas = []
+    for pid, p in programas.items():
+        acc = acumulado.get(pid, {"metas": 0, "metas_cubiertas": 0, "meta_proyecto_total": Decimal(0)})
+        r = por_programa.get(pid)
+        lista_programas.append({
+            "id": pid, "codigo_programa": p["codigo_programa"], "nombre_programa": p["nombre_programa"],
+            "id_sector": p["id_sector"], **acc,
+            "proyectos": r.proyectos if r else 0, "financiacion": r.financiacion if r else None,
+        })
+    lista_programas.sort(key=lambda f: (f["codigo_programa"] is None, f["codigo_programa"] or 0))
+
+    lista_sectores = []
+    for sid, sec in sectores.items():
+        progs = [p for p in lista_programas if p["id_sector"] == sid]
+        r = por_sector.get(sid)
+        lista_sectores.append({
+            "id": sid, "codigo_sector": sec["codigo_sector"], "nombre_sector": sec["nombre_sector"],
+            "metas": sum(p["metas"] for p in progs),
+            "metas_cubiertas": sum(p["metas_cubiertas"] for p in progs),
+            "meta_proyecto_total": sum((p["meta_proyecto_total"] for p in progs), Decimal(0)),
+            "proyectos": r.proyectos if r else 0, "financiacion": r.financiacion if r else None,
+        })
+    lista_sectores.sort(key=lambda f: (f["codigo_sector"] is None, f["codigo_sector"] or 0))
+    return {"meta": metas, "programa": lista_programas, "sector": lista_sectores}
+
+
+async def _huella(db: AsyncSession) -> Optional[str]:
+    # Cambia con cada escritura confirmada (version) y con altas/bajas de formularios;
+    # cubre lo que guardan otros procesos, que no pasan por marcar_cambio() de este
+    global _huella_datos, _huella_datos_revisada
+    if _huella_datos is None or time.monotonic() - _huella_datos_revisada >= settings.REPORTES_HUELLA_SEG:
+        n, suma, maximo = (await db.execute(
+            select(func.count(Formulario.id), func.coalesce(func.sum(Formulario.version), 0), func.max(Formulario.id))
+        )).one()
+        _huella_datos = f"{n}:{suma}:{maximo}"
+        _huella_datos_revisada = time.monotonic()
+    return _huella_datos
+
+
+def _lock_cobertura() -> asyncio.Lock:
+    global _cobertura_lock
+    if _cobertura_lock is None:
+        _cobertura_lock = asyncio.Lock()
+    return _cobertura_lock
+
+
+async def cobertura_metas(db: AsyncSession) -> dict:
+    global _cobertura
+    snap = await catalogo_cache.snapshot_async(db)
+    clave = (await catalogo_cache.version_async(db), version_datos(), await _huella(db))
+    actual = _cobertura
+    if actual is not None and actual[0] == clave:
+        return actual[1]
+    async with _lock_cobertura():
+        if _cobertura is not None and _cobertura[0] == clave:
+            return _cobertura[1]
+        datos = await _calcular_cobertura(db, snap)
+        _cobertura = (clave, datos)
+        return datos
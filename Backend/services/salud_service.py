@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict
+from sqlalchemy import text
+from Backend.services import descarga_service, documento_cache, navegador, render_pool
+from Backend.utils import arranque
+from Backend.utils.config import settings
+from Backend.utils.database import engine, estado_pool
+
+# Chequeos de /health/ready. Cada uno devuelve {"ok": bool, ...}; "saturado" marca capacidad
+# agotada (pool sin conexiones, renders o PDF en cola por encima del umbral) para que el
+# orquestador deje de enrutar a la replica mientras se descarga. Chromium solo afecta a los PDF
+# del evaluador, asi que su caida o su cola se reportan pero no sacan a la instancia de servicio.
+
+_PING_CADA_SEG = 5.0
+_ping_lock = threading.Lock()
+_ping: dict = {}
+
+
+def _ping_db() -> dict:
+    # SELECT 1 como mucho cada _PING_CADA_SEG, para que los probes no consuman el pool
+    with _ping_lock:
+        if _ping and time.monotonic() - _ping["en"] < _PING_CADA_SEG:
+            return _ping["resultado"]
+        t0 = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            resultado = {"ok": True, "ms": round((time.perf_counter() - t0) * 1000, 1)}
+        except Exception as e:
+            resultado = {"ok": False, "error": str(e).splitlines()[0]}
+        _ping.update(en=time.monotonic(), resultado=resultado)
+        return resultado
+
+
+def db() -> dict:
+    estado = estado_pool()
+    capacidad = estado["pool_size"] + estado["max_overflow"]
+    pools = {"sync": estado, "async": estado["async"]}
+    saturado = any(p["en_uso"] >= capacidad for p in pools.values())
+    # Con el pool agotado el ping esperaria DB_POOL_TIMEOUT; se informa la saturacion sin consultar
+    ping = {"ok": True, "omitido": "pool agotado"} if saturado else _ping_db()
+    return {
+        "ok": ping["ok"],
+        "saturado": saturado,
+        "capacidad": capacidad,
+        "en_uso": {k: p["en_uso"] for k, p in pools.items()},
+        "timeouts": {k: p["timeouts"] for k, p in pools.items()},
+        "ping": ping,
+    }
+
+
+def plantillas() -> dict:
+    faltan = [n for n in descarga_service.plantillas_requeridas() if not (descarga_service.BASE_DIR / n).is_file()]
+    return {"ok": not faltan, "faltan": faltan}
+
+
+def disco() -> dict:
+    # Los llenados escriben en un directorio temporal antes de leerse a memoria
+    minimo = settings.SALUD_DISCO_MIN_MB * 1024 * 1024
+    directorios = {"salida": Path(tempfile.gettempdir()), "cache": documento_cache._directorio()}
+    libres = {k: shutil.disk_usage(d).free for k, d in directorios.items()}
+    return {
+        "ok": all(v >= minimo for v in libres.values()),
+        "minimo_mb": settings.SALUD_DISCO_MIN_MB,
+        "libre_mb": {k: round(v / 1024 / 1024) for k, v in libres.items()},
+    }
+
+
+def render() -> dict:
+    estado = render_pool.estado()
+    limite = max(1, int(estado["workers"] * settings.SALUD_RENDERS_POR_WORKER))
+    return {
+        "ok": True,
+        "saturado": estado["en_curso"] >= limite,
+        "en_curso": estado["en_curso"],
+        "limite": limite,
+        "backend": estado["backend"],
+    }
+
+
+def chromium() -> dict:
+    ok, error = navegador.disponible()
+    estado = navegador.estado()
+    return {
+        "ok": ok,
+        "error": error,
+        "saturado": estado["pendientes"] >= settings.SALUD_PDF_EN_COLA_MAX,
+        "pendientes": estado["pendientes"],
+        "limite": settings.SALUD_PDF_EN_COLA_MAX,
+    }
+
+
+_CHEQUEOS = {"db": db, "plantillas": plantillas, "disco": disco, "render": render, "chromium": chromium}
+_NO_CRITICOS = {"chromium"}
+
+
+def ready() -> dict:
+    chequeos: Dict[str, dict] = {}
+    for nombre, fn in _CHEQUEOS.items():
+        try:
+            chequeos[nombre] = fn()
+        except Exception as e:
+            chequeos[nombre] = {"ok": False, "error": str(e)}
+    caidos = [n for n, c in chequeos.items() if not c["ok"] and n not in _NO_CRITICOS]
+    saturados = [n for n, c in chequeos.items() if c.get("saturado") and n not in _NO_CRITICOS]
+    precalentamiento = arranque.estado()
+    return {
+        "listo": precalentamiento["listo"] and not caidos and not saturados,
+        "caidos": caidos,
+        "saturados": saturados,
+        "precalentamiento": precalentamiento,
+        "chequeos": chequeos,
+    }
@@ -1,11 +1,16 @@
+from __future__ import annotations
 import re
 import unicodedata
 import copy
 from pathlib import Path
-from typing import Dict, Optional, Callable
+from typing import TYPE_CHECKING, Dict, Optional, Callable
 from decimal import Decimal
-from docx import Document
-from docx.table import Table
+from Backend.services import plantillas
+from Backend.utils.instrumentacion import span
+
+# python-docx se importa al llenar el primer documento, no al arrancar el API
+if TYPE_CHECKING:
+    from docx.document import Document
 
 __all__ = ["fill_docx"]
 
@@ -228,6 +233,7 @@ def _clone_row_after(row, table):
     return table.rows[-1]
 
 def _insert_table_after(existing_table):
+    from docx.table import Table
     src_tbl = existing_table._tbl
     new_tbl_elm = copy.deepcopy(src_tbl)
     src_tbl.addnext(new_tbl_elm)
@@ -300,11 +306,13 @@ def expand_productos_in_carta(doc: Document, total_productos: int) -> None:
 # =========================
 
 def fill_docx(base_dir: Path, template_name: str, context: Dict[str, object], output_name: Optional[str] = None, output_dir: Optional[Path] = None,) -> Path:
+    from docx import Document
     template_path = base_dir / template_name
     if not template_path.exists():
         raise FileNotFoundError(f"No se encontró el template: {template_path}")
 
-    doc = Document(str(template_path))
+    with span("docx.cargar"):
+        doc = Document(plantillas.abrir(template_path))
 
     # --- 1) Expansión de metas/productos SOLO si viene __metas_ctx__
     metas_ctx = context.get("__metas_ctx__") or []
@@ -324,5 +332,6 @@ def fill_docx(base_dir: Path, template_name: str, context: Dict[str, object], ou
     out_dir = output_dir or base_dir
     out_dir.mkdir(parents=True, exist_ok=True)
     out_path = out_dir / (output_name or f"filled_{template_name}")
-    doc.save(str(out_path))
+    with span("docx.guardar"):
+        doc.save(str(out_path))
     return out_path
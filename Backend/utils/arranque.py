@@ -0,0 +1,133 @@
+import importlib
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import text
+from Backend.utils.config import settings
+from Backend.utils.database import Base, engine
+
+log = logging.getLogger(__name__)
+
+# Modulos que solo usa la generacion de documentos; se importan al primer uso (ver excel_fill,
+# word_fill, descarga_service.n2w) o en el paso "modulos" del precalentamiento.
+MODULOS_PESADOS = ("openpyxl", "docx", "num2words")
+
+_SQL_COLUMNAS = text(
+    "SELECT table_name, column_name FROM information_schema.columns WHERE table_schema = current_schema()"
+)
+
+
+def modo_esquema() -> str:
+    modo = settings.DB_ESQUEMA_ARRANQUE or ("verificar" if settings.ENV == "production" else "crear")
+    if modo not in ("crear", "verificar", "omitir"):
+        raise ValueError(f"DB_ESQUEMA_ARRANQUE invalido: {modo} (crear | verificar | omitir)")
+    return modo
+
+
+def faltantes_esquema() -> List[str]:
+    # Una sola consulta a information_schema en lugar del has_table por tabla de create_all
+    import Backend.models  # noqa: F401  registra todas las tablas en Base.metadata
+    with engine.connect() as conn:
+        existentes = {(t, c) for t, c in conn.execute(_SQL_COLUMNAS)}
+    tablas = {t for t, _ in existentes}
+    faltan = []
+    for tabla in Base.metadata.sorted_tables:
+        if tabla.name not in tablas:
+            faltan.append(tabla.name)
+            continue
+        faltan += [f"{tabla.name}.{c.name}" for c in tabla.columns if (tabla.name, c.name) not in existentes]
+    return faltan
+
+
+def preparar_esquema() -> None:
+    modo = modo_esquema()
+    t0 = time.perf_counter()
+    if modo == "crear":
+        Base.metadata.create_all(bind=engine)
+    elif modo == "verificar":
+        faltan = faltantes_esquema()
+        if faltan:
+            raise RuntimeError(
+                "La base no tiene el esquema que esperan los modelos (aplica Migrations/*.sql): "
+                + ", ".join(faltan)
+            )
+    log.info("Esquema (%s) en %.0f ms", modo, (time.perf_counter() - t0) * 1000)
+
+
+# Precalentamiento: cada servicio registra sus pasos con al_precalentar() (modulos, plantillas,
+# chromium, catalogos...). Con PRECALENTAR corren en segundo plano al arrancar y /health/ready
+# responde 503 hasta que terminan; PRECALENTAR_PASOS elige cuales ("*" = todos).
+_pasos: List[Tuple[str, Callable[[], object]]] = []
+_lock = threading.Lock()
+_listo = threading.Event()
+_resultados: Dict[str, dict] = {}
+
+
+def al_precalentar(nombre: str, fn: Callable[[], object]) -> None:
+    _pasos.append((nombre, fn))
+
+
+def _importar_pesados() -> None:
+    for modulo in MODULOS_PESADOS:
+        importlib.import_module(modulo)
+
+
+al_precalentar("modulos", _importar_pesados)
+
+
+def _seleccionados() -> List[Tuple[str, Callable[[], object]]]:
+    elegidos = settings.PRECALENTAR_PASOS
+    return [(n, fn) for n, fn in _pasos if "*" in elegidos or n in elegidos]
+
+
+def precalentar() -> None:
+    try:
+        for nombre, fn in _seleccionados():
+            with _lock:
+                _resultados[nombre] = {"estado": "en_curso"}
+            t0 = time.perf_counter()
+            try:
+                fn()
+            except Exception as e:
+                # Un paso fallido no bloquea la disponibilidad; queda reportado en estado()
+                log.warning("Precalentamiento '%s' fallo: %s", nombre, e)
+                resultado = {"estado": "error", "error": str(e)}
+            else:
+                resultado = {"estado": "ok"}
+            resultado["ms"] = round((time.perf_counter() - t0) * 1000, 1)
+            with _lock:
+                _resultados[nombre] = resultado
+            log.info("Precalentamiento '%s': %s en %.0f ms", nombre, resultado["estado"], resultado["ms"])
+    finally:
+        _listo.set()
+
+
+def precargar_compartido(pasos: Tuple[str, ...] = ("modulos", "plantillas")) -> None:
+    """Pasos de solo lectura que el master de gunicorn puede ejecutar antes del fork (preload_app):
+    las paginas de modulos y plantillas quedan compartidas copy-on-write entre workers."""
+    for nombre, fn in _pasos:
+        if nombre in pasos:
+            try:
+                fn()
+            except Exception as e:
+                log.warning("Precarga compartida '%s' fallo: %s", nombre, e)
+
+
+def iniciar_precalentamiento() -> Optional[threading.Thread]:
+    if not settings.PRECALENTAR:
+        _listo.set()
+        return None
+    hilo = threading.Thread(target=precalentar, name="precalentar", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def listo() -> bool:
+    return _listo.is_set()
+
+
+def estado() -> dict:
+    with _lock:
+        pasos = {n: dict(r) for n, r in _resultados.items()}
+    return {"listo": listo(), "precalentar": settings.PRECALENTAR, "pasos": pasos}
@@ -0,0 +1,95 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+from Backend.utils.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo exclusion entre hilos del mismo proceso
+    fcntl = None
+
+# Bloqueos entre procesos (workers de gunicorn/uvicorn en el mismo host) con flock sobre
+# archivos de BLOQUEOS_DIR. El kernel los libera si el proceso muere, asi que no quedan
+# bloqueos huerfanos. Los archivos de bloqueo nunca se borran: borrar uno mientras otro
+# proceso espera en el romperia la exclusion.
+
+_locales: Dict[str, threading.Lock] = {}
+_locales_lock = threading.Lock()
+
+
+def directorio() -> Path:
+    d = Path(settings.BLOQUEOS_DIR) if settings.BLOQUEOS_DIR else Path(tempfile.gettempdir()) / "formulario_locks"
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def _local(path: Path) -> threading.Lock:
+    with _locales_lock:
+        return _locales.setdefault(str(path), threading.Lock())
+
+
+def _abrir(nombre: str) -> int:
+    return os.open(directorio() / nombre, os.O_RDWR | os.O_CREAT, 0o644)
+
+
+@contextmanager
+def exclusivo(nombre: str) -> Iterator[None]:
+    """Bloqueo exclusivo con espera sobre BLOQUEOS_DIR/nombre."""
+    if fcntl is None:
+        with _local(directorio() / nombre):
+            yield
+        return
+    fd = _abrir(nombre)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)  # cerrar el descriptor libera el flock
+
+
+def _intentar(nombre: str) -> Optional[object]:
+    if fcntl is None:
+        lock = _local(directorio() / nombre)
+        return lock if lock.acquire(blocking=False) else None
+    fd = _abrir(nombre)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _soltar(token: object) -> None:
+    if isinstance(token, int):
+        os.close(token)
+    else:
+        token.release()
+
+
+@contextmanager
+def semaforo(nombre: str, cupos: int, timeout: Optional[float] = None) -> Iterator[None]:
+    """Semaforo entre procesos: `cupos` archivos nombre-i.lock; se toma el primero libre.
+    Sin cupo espera con backoff; con timeout lanza TimeoutError."""
+    limite = None if timeout is None else time.monotonic() + timeout
+    espera = 0.005
+    while True:
+        orden = list(range(cupos))
+        random.shuffle(orden)  # reparte la contencion entre cupos
+        for i in orden:
+            token = _intentar(f"{nombre}-{i}.lock")
+            if token is not None:
+                try:
+                    yield
+                finally:
+                    _soltar(token)
+                return
+        if limite is not None and time.monotonic() >= limite:
+            raise TimeoutError(f"Sin cupo en {nombre} ({cupos}) tras {timeout} s")
+        time.sleep(espera)
+        espera = min(espera * 2, 0.1)
@@ -0,0 +1,135 @@
+import zlib
+from typing import Optional
+from starlette.datastructures import Headers, MutableHeaders
+from Backend.utils import instrumentacion
+from Backend.utils.config import settings
+from Backend.utils.http_cache import codificaciones_aceptadas
+
+try:
+    import brotli
+except ImportError:  # opcional: sin brotli solo se ofrece gzip
+    brotli = None
+
+# Compresion de respuestas de texto (JSON del formulario, HTML del evaluador, /metrics) segun
+# Accept-Encoding. Se prefiere br sobre gzip; no se tocan cuerpos menores a COMPRESION_MIN_BYTES,
+# los ya codificados (bootstrap de catalogos) ni los documentos (xlsx/docx/zip ya van comprimidos).
+# Al comprimir el ETag fuerte pasa a debil: la representacion cambia pero etag_coincide lo acepta.
+# El 304 no se comprime, pero repite el ETag debil si es el que envio el cliente en If-None-Match.
+
+_TIPOS = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+
+
+class _Gzip:
+    nombre = "gzip"
+
+    def __init__(self):
+        self._z = zlib.compressobj(settings.COMPRESION_GZIP_NIVEL, zlib.DEFLATED, 31)
+
+    def comprimir(self, datos: bytes) -> bytes:
+        return self._z.compress(datos)
+
+    def terminar(self) -> bytes:
+        return self._z.flush()
+
+
+class _Brotli:
+    nombre = "br"
+
+    def __init__(self):
+        self._c = brotli.Compressor(quality=settings.COMPRESION_BR_CALIDAD)
+
+    def comprimir(self, datos: bytes) -> bytes:
+        return self._c.process(datos)
+
+    def terminar(self) -> bytes:
+        return self._c.finish()
+
+
+def _elegir(accept_encoding: Optional[str]):
+    aceptadas = codificaciones_aceptadas(accept_encoding)
+    if brotli is not None and "br" in aceptadas:
+        return _Brotli
+    if "gzip" in aceptadas:
+        return _Gzip
+    return None
+
+
+def _comprimible(inicio: dict, headers: Headers) -> bool:
+    if inicio["status"] < 200 or inicio["status"] in (204, 304) or "content-encoding" in headers:
+        return False
+    tipo = headers.get("content-type", "")
+    return tipo.startswith(_TIPOS)
+
+
+class CompresionMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        peticion = Headers(scope=scope)
+        clase = _elegir(peticion.get("accept-encoding"))
+        inicio: dict = {}
+        compresor = None
+        directo = False
+
+        async def _send(message):
+            nonlocal compresor, directo
+            if message["type"] == "http.response.start":
+                # Se retiene hasta ver el primer bloque del cuerpo
+                inicio.update(message)
+                return
+            if message["type"] != "http.response.body" or directo:
+                await send(message)
+                return
+            cuerpo = message.get("body", b"")
+            mas = message.get("more_body", False)
+
+            if compresor is None:
+                headers = MutableHeaders(raw=list(inicio.get("headers", [])))
+                if inicio["status"] == 304:
+                    directo = True
+                    etag = headers.get("etag")
+                    if etag and not etag.startswith("W/") and f"W/{etag}" in peticion.get("if-none-match", ""):
+                        headers["ETag"] = f"W/{etag}"
+                        headers.add_vary_header("Accept-Encoding")
+                    await send({**inicio, "headers": headers.raw})
+                    await send(message)
+                    return
+                if not _comprimible(inicio, headers):
+                    directo = True
+                    await send(inicio)
+                    await send(message)
+                    return
+                # Vary tambien sin comprimir, para que un cache intermedio no sirva una variante ajena
+                headers.add_vary_header("Accept-Encoding")
+                if clase is None or (not mas and len(cuerpo) < settings.COMPRESION_MIN_BYTES):
+                    directo = True
+                    await send({**inicio, "headers": headers.raw})
+                    await send(message)
+                    return
+                compresor = clase()
+                with instrumentacion.span(f"compresion.{compresor.nombre}"):
+                    salida = compresor.comprimir(cuerpo)
+                    if not mas:
+                        salida += compresor.terminar()
+                headers["Content-Encoding"] = compresor.nombre
+                etag = headers.get("etag")
+                if etag and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+                if mas:
+                    del headers["Content-Length"]
+                else:
+                    headers["Content-Length"] = str(len(salida))
+                await send({**inicio, "headers": headers.raw})
+                await send({"type": "http.response.body", "body": salida, "more_body": mas})
+                return
+
+            salida = compresor.comprimir(cuerpo)
+            if not mas:
+                salida += compresor.terminar()
+            await send({"type": "http.response.body", "body": salida, "more_body": mas})
+
+        await self.app(scope, receive, _send)
@@ -1,4 +1,4 @@
-from typing import Optional, Union, List
+from typing import Dict, Optional, Union, List
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import field_validator
 import json
@@ -12,9 +12,9 @@ class Settings(BaseSettings):
 
     CORS_ORIGINS: Union[str, List[str]] = "*"
 
-    @field_validator("CORS_ORIGINS", mode="before")
+    @field_validator("CORS_ORIGINS", "PRERENDER_DOCS", "PRECALENTAR_PASOS", mode="before")
     @classmethod
-    def normalize_cors(cls, v):
+    def separar_lista(cls, v):
         if v is None:
             return ["*"]
         if isinstance(v, list):
@@ -39,6 +39,82 @@ class Settings(BaseSettings):
     DB_PORT: Optional[int] = None
     DB_NAME: Optional[str] = None
 
+    # Pool de conexiones (SQLAlchemy QueuePool), uno sync y uno async por worker. Sin valor se
+    # reparte DB_CONEXIONES_MAX entre WEB_CONCURRENCY workers x 2 engines (maximo 10 + 20); al
+    # arrancar se rechaza una configuracion que supere el presupuesto (0 = sin comprobar).
+    DB_POOL_SIZE: Optional[int] = None
+    DB_MAX_OVERFLOW: Optional[int] = None
+    DB_CONEXIONES_MAX: int = 90
+    WEB_CONCURRENCY: int = 1
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # Catalogos (plan indicativo, dependencias, variables...) cacheados en memoria
+    CATALOGO_CACHE_MAX_AGE: int = 300
+    # Cada cuantos segundos se compara la huella de las tablas de catalogo (0 = solo invalidacion explicita)
+    CATALOGO_HUELLA_SEG: int = 60
+
+    # Compresion de respuestas de texto segun Accept-Encoding (br solo si esta instalado brotli)
+    COMPRESION_ENABLED: bool = True
+    COMPRESION_MIN_BYTES: int = 1024
+    COMPRESION_GZIP_NIVEL: int = 6
+    COMPRESION_BR_CALIDAD: int = 4
+
+    # Cache en disco de documentos generados (Excel/Word)
+    DOC_CACHE_ENABLED: bool = True
+    DOC_CACHE_DIR: Optional[str] = None
+    DOC_CACHE_MAX_MB: int = 512
+
+    # Pre-generacion en segundo plano de documentos tras guardar un formulario
+    PRERENDER_ENABLED: bool = False
+    PRERENDER_DOCS: Union[str, List[str]] = "*"
+    PRERENDER_WORKERS: int = 2
+    PRERENDER_DELAY_SEG: float = 3.0
+
+    # Ejecucion del llenado de plantillas: inline | thread | process (0 workers = nucleos)
+    RENDER_BACKEND: str = "thread"
+    RENDER_WORKERS: int = 0
+    # Llenados simultaneos en todo el host, sumando todos los workers (0 = sin limite global)
+    RENDER_MAX_GLOBAL: int = 0
+    # Archivos de bloqueo compartidos entre workers (por defecto <tmp>/formulario_locks)
+    BLOQUEOS_DIR: Optional[str] = None
+
+    # Reportes: la vista materializada se refresca REPORTES_REFRESH_SEG despues del ultimo guardado
+    REPORTES_REFRESH_AUTO: bool = True
+    REPORTES_REFRESH_SEG: float = 10.0
+    # Cada cuanto se verifica en BD si otro proceso cambio formularios (cobertura de metas)
+    REPORTES_HUELLA_SEG: int = 30
+
+    # Presupuesto de consultas SQL por solicitud (0 = sin limite). Se registra un warning al
+    # excederlo o al repetir la misma forma de sentencia SQL_REPETICIONES_MAX veces (N+1);
+    # con SQL_PRESUPUESTO_ESTRICTO o ENV=test la consulta que lo excede lanza excepcion.
+    # SQL_PRESUPUESTO_RUTAS ajusta el limite por plantilla de ruta; 0 deja la ruta exenta.
+    SQL_PRESUPUESTO_CONSULTAS: int = 60
+    SQL_PRESUPUESTO_RUTAS: Dict[str, int] = {"/descarga/lote/concepto-tecnico-sectorial": 0}
+    SQL_REPETICIONES_MAX: int = 10
+    SQL_PRESUPUESTO_ESTRICTO: bool = False
+
+    # Esquema al arrancar: crear (Base.metadata.create_all), verificar (solo comprueba tablas y
+    # columnas; las crea Migrations/*.sql) u omitir. Sin valor: verificar si ENV=production.
+    DB_ESQUEMA_ARRANQUE: Optional[str] = None
+    # Precalentamiento en segundo plano al arrancar (ver utils/arranque.py); /health/ready da 503
+    # hasta que termina. Pasos: modulos, plantillas, chromium, catalogos ("*" = todos)
+    PRECALENTAR: bool = False
+    PRECALENTAR_PASOS: Union[str, List[str]] = "*"
+    # Hilos con un Chromium persistente para los PDF (0 = lanzar uno por PDF)
+    CHROMIUM_HILOS: int = 1
+
+    # /health/ready: espacio libre minimo en el directorio de salida y en la cache de documentos,
+    # y umbrales de saturacion (renders en curso por worker de render_pool, PDF en cola de Chromium)
+    SALUD_DISCO_MIN_MB: int = 200
+    SALUD_RENDERS_POR_WORKER: float = 2.0
+    SALUD_PDF_EN_COLA_MAX: int = 8
+
+    # Token para las rutas de operacion (cabecera X-Admin-Token), p. ej. /metricas/perfil.
+    # Sin token esas rutas responden 404.
+    ADMIN_TOKEN: Optional[str] = None
+
     model_config = SettingsConfigDict(
         env_file=(".env", ".env.dev"),
         env_file_encoding="utf-8",
@@ -1,8 +1,13 @@
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, exc
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
 from sqlalchemy.engine import URL
 from Backend.utils.config import settings
+from Backend.utils.instrumentacion import instrumentar_engine
 
 for k in ("PGSERVICE", "PGSERVICEFILE", "PGSYSCONFDIR", "PGPASSFILE",
           "PGHOST", "PGDATABASE", "PGUSER", "PGPASSWORD"):
@@ -17,7 +22,88 @@ url = URL.create(
     database=settings.DB_NAME,
 )
 
-engine = create_engine(url, future=True)
+
+class PoolMetricas:
+    """Acumula tiempos de espera al pedir una conexion al pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+
+    def registrar(self, espera: float, timeout: bool = False) -> None:
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.checkouts = self.timeouts = 0
+            self.espera_total = self.espera_max = 0.0
+
+
+pool_metricas = PoolMetricas()
+pool_metricas_async = PoolMetricas()
+
+
+class _CheckoutMedido:
+    metricas: PoolMetricas
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metricas.registrar(time.perf_counter() - inicio, timeout=True)
+            raise
+        self.metricas.registrar(time.perf_counter() - inicio)
+        return conn
+
+
+class PoolMedido(_CheckoutMedido, QueuePool):
+    metricas = pool_metricas
+
+
+class PoolMedidoAsync(_CheckoutMedido, AsyncAdaptedQueuePool):
+    metricas = pool_metricas_async
+
+
+def _tamano_pool() -> tuple:
+    # Conexiones que le tocan a cada engine: cada worker tiene uno sync y uno async
+    por_engine = settings.DB_CONEXIONES_MAX // (max(settings.WEB_CONCURRENCY, 1) * 2) or 30
+    size = settings.DB_POOL_SIZE if settings.DB_POOL_SIZE is not None else max(1, min(10, por_engine // 3))
+    overflow = settings.DB_MAX_OVERFLOW if settings.DB_MAX_OVERFLOW is not None else max(0, min(20, por_engine - size))
+    return size, overflow
+
+
+POOL_SIZE, MAX_OVERFLOW = _tamano_pool()
+
+
+def verificar_presupuesto_conexiones() -> None:
+    """Falla al arrancar si todos los workers juntos pueden abrir mas de DB_CONEXIONES_MAX."""
+    total = max(settings.WEB_CONCURRENCY, 1) * 2 * (POOL_SIZE + MAX_OVERFLOW)
+    if settings.DB_CONEXIONES_MAX > 0 and total > settings.DB_CONEXIONES_MAX:
+        raise RuntimeError(
+            f"{settings.WEB_CONCURRENCY} workers x 2 engines x ({POOL_SIZE} + {MAX_OVERFLOW}) = {total} conexiones "
+            f"superan DB_CONEXIONES_MAX={settings.DB_CONEXIONES_MAX}; baja DB_POOL_SIZE/DB_MAX_OVERFLOW o los workers"
+        )
+
+
+_POOL_KWARGS = dict(
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
+
+engine = create_engine(url, future=True, poolclass=PoolMedido, **_POOL_KWARGS)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
 
@@ -28,3 +114,38 @@ def get_db():
     finally:
         db.close()
 
+# Motor async (psycopg en modo asyncio) para las rutas de solo lectura declaradas con async def
+async_engine = create_async_engine(url, poolclass=PoolMedidoAsync, **_POOL_KWARGS)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+instrumentar_engine(engine)
+instrumentar_engine(async_engine.sync_engine)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def _estado(pool, m: PoolMetricas) -> dict:
+    with m._lock:
+        checkouts, timeouts = m.checkouts, m.timeouts
+        espera_total, espera_max = m.espera_total, m.espera_max
+    return {
+        "pool_size": pool.size(),
+        "max_overflow": MAX_OVERFLOW,
+        "en_uso": pool.checkedout(),
+        "disponibles": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "timeout_seg": settings.DB_POOL_TIMEOUT,
+        "checkouts": checkouts,
+        "timeouts": timeouts,
+        "espera_total_ms": round(espera_total * 1000, 3),
+        "espera_media_ms": round(espera_total * 1000 / checkouts, 3) if checkouts else 0.0,
+        "espera_max_ms": round(espera_max * 1000, 3),
+    }
+
+
+def estado_pool() -> dict:
+    estado = _estado(engine.pool, pool_metricas)
+    estado["async"] = _estado(async_engine.pool, pool_metricas_async)
+    return estado
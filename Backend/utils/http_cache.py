@@ -0,0 +1,39 @@
+from typing import Optional, Set
+
+
+def etag_formulario(form_id: int, version: int) -> str:
+    return f'"f{form_id}-v{version}"'
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        c = candidato.strip()
+        if c == "*":
+            return True
+        if c.startswith("W/"):
+            c = c[2:]
+        if c == etag:
+            return True
+    return False
+
+
+def codificaciones_aceptadas(accept_encoding: Optional[str]) -> Set[str]:
+    """Codificaciones con q > 0 ("gzip;q=0", "gzip; q=0.0" son rechazos; un q invalido tambien)."""
+    aceptadas = set()
+    for parte in (accept_encoding or "").split(","):
+        nombre, *params = [p.strip() for p in parte.split(";")]
+        if not nombre:
+            continue
+        q = 1.0
+        for param in params:
+            clave, _, valor = param.partition("=")
+            if clave.strip().lower() == "q":
+                try:
+                    q = float(valor.strip())
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            aceptadas.add(nombre.lower())
+    return aceptadas
@@ -0,0 +1,294 @@
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from Backend.utils.config import settings
+
+# Metricas en proceso con exposicion en formato Prometheus (sin dependencias externas).
+# Cada solicitud HTTP lleva una Medicion en un ContextVar: los spans (tramos con nombre,
+# p. ej. "openpyxl.cargar") y las consultas SQL del engine se acumulan ahi y al terminar
+# la solicitud se vuelcan a los histogramas globales.
+# Ademas se vigila el presupuesto de consultas por solicitud (SQL_PRESUPUESTO_*) y se
+# devuelve el desglose en la cabecera Server-Timing.
+
+log = logging.getLogger(__name__)
+
+_BUCKETS_SEG = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _escapar(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(nombres: Tuple[str, ...], valores: tuple, extra: str = "") -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+class Histograma:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...], buckets: tuple = _BUCKETS_SEG):
+        self.nombre, self.ayuda, self.etiquetas, self.buckets = nombre, ayuda, etiquetas, buckets
+        self._lock = threading.Lock()
+        self._series: Dict[tuple, list] = {}   # valores -> [conteo por bucket..., suma, total]
+
+    def observar(self, valores: tuple, valor: float) -> None:
+        i = bisect_left(self.buckets, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                serie[i] += 1
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def exportar(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = {k: list(v) for k, v in self._series.items()}
+        for valores, serie in sorted(series.items()):
+            acumulado = 0
+            for b, n in zip(self.buckets, serie):
+                acumulado += n
+                le = 'le="%s"' % b
+                lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, le)} {acumulado}")
+            le = 'le="+Inf"'
+            lineas.append(f"{self.nombre}_bucket{_etiquetas(self.etiquetas, valores, le)} {serie[-1]}")
+            lineas.append(f"{self.nombre}_sum{_etiquetas(self.etiquetas, valores)} {serie[-2]}")
+            lineas.append(f"{self.nombre}_count{_etiquetas(self.etiquetas, valores)} {serie[-1]}")
+        return lineas
+
+
+class Contador:
+    def __init__(self, nombre: str, ayuda: str, etiquetas: Tuple[str, ...] = (), tipo: str = "counter"):
+        self.nombre, self.ayuda, self.etiquetas, self.tipo = nombre, ayuda, etiquetas, tipo
+        self._lock = threading.Lock()
+        self._valores: Dict[tuple, float] = {}
+
+    def sumar(self, valores: tuple = (), n: float = 1) -> None:
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + n
+
+    def exportar(self) -> List[str]:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} {self.tipo}"]
+        with self._lock:
+            valores = dict(self._valores)
+        for k, v in sorted(valores.items()):
+            lineas.append(f"{self.nombre}{_etiquetas(self.etiquetas, k)} {v}")
+        return lineas
+
+
+DURACION_HTTP = Histograma("http_request_duration_seconds", "Duracion de solicitudes HTTP", ("method", "route", "status"))
+CONSULTAS_HTTP = Histograma("http_request_db_queries", "Consultas SQL por solicitud", ("route",), _BUCKETS_CONSULTAS)
+TIEMPO_DB_HTTP = Histograma("http_request_db_seconds", "Tiempo en BD por solicitud", ("route",))
+SPANS = Histograma("span_duration_seconds", "Duracion de tramos internos (BD, plantillas, render)", ("span",))
+CONSULTAS = Contador("db_queries_total", "Consultas SQL ejecutadas")
+TIEMPO_DB = Contador("db_query_seconds_total", "Tiempo acumulado de consultas SQL")
+EN_CURSO = Contador("http_requests_in_progress", "Solicitudes en curso", tipo="gauge")
+EXCESOS = Contador("db_query_budget_exceeded_total", "Solicitudes que excedieron el presupuesto de consultas", ("route", "motivo"))
+
+_METRICAS: List = [DURACION_HTTP, CONSULTAS_HTTP, TIEMPO_DB_HTTP, SPANS, CONSULTAS, TIEMPO_DB, EN_CURSO, EXCESOS]
+_GAUGES: List[Tuple[str, str, Callable[[], Dict[tuple, float]], Tuple[str, ...]]] = []
+
+
+def registrar_gauge(nombre: str, ayuda: str, leer: Callable[[], Dict[tuple, float]], etiquetas: Tuple[str, ...] = ()) -> None:
+    """leer() se evalua en cada scrape y devuelve {valores_etiquetas: valor}."""
+    _GAUGES.append((nombre, ayuda, leer, etiquetas))
+
+
+class PresupuestoConsultasExcedido(RuntimeError):
+    pass
+
+
+class Medicion:
+    __slots__ = ("spans", "consultas", "tiempo_db", "sentencias", "scope", "excesos")
+
+    def __init__(self, scope: Optional[dict] = None):
+        self.spans: List[Tuple[str, float]] = []
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        self.sentencias: Dict[str, int] = {}   # forma de la sentencia -> veces
+        self.scope = scope                     # solo las solicitudes HTTP tienen presupuesto
+        self.excesos: Dict[str, str] = {}      # motivo -> detalle
+
+    def ruta(self) -> str:
+        route = (self.scope or {}).get("route")
+        return getattr(route, "path", None) or "sin_ruta"
+
+    def por_span(self) -> Dict[str, float]:
+        total: Dict[str, float] = {}
+        for nombre, seg in self.spans:
+            total[nombre] = total.get(nombre, 0.0) + seg
+        return total
+
+
+_actual: ContextVar[Optional[Medicion]] = ContextVar("medicion_solicitud", default=None)
+
+
+def actual() -> Optional[Medicion]:
+    return _actual.get()
+
+
+def registrar_spans(spans: List[Tuple[str, float]]) -> None:
+    m = _actual.get()
+    if m is not None:
+        m.spans.extend(spans)
+    else:
+        for nombre, seg in spans:
+            SPANS.observar((nombre,), seg)
+
+
+@contextmanager
+def span(nombre: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar_spans([(nombre, time.perf_counter() - t0)])
+
+
+@contextmanager
+def recolectar() -> Iterator[Medicion]:
+    """Medicion aislada para trabajo fuera de la solicitud (workers del render pool)."""
+    m = Medicion()
+    token = _actual.set(m)
+    try:
+        yield m
+    finally:
+        _actual.reset(token)
+
+
+# =========================
+# Consultas SQL
+# =========================
+_PARAMETRO = re.compile(r"%\(\w+\)s|%s|\$\d+")
+_LISTA = re.compile(r"\?(?:\s*,\s*\?)+")
+_NUMERO = re.compile(r"\b\d+\b")
+_ESPACIOS = re.compile(r"\s+")
+
+
+def forma_sentencia(statement: str) -> str:
+    # Parametros, listas IN expandidas y literales numericos colapsan a "?": dos consultas
+    # con la misma forma solo difieren en los valores (el patron tipico de N+1)
+    forma = _PARAMETRO.sub("?", statement)
+    forma = _NUMERO.sub("?", forma)
+    forma = _LISTA.sub("?", forma)
+    return _ESPACIOS.sub(" ", forma).strip()
+
+
+def _estricto() -> bool:
+    return settings.SQL_PRESUPUESTO_ESTRICTO or settings.ENV == "test"
+
+
+def _revisar_presupuesto(m: Medicion, forma: str) -> None:
+    nuevo = None
+    ruta = m.ruta()
+    limite = settings.SQL_PRESUPUESTO_RUTAS.get(ruta, settings.SQL_PRESUPUESTO_CONSULTAS)
+    if ruta in settings.SQL_PRESUPUESTO_RUTAS and not limite:
+        return
+    if limite and m.consultas > limite and "presupuesto" not in m.excesos:
+        nuevo = m.excesos["presupuesto"] = f"{m.consultas} consultas (limite {limite})"
+    repeticiones = settings.SQL_REPETICIONES_MAX
+    if repeticiones and m.sentencias[forma] >= repeticiones and "repeticion" not in m.excesos:
+        nuevo = m.excesos["repeticion"] = f"misma sentencia {m.sentencias[forma]} veces: {forma[:300]}"
+    if nuevo and _estricto():
+        raise PresupuestoConsultasExcedido(f"{ruta}: {nuevo}")
+
+
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_t_consulta", []).append(time.perf_counter())
+
+
+def _despues(conn, cursor, statement, parameters, context, executemany):
+    pila = conn.info.get("_t_consulta")
+    dt = time.perf_counter() - pila.pop() if pila else 0.0
+    CONSULTAS.sumar()
+    TIEMPO_DB.sumar((), dt)
+    m = _actual.get()
+    if m is not None:
+        m.consultas += 1
+        m.tiempo_db += dt
+        forma = forma_sentencia(statement)
+        m.sentencias[forma] = m.sentencias.get(forma, 0) + 1
+        if m.scope is not None:
+            _revisar_presupuesto(m, forma)
+
+
+def instrumentar_engine(engine) -> None:
+    event.listen(engine, "before_cursor_execute", _antes)
+    event.listen(engine, "after_cursor_execute", _despues)
+
+
+# =========================
+# Middleware ASGI
+# =========================
+def server_timing(m: Medicion, total: float) -> str:
+    partes = [f'db;dur={m.tiempo_db * 1000:.1f};desc="{m.consultas} consultas"']
+    partes += [f"{nombre};dur={seg * 1000:.1f}" for nombre, seg in m.por_span().items()]
+    partes.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(partes)
+
+
+class MetricasMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        medicion = Medicion(scope)
+        token = _actual.set(medicion)
+        estado = [500]
+        t0 = time.perf_counter()
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                estado[0] = message["status"]
+                # Solo cubre lo ocurrido antes de la cabecera (en streaming el cuerpo va despues)
+                valor = server_timing(medicion, time.perf_counter() - t0)
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", valor.encode("latin-1"))]}
+            await send(message)
+
+        EN_CURSO.sumar((), 1)
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            duracion = time.perf_counter() - t0
+            EN_CURSO.sumar((), -1)
+            _actual.reset(token)
+            ruta = medicion.ruta()
+            DURACION_HTTP.observar((scope["method"], ruta, str(estado[0])), duracion)
+            CONSULTAS_HTTP.observar((ruta,), medicion.consultas)
+            TIEMPO_DB_HTTP.observar((ruta,), medicion.tiempo_db)
+            for nombre, seg in medicion.spans:
+                SPANS.observar((nombre,), seg)
+            for motivo, detalle in medicion.excesos.items():
+                EXCESOS.sumar((ruta, motivo))
+                log.warning("%s %s excedio el presupuesto de consultas (%s): %s", scope["method"], ruta, motivo, detalle)
+
+
+def exportar() -> str:
+    lineas: List[str] = []
+    for metrica in _METRICAS:
+        lineas.extend(metrica.exportar())
+    for nombre, ayuda, leer, etiquetas in _GAUGES:
+        lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} gauge"]
+        try:
+            valores = leer()
+        except Exception:
+            continue
+        for k, v in sorted(valores.items()):
+            lineas.append(f"{nombre}{_etiquetas(etiquetas, k)} {v}")
+    return "\n".join(lineas) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
@@ -0,0 +1,179 @@
+import fnmatch
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+# Perfilado por muestreo bajo demanda: se arma una sesion para las proximas N solicitudes cuya
+# ruta coincida con un patron (fnmatch, p. ej. "/descarga/excel/*"). Mientras alguna de ellas
+# esta en curso, un hilo toma sys._current_frames() cada intervalo y guarda las pilas de los
+# hilos que estan ejecutando su endpoint (o un render de render_pool). El resultado sale en
+# formato "collapsed stacks" (flamegraph.pl, speedscope). Sin sesion el middleware solo
+# compara una variable global con None.
+
+
+class Sesion:
+    def __init__(self, patron: str, solicitudes: int, intervalo_ms: float, timeout_seg: float):
+        self.patron = patron
+        self.solicitudes = solicitudes
+        self.intervalo = max(intervalo_ms, 1.0) / 1000
+        self.inicio = time.time()
+        self.vence = time.monotonic() + timeout_seg
+        self.estado = "activa"
+        self.muestras: Counter = Counter()
+        self.tomas = 0
+        self.capturadas: List[dict] = []
+        self._restantes = solicitudes
+        self._activas: Dict[int, dict] = {}
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, name="perfilador", daemon=True)
+
+    # --- solicitudes ---
+    def tomar(self, scope: dict) -> bool:
+        if not fnmatch.fnmatchcase(scope.get("path", ""), self.patron):
+            return False
+        with self._lock:
+            if self._restantes <= 0 or self.estado != "activa":
+                return False
+            self._restantes -= 1
+            self._activas[id(scope)] = scope
+        return True
+
+    def soltar(self, scope: dict, status: int, duracion: float) -> None:
+        with self._lock:
+            self._activas.pop(id(scope), None)
+            self.capturadas.append({
+                "metodo": scope.get("method"), "ruta": scope.get("path"),
+                "status": status, "duracion_ms": round(duracion * 1000, 1),
+            })
+            completa = self._restantes <= 0 and not self._activas
+        if completa:
+            self.terminar("completa")
+
+    # --- muestreo ---
+    def _codigos(self) -> Set:
+        from Backend.services import render_pool
+        with self._lock:
+            scopes = list(self._activas.values())
+        codigos = set()
+        for scope in scopes:
+            endpoint = getattr(scope.get("route"), "endpoint", None)
+            if endpoint is not None and hasattr(endpoint, "__code__"):
+                codigos.add(endpoint.__code__)
+        if scopes:
+            codigos.add(render_pool._medido.__code__)
+        return codigos
+
+    def _muestrear(self) -> None:
+        propio = threading.get_ident()
+        while not self._detener.wait(self.intervalo):
+            if time.monotonic() > self.vence:
+                self.terminar("vencida")
+                return
+            codigos = self._codigos()
+            if not codigos:
+                continue
+            self.tomas += 1
+            for tid, frame in sys._current_frames().items():
+                if tid == propio:
+                    continue
+                pila = _pila(frame, codigos)
+                if pila:
+                    self.muestras[pila] += 1
+
+    def arrancar(self) -> None:
+        self._hilo.start()
+
+    def terminar(self, estado: str) -> None:
+        global _sesion
+        with self._lock:
+            if self.estado != "activa":
+                return
+            self.estado = estado
+        self._detener.set()
+        with _lock:
+            if _sesion is self:
+                _sesion = None
+
+    # --- salida ---
+    def colapsado(self) -> str:
+        return "".join(f"{pila} {n}\n" for pila, n in self.muestras.most_common())
+
+    def resumen(self) -> dict:
+        with self._lock:
+            en_curso = len(self._activas)
+            capturadas = list(self.capturadas)
+        return {
+            "estado": self.estado,
+            "patron": self.patron,
+            "solicitudes": self.solicitudes,
+            "en_curso": en_curso,
+            "capturadas": capturadas,
+            "intervalo_ms": self.intervalo * 1000,
+            "tomas": self.tomas,
+            "pilas_distintas": len(self.muestras),
+            "inicio": self.inicio,
+        }
+
+
+def _pila(frame, codigos: Set) -> Optional[str]:
+    # Desde el frame mas externo que sea un endpoint perfilado (o render) hasta la hoja
+    marcos = []
+    raiz = None
+    while frame is not None:
+        marcos.append(frame)
+        if frame.f_code in codigos:
+            raiz = len(marcos)
+        frame = frame.f_back
+    if raiz is None:
+        return None
+    return ";".join(_nombre(f) for f in reversed(marcos[:raiz]))
+
+
+def _nombre(frame) -> str:
+    modulo = frame.f_globals.get("__name__", "?")
+    return f"{modulo}:{frame.f_code.co_qualname}".replace(";", ",").replace(" ", "_")
+
+
+_lock = threading.Lock()
+_sesion: Optional[Sesion] = None
+_ultima: Optional[Sesion] = None
+
+
+def iniciar(patron: str, solicitudes: int, intervalo_ms: float, timeout_seg: float) -> Sesion:
+    global _sesion, _ultima
+    with _lock:
+        if _sesion is not None:
+            raise RuntimeError("Ya hay una sesion de perfilado activa")
+        _sesion = _ultima = Sesion(patron, solicitudes, intervalo_ms, timeout_seg)
+    _sesion.arrancar()
+    return _ultima
+
+
+def actual() -> Optional[Sesion]:
+    return _ultima
+
+
+class PerfilMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        sesion = _sesion
+        if sesion is None or scope["type"] != "http" or not sesion.tomar(scope):
+            await self.app(scope, receive, send)
+            return
+        estado = [500]
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                estado[0] = message["status"]
+            await send(message)
+
+        t0 = time.perf_counter()
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            sesion.soltar(scope, estado[0], time.perf_counter() - t0)
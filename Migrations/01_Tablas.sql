@@ -74,7 +74,8 @@ CREATE TABLE formulario (
     nombre_secretario TEXT,
     fuentes TEXT,
     duracion_proyecto INT,
-    cantidad_beneficiarios INT
+    cantidad_beneficiarios INT,
+    version INT NOT NULL DEFAULT 1
 );
 
 -- Tabla: meta
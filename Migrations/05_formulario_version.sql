@@ -0,0 +1,4 @@
+-- Contador de version por formulario: se incrementa en cada escritura
+-- y sirve como ETag para GET /proyecto/formulario/{id}.
+ALTER TABLE formulario
+ADD COLUMN IF NOT EXISTS version INT NOT NULL DEFAULT 1;
@@ -0,0 +1,21 @@
+-- Resumen de estructura_financiera por anio, entidad, dependencia, sector y linea
+-- estrategica para /reportes/financiero. Los NULL se guardan como 0 / '' porque
+-- REFRESH ... CONCURRENTLY exige un indice unico sobre columnas simples.
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_resumen_financiero AS
+SELECT
+    COALESCE(ef.anio, 0)                 AS anio,
+    UPPER(TRIM(ef.entidad))              AS entidad,
+    COALESCE(f.id_dependencia, 0)        AS id_dependencia,
+    COALESCE(f.id_sector, 0)             AS id_sector,
+    COALESCE(f.id_linea_estrategica, 0)  AS id_linea_estrategica,
+    SUM(COALESCE(ef.valor, 0))           AS valor,
+    COUNT(*)                             AS registros
+FROM estructura_financiera ef
+JOIN formulario f ON f.id = ef.id_formulario
+GROUP BY 1, 2, 3, 4, 5;
+
+CREATE UNIQUE INDEX IF NOT EXISTS ux_mv_resumen_financiero
+    ON mv_resumen_financiero (anio, entidad, id_dependencia, id_sector, id_linea_estrategica);
+
+CREATE INDEX IF NOT EXISTS ix_estructura_financiera_formulario
+    ON estructura_financiera (id_formulario);
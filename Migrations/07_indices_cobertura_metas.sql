@@ -0,0 +1,13 @@
+-- Indices para /reportes/cobertura-metas: recorrido de metas por meta y por formulario,
+-- y jerarquia meta -> programa -> sector.
+CREATE INDEX IF NOT EXISTS ix_metas_meta_formulario
+    ON metas (id_meta, id_formulario);
+
+CREATE INDEX IF NOT EXISTS ix_metas_formulario
+    ON metas (id_formulario);
+
+CREATE INDEX IF NOT EXISTS ix_meta_programa
+    ON meta (id_programa);
+
+CREATE INDEX IF NOT EXISTS ix_programa_sector
+    ON programa (id_sector);
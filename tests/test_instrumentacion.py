@@ -0,0 +1,98 @@
+import logging
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from Backend.utils import instrumentacion
+from Backend.utils.config import settings
+
+# Presupuesto de consultas por solicitud (SQL_PRESUPUESTO_*) y detector de N+1 a traves de
+# MetricasMiddleware, con un engine SQLite en memoria en lugar de la BD del proyecto.
+
+_engine = create_engine("sqlite://")
+instrumentacion.instrumentar_engine(_engine)
+
+_app = FastAPI()
+
+
+@_app.get("/consultas/{n}")
+def _consultas(n: int):
+    with _engine.connect() as conn:
+        for i in range(n):
+            conn.execute(text("SELECT :i"), {"i": i})
+    return {"n": n}
+
+
+_app.add_middleware(instrumentacion.MetricasMiddleware)
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(settings, "ENV", "production")
+    monkeypatch.setattr(settings, "SQL_PRESUPUESTO_ESTRICTO", False)
+    monkeypatch.setattr(settings, "SQL_PRESUPUESTO_RUTAS", {})
+    return TestClient(_app)
+
+
+def _excesos(caplog):
+    return [r.getMessage() for r in caplog.records if "excedio el presupuesto" in r.getMessage()]
+
+
+def test_presupuesto_dentro_del_limite(cliente, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SQL_PRESUPUESTO_CONSULTAS", 5)
+    monkeypatch.setattr(settings, "SQL_REPETICIONES_MAX", 0)
+    with caplog.at_level(logging.WARNING, logger=instrumentacion.__name__):
+        r = cliente.get("/consultas/5")
+    assert r.status_code == 200
+    assert _excesos(caplog) == []
+
+
+def test_presupuesto_excedido_registra_warning(cliente, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SQL_PRESUPUESTO_CONSULTAS", 3)
+    monkeypatch.setattr(settings, "SQL_REPETICIONES_MAX", 0)
+    with caplog.at_level(logging.WARNING, logger=instrumentacion.__name__):
+        r = cliente.get("/consultas/6")
+    assert r.status_code == 200
+    excesos = _excesos(caplog)
+    assert len(excesos) == 1
+    assert "/consultas/{n}" in excesos[0] and "(presupuesto)" in excesos[0] and "limite 3" in excesos[0]
+
+
+def test_repeticion_registra_warning(cliente, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SQL_PRESUPUESTO_CONSULTAS", 0)
+    monkeypatch.setattr(settings, "SQL_REPETICIONES_MAX", 4)
+    with caplog.at_level(logging.WARNING, logger=instrumentacion.__name__):
+        r = cliente.get("/consultas/4")
+    assert r.status_code == 200
+    excesos = _excesos(caplog)
+    assert len(excesos) == 1
+    assert "(repeticion)" in excesos[0] and "SELECT ?" in excesos[0]
+
+
+@pytest.mark.parametrize("estricto, env", [(True, "production"), (False, "test")])
+def test_presupuesto_estricto_lanza(cliente, monkeypatch, estricto, env):
+    monkeypatch.setattr(settings, "SQL_PRESUPUESTO_ESTRICTO", estricto)
+    monkeypatch.setattr(settings, "ENV", env)
+    monkeypatch.setattr(settings, "SQL_PRESUPUESTO_CONSULTAS", 3)
+    monkeypatch.setattr(settings, "SQL_REPETICIONES_MAX", 0)
+    with pytest.raises(instrumentacion.PresupuestoConsultasExcedido, match="limite 3"):
+        cliente.get("/consultas/6")
+
+
+def test_repeticion_estricta_lanza(cliente, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_PRESUPUESTO_ESTRICTO", True)
+    monkeypatch.setattr(settings, "SQL_PRESUPUESTO_CONSULTAS", 0)
+    monkeypatch.setattr(settings, "SQL_REPETICIONES_MAX", 4)
+    with pytest.raises(instrumentacion.PresupuestoConsultasExcedido, match="misma sentencia 4 veces"):
+        cliente.get("/consultas/4")
+
+
+def test_ruta_exenta(cliente, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SQL_PRESUPUESTO_ESTRICTO", True)
+    monkeypatch.setattr(settings, "SQL_PRESUPUESTO_RUTAS", {"/consultas/{n}": 0})
+    monkeypatch.setattr(settings, "SQL_PRESUPUESTO_CONSULTAS", 3)
+    monkeypatch.setattr(settings, "SQL_REPETICIONES_MAX", 2)
+    with caplog.at_level(logging.WARNING, logger=instrumentacion.__name__):
+        r = cliente.get("/consultas/6")
+    assert r.status_code == 200
+    assert _excesos(caplog) == []